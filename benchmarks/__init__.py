@@ -0,0 +1,6 @@
+"""
+Performance benchmarks for the translator services
+
+Run a benchmark from the project root, e.g.:
+    python -m benchmarks.bench_clipboard_sources
+"""
@@ -0,0 +1,55 @@
+"""
+Benchmark batch translation of short strings against one request per item
+
+Uses a stub engine with a fixed per-request overhead (network round trip
+plus prompt processing) and a small per-token cost. The stub answers
+JSON-framed batches with a JSON array, like a well-behaved model.
+"""
+import json
+import time
+
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services.chunker import estimate_tokens
+from services.translator import translate_batch, translate_text
+
+REQUEST_OVERHEAD = 0.02
+SECONDS_PER_TOKEN = 0.0002
+
+LABELS = [f"Salvar arquivo {i}" for i in range(100)] + \
+         [f"Abrir configurações da conta {i}" for i in range(100)]
+
+
+def translate_with_stub(text, context, api_key):
+    """Stub engine: per-request overhead plus time proportional to size"""
+    time.sleep(REQUEST_OVERHEAD + estimate_tokens(text) * SECONDS_PER_TOKEN)
+    if text.startswith("["):
+        items = json.loads(text)
+        return json.dumps([item.upper() for item in items], ensure_ascii=False), len(text) // 4
+    return text.upper(), len(text) // 4
+
+
+def main():
+    configure_rate_limits({"Stub": {"rpm": 100000, "tpm": 100000000, "concurrency": 16}})
+    register_engine(EngineProvider(
+        "Stub", "benchmarks.bench_batch_translation", translate="translate_with_stub"))
+    args = ("Português", "Inglês", "neutro", "", "Stub", "key")
+
+    start = time.perf_counter()
+    for label in LABELS:
+        translate_text(label, *args)
+    per_item = time.perf_counter() - start
+
+    start = time.perf_counter()
+    translated, _ = translate_batch(LABELS, *args)
+    batched = time.perf_counter() - start
+    assert translated == [label.upper() for label in LABELS]
+
+    print(f"{len(LABELS)} labels")
+    print(f"{'mode':<16} {'seconds':>8} {'items/s':>9}")
+    print(f"{'one per item':<16} {per_item:>8.2f} {len(LABELS) / per_item:>9.1f}")
+    print(f"{'batched':<16} {batched:>8.2f} {len(LABELS) / batched:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""
+Benchmark chunked parallel translation against a single large request
+
+The simulated engines sleep for a fixed time regardless of input size,
+which hides the cost of long outputs. This benchmark swaps in a stub
+engine whose latency grows with the number of tokens, like a real model
+generating its output, and compares one request for the whole document
+with translate_text_chunked at several concurrency limits.
+"""
+import time
+
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services.chunker import estimate_tokens
+from services.translator import translate_text, translate_text_chunked
+
+# Stub engine timing: fixed overhead plus per-token generation time
+REQUEST_OVERHEAD = 0.05
+SECONDS_PER_TOKEN = 0.0005
+
+PARAGRAPH = (
+    "A tradução automática de documentos longos precisa preservar a estrutura "
+    "original. Cada parágrafo deve manter suas quebras de linha! Listas, títulos "
+    "e espaços em branco também precisam sobreviver à tradução.\n\n"
+)
+DOCUMENT = PARAGRAPH * 200
+
+
+def translate_with_stub(text, context, api_key):
+    """Stub engine with latency proportional to the text size"""
+    tokens = estimate_tokens(text)
+    time.sleep(REQUEST_OVERHEAD + tokens * SECONDS_PER_TOKEN)
+    return text.upper(), tokens
+
+
+def main():
+    configure_rate_limits({"Stub": {"rpm": 100000, "tpm": 100000000, "concurrency": 16}})
+    register_engine(EngineProvider(
+        "Stub", "benchmarks.bench_chunked_translation", translate="translate_with_stub"))
+    args = (DOCUMENT, "Português", "Inglês", "neutro", "", "Stub", "key")
+
+    start = time.perf_counter()
+    single, _ = translate_text(*args)
+    baseline = time.perf_counter() - start
+
+    print(f"Document: {len(DOCUMENT):,} chars, ~{estimate_tokens(DOCUMENT):,} tokens")
+    print(f"{'mode':<24} {'seconds':>8} {'speed-up':>9}")
+    print(f"{'single request':<24} {baseline:>8.2f} {1.0:>9.2f}")
+
+    for max_chunk_tokens, max_workers in [(800, 1), (800, 4), (800, 8), (400, 8)]:
+        start = time.perf_counter()
+        translated, _ = translate_text_chunked(
+            *args, max_chunk_tokens=max_chunk_tokens, max_workers=max_workers)
+        elapsed = time.perf_counter() - start
+
+        # Chunk boundaries must not change whitespace or line breaks
+        assert translated == single
+        label = f"chunks {max_chunk_tokens} x{max_workers}"
+        print(f"{label:<24} {elapsed:>8.2f} {baseline / elapsed:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark clipboard change detection: event-driven source vs polling
+
+Both sources watch the same in-process LocalClipboard stand-in, so the
+numbers compare detection latency and idle wakeups without depending on a
+system clipboard. With a real clipboard each polling wakeup also costs a
+pyperclip.paste() (a subprocess spawn on Linux).
+"""
+import threading
+import time
+
+from services.clipboard_sources import (
+    LocalClipboard, LocalClipboardSource, PollingClipboardSource
+)
+
+COPIES = 20
+COPY_SPACING = 0.2
+IDLE_SECONDS = 3.0
+
+
+def _run_source(source, clipboard, copies):
+    """Drive a source like ClipboardMonitor does and return its stats"""
+    running = True
+
+    def loop():
+        while running:
+            source.wait_for_change(0.5)
+
+    source.open()
+    source.wait_for_change(0)  # Consume the initial read
+    thread = threading.Thread(target=loop, daemon=True)
+    thread.start()
+
+    # Idle phase: nothing is copied
+    source.stats.reset()
+    cpu_start = time.process_time()
+    time.sleep(IDLE_SECONDS)
+    idle_cpu = time.process_time() - cpu_start
+    idle_wakeups = source.stats.snapshot()["wakeups"]
+
+    # Active phase: copy text at a fixed spacing
+    source.stats.reset()
+    for i in range(copies):
+        clipboard.copy(f"text {i}")
+        time.sleep(COPY_SPACING)
+
+    running = False
+    thread.join()
+    source.close()
+    return idle_cpu, idle_wakeups, source.stats.snapshot()
+
+
+def main():
+    print(f"{'source':<10} {'idle wakeups/s':>15} {'idle cpu ms':>12} "
+          f"{'changes':>8} {'avg ms':>8} {'max ms':>8}")
+
+    for name in ("local", "polling"):
+        clipboard = LocalClipboard()
+        if name == "local":
+            source = LocalClipboardSource(clipboard)
+        else:
+            source = PollingClipboardSource(
+                interval=0.5, reader=clipboard.paste, writer=clipboard.copy)
+
+        idle_cpu, idle_wakeups, stats = _run_source(source, clipboard, COPIES)
+        print(f"{name:<10} {idle_wakeups / IDLE_SECONDS:>15.2f} {idle_cpu * 1000:>12.2f} "
+              f"{stats['changes']:>8} {stats['avg_latency_ms']:>8.2f} "
+              f"{stats['max_latency_ms']:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Benchmark the prose/code content classifier
+
+Times classify_content on mixed Markdown (prose, fenced and indented code,
+URLs and identifiers) from 1 KB to 1 MB, then on prose and on code from
+100 B to 10 MB with and without the prose fast path, and compares the
+tokens sent for the whole document with the tokens sent by translate_mixed,
+which only sends the prose, using a stub engine that counts what it
+receives.
+"""
+import time
+
+from utils import text_analyzer
+
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services.chunker import estimate_tokens
+from services.translator import build_context, translate_mixed
+from utils.text_analyzer import classify_content
+
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+FAST_PATH_SIZES = [100, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7]
+
+PROSE = ("O relatório foi enviado ontem à tarde para a diretoria, com os números "
+         "do trimestre (vendas, custos e margem).\nPor favor, confirme o recebimento.\n")
+CODE = "def total(items):\n    return sum(item.price for item in items)\n\n"
+
+README = """## Configuração
+
+Instale as dependências e configure a chave da API antes de iniciar o tradutor.
+Veja https://example.com/docs/setup para mais detalhes sobre o arquivo config.json.
+
+```python
+from services.translator import translate_text
+
+translated, tokens = translate_text(text, "Português", "Inglês", "neutro", "", "OpenAI", key)
+print(translated)
+```
+
+Se a chamada falhar, verifique a variável OPENAI_API_KEY e o valor de api_key:
+
+    settings.api_key = os.environ["OPENAI_API_KEY"]
+    settings.save()
+
+O histórico é gravado automaticamente e pode ser exportado a qualquer momento.
+
+"""
+
+sent_tokens = []
+
+
+def translate_with_stub(text, context, api_key):
+    """Stub engine: records the tokens it receives and echoes the text"""
+    sent_tokens.append(estimate_tokens(text) + estimate_tokens(context))
+    return text, 0
+
+
+def main():
+    configure_rate_limits({"Stub": {"rpm": 100000, "tpm": 100000000, "concurrency": 16}})
+    register_engine(EngineProvider(
+        "Stub", __name__, translate="translate_with_stub"))
+
+    analysis = classify_content(README)
+    print(f"sample document: {analysis.kind}")
+    for line in analysis.explain():
+        print(f"  {line}")
+
+    print(f"{'size':>9} {'regions':>8} {'ms':>9} {'MB/s':>7}")
+    for size in SIZES:
+        text = README * (size // len(README) + 1)
+        start = time.perf_counter()
+        analysis = classify_content(text)
+        elapsed = time.perf_counter() - start
+        print(f"{len(text):>9} {len(analysis.regions):>8} {elapsed * 1000:>9.2f} "
+              f"{len(text) / elapsed / 1e6:>7.1f}")
+
+    may_contain_code = text_analyzer.may_contain_code
+    print(f"{'input':<6} {'size':>9} {'full ms':>9} {'fast ms':>9}")
+    for name, sample in (("prose", PROSE), ("code", CODE)):
+        for size in FAST_PATH_SIZES:
+            text = (sample * (size // len(sample) + 1))[:size]
+            text_analyzer.may_contain_code = lambda text: True
+            start = time.perf_counter()
+            full = classify_content(text)
+            full_elapsed = time.perf_counter() - start
+            text_analyzer.may_contain_code = may_contain_code
+            start = time.perf_counter()
+            fast = classify_content(text)
+            fast_elapsed = time.perf_counter() - start
+            assert fast.kind == full.kind
+            print(f"{name:<6} {size:>9} {full_elapsed * 1000:>9.2f} {fast_elapsed * 1000:>9.2f}")
+
+    args = ("Português", "Inglês", "neutro", "", "Stub", "key")
+    text = README * 20
+    translated, _ = translate_mixed(text, *args)
+    assert translated == text
+    whole = estimate_tokens(text) + estimate_tokens(build_context(*args[:4]))
+    print(f"tokens sent for {len(text)} chars: whole text {whole}, "
+          f"prose only {sum(sent_tokens)} ({sum(sent_tokens) / whole:.0%})")
+
+
+if __name__ == "__main__":
+    main()
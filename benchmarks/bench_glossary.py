@@ -0,0 +1,84 @@
+"""
+Benchmark glossary matching with 100,000 terms
+
+Times building the matcher and finding terms in text from 1 KB to 1 MB,
+against checking every term in turn, and compares the prompt sent with
+only the terms found to pasting the whole glossary into the context.
+"""
+import os
+import random
+import tempfile
+import time
+
+from services.glossary import Glossary, format_terms
+from utils.token_estimator import estimate_tokens
+
+TERMS = 100000
+SIZES = [10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6]
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "sun", "va", "dre", "po", "li", "nar", "es", "tu",
+             "bra", "ven", "co", "ri", "gal", "mo", "den", "ax"]
+
+
+def make_word(rng):
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+
+
+def make_text(rng, terms, size):
+    """Prose of made-up words with a glossary term every 40 words or so"""
+    words = []
+    length = 0
+    while length < size:
+        word = rng.choice(terms)[0] if rng.random() < 0.025 else make_word(rng)
+        words.append(word)
+        length += len(word) + 1
+    return " ".join(words)[:size]
+
+
+def main():
+    rng = random.Random(13)
+    terms = {}
+    while len(terms) < TERMS:
+        source = " ".join(make_word(rng) for _ in range(rng.randint(1, 3)))
+        terms[source] = (source, source.upper(), "")
+    terms = list(terms.values())
+
+    with tempfile.TemporaryDirectory() as directory:
+        glossary = Glossary(os.path.join(directory, "glossary.tsv"))
+        start = time.perf_counter()
+        for source, target, note in terms:
+            glossary.add(source, target, note)
+        glossary.find_terms("")  # Builds the matcher
+        print(f"{TERMS:,} terms added and matcher built in {time.perf_counter() - start:.2f}s")
+
+        start = time.perf_counter()
+        glossary.save()
+        reloaded = Glossary(glossary.path)
+        print(f"saved and reloaded {len(reloaded):,} terms in {time.perf_counter() - start:.2f}s")
+
+    print(f"{'input':>9} {'terms found':>12} {'matcher ms':>11} {'us/KB':>7}")
+    for size in SIZES:
+        text = make_text(rng, terms, size)
+        repeats = max(1, 10 ** 6 // size)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            found = glossary.find_terms(text)
+        elapsed = (time.perf_counter() - start) / repeats
+        print(f"{size:>9,} {len(found):>12,} {elapsed * 1000:>11.2f} {elapsed * 10 ** 9 / size:>7.1f}")
+
+    text = make_text(rng, terms, 10 ** 4)
+    folded = text.casefold()
+    start = time.perf_counter()
+    naive = [source for source, _, _ in terms if source in folded]
+    print(f"checking each term in a 10 KB text: {(time.perf_counter() - start) * 1000:.1f} ms "
+          f"({len(naive):,} substring hits)")
+
+    text = make_text(rng, terms, 600)
+    found = glossary.find_terms(text)
+    whole = "\n".join(f"{source} = {target}" for source, target, _ in terms)
+    print(f"prompt for a 600-character text: whole glossary ~{estimate_tokens(whole):,} tokens, "
+          f"terms found ~{estimate_tokens(format_terms(found)):,} tokens ({len(found)} terms)")
+
+
+if __name__ == "__main__":
+    main()
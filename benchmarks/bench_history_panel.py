@@ -0,0 +1,113 @@
+"""
+Benchmark adding 100,000 entries to the translation history
+
+Times the history buffer and the rendering of the visible window for each
+block of 10,000 entries, to show the cost of an entry stays flat as the
+history grows, and compares reading a window from the middle of the buffer
+with a deque. When a display is available, the panel itself is timed too.
+"""
+import collections
+import random
+import time
+
+from ui.components.history_panel import format_entry
+from utils.ring_buffer import RingBuffer
+
+ENTRIES = 100000
+BLOCK = 10000
+CAPACITIES = [1000, 100000]
+VISIBLE_ROWS = 3
+
+WORDS = ("the meeting was moved to thursday afternoon because the client asked "
+         "for more time to review the contract and the attached budget").split()
+
+
+def synthetic_entries(count, seed=3):
+    """History entries with texts from a few words to a few paragraphs"""
+    rng = random.Random(seed)
+    for i in range(count):
+        length = rng.choice((5, 20, 60, 400))
+        original = " ".join(rng.choice(WORDS) for _ in range(length))
+        yield {
+            'id': i,
+            'timestamp': "12:00:00",
+            'source_lang': "Inglês",
+            'target_lang': "Português",
+            'original': original,
+            'translated': original.upper(),
+            'cached': i % 5 == 0
+        }
+
+
+def time_inserts(capacity, entries):
+    """Time appending entries and formatting the newest rows after each one"""
+    history = RingBuffer(capacity)
+    blocks = []
+    start = time.perf_counter()
+    for i, entry in enumerate(entries, 1):
+        history.append(entry)
+        first = max(0, len(history) - VISIBLE_ROWS)
+        for index in range(first, len(history)):
+            format_entry(history[index])
+        if i % BLOCK == 0:
+            now = time.perf_counter()
+            blocks.append((now - start) / BLOCK)
+            start = now
+    return history, blocks
+
+
+def time_window_reads(sequence, repeats=2000):
+    """Time reading the visible rows from the middle of a sequence"""
+    middle = len(sequence) // 2
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for index in range(middle, middle + VISIBLE_ROWS):
+            sequence[index]
+    return (time.perf_counter() - start) / repeats
+
+
+def time_panel(entries):
+    """Time the panel itself, if Tk can open a window"""
+    try:
+        import tkinter as tk
+        from ui.components.history_panel import HistoryPanelComponent
+        root = tk.Tk()
+    except Exception as e:
+        print(f"panel: skipped ({str(e)})")
+        return
+
+    panel = HistoryPanelComponent(root)
+    panel.pack()
+    start = time.perf_counter()
+    for i, entry in enumerate(entries, 1):
+        panel.add_entry(entry['source_lang'], entry['target_lang'], entry['original'],
+                        entry['translated'], cached=entry['cached'])
+        root.update()
+        if i % BLOCK == 0:
+            now = time.perf_counter()
+            print(f"panel, entries {i - BLOCK + 1:>7,}-{i:<7,} {(now - start) / BLOCK * 10 ** 6:>8.1f} us/entry")
+            start = now
+    root.destroy()
+
+
+def main():
+    entries = list(synthetic_entries(ENTRIES))
+
+    for capacity in CAPACITIES:
+        history, blocks = time_inserts(capacity, entries)
+        print(f"ring buffer of {capacity:,}: "
+              + " ".join(f"{elapsed * 10 ** 6:.1f}" for elapsed in blocks)
+              + " us/entry per block of 10,000")
+
+    full = RingBuffer(ENTRIES)
+    for entry in entries:
+        full.append(entry)
+    bounded = collections.deque(entries, maxlen=ENTRIES)
+    print(f"window read from the middle: ring buffer {time_window_reads(full) * 10 ** 6:.2f} us, "
+          f"deque {time_window_reads(bounded) * 10 ** 6:.2f} us")
+
+    time_panel(entries)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark the saved translation history at 1,000,000 entries
+
+Fills a history database with synthetic translations, then times opening
+it and loading the newest page (what startup does), full-text searches
+from common to rare words, appending an entry, retention and clearing the
+history. The database is written to a temporary directory.
+"""
+import os
+import random
+import tempfile
+import time
+
+from services.history_store import HistoryStore
+
+ENTRIES = 1000000
+PAGE = 1000
+
+WORDS = ("the meeting was moved to thursday afternoon because client asked for more "
+         "time review contract attached budget invoice shipment delayed customs "
+         "warehouse payment overdue reminder schedule call tomorrow morning").split()
+RARE_WORDS = [f"projeto{i}" for i in range(1000)]
+
+
+def synthetic_rows(count, seed=5):
+    """Rows for the history table, one minute apart"""
+    rng = random.Random(seed)
+    start = time.time() - count * 60
+    for i in range(count):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(4, 30))]
+        if rng.random() < 0.1:
+            words.append(rng.choice(RARE_WORDS))
+        original = " ".join(words)
+        yield (start + i * 60, "Inglês", "Português", original, original.upper(), int(i % 5 == 0))
+
+
+def time_call(function, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "translation_history.db")
+        store = HistoryStore(db_file)
+        start = time.perf_counter()
+        with store._lock:
+            store._db.executemany(
+                "INSERT INTO history (created_at, source_lang, target_lang, original, "
+                "translated, cached) VALUES (?, ?, ?, ?, ?, ?)", synthetic_rows(ENTRIES))
+            store._db.commit()
+        store.close()
+        print(f"filled {ENTRIES:,} entries in {time.perf_counter() - start:.1f}s, "
+              f"{os.path.getsize(db_file) / 2 ** 20:.0f} MB")
+
+        start = time.perf_counter()
+        store = HistoryStore(db_file)
+        page = store.get_recent(PAGE)
+        print(f"{'open + newest page':<28} {(time.perf_counter() - start) * 1000:>8.2f} ms   ({len(page):,})")
+
+        searches = [
+            ("common word", "meeting"),
+            ("two common words", "invoice overdue"),
+            ("prefix while typing", "warehou"),
+            ("rare word", "projeto417"),
+            ("rare word + common word", "projeto417 budget"),
+            ("no match", "inexistente"),
+        ]
+        for name, query in searches:
+            results, elapsed = time_call(lambda: store.search(query, limit=500))
+            print(f"{name:<28} {elapsed * 1000:>8.2f} ms   ({len(results):,})")
+
+        _, elapsed = time_call(lambda: store.add("Inglês", "Português", "New text", "Novo texto"), 200)
+        print(f"{'add':<28} {elapsed * 1000:>8.2f} ms")
+
+        store.max_entries = ENTRIES - 10000
+        start = time.perf_counter()
+        deleted = store.apply_retention()
+        print(f"{'retention by count':<28} {(time.perf_counter() - start) * 1000:>8.2f} ms   "
+              f"({deleted:,} deleted)")
+
+        start = time.perf_counter()
+        store.clear()
+        print(f"{'clear':<28} {(time.perf_counter() - start) * 1000:>8.2f} ms   "
+              f"({len(store.search('meeting')):,} still found)")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
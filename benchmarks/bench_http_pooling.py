@@ -0,0 +1,104 @@
+"""
+Benchmark per-request latency with and without the pooled API session
+
+Starts a local stub of the chat completions endpoint and sends the same
+requests through module-level requests.post (a new connection every time)
+and through the shared SessionManager (keep-alive connection pool).
+
+Pass a certificate and key file to benchmark over HTTPS, where the savings
+from skipping the TLS handshake are much larger:
+    python -m benchmarks.bench_http_pooling cert.pem key.pem
+"""
+import json
+import socket
+import ssl
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from services.api.session import SessionManager
+
+REQUESTS = 200
+
+STUB_RESPONSE = json.dumps({
+    "choices": [{"message": {"content": "Hello world"}}],
+    "usage": {"total_tokens": 12}
+}).encode("utf-8")
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every POST like the chat completions endpoint"""
+
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; avoid Nagle/delayed-ACK stalls
+        self.connection.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(STUB_RESPONSE)))
+        self.end_headers()
+        self.wfile.write(STUB_RESPONSE)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _start_server(cert_file=None, key_file=None):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    scheme = "http"
+    if cert_file:
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_file, key_file)
+        server.socket = context.wrap_socket(server.socket, server_side=True)
+        scheme = "https"
+
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    return server, f"{scheme}://127.0.0.1:{server.server_address[1]}/v1/chat/completions"
+
+
+def _measure(send, url):
+    payload = {"model": "gpt-3.5-turbo", "messages": [{"role": "user", "content": "Olá"}]}
+    timings = []
+    for _ in range(REQUESTS):
+        start = time.perf_counter()
+        response = send(url, json=payload, timeout=10, verify=False)
+        response.json()
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    cert_file = sys.argv[1] if len(sys.argv) > 2 else None
+    key_file = sys.argv[2] if len(sys.argv) > 2 else None
+    server, url = _start_server(cert_file, key_file)
+    requests.packages.urllib3.disable_warnings()
+
+    manager = SessionManager()
+    results = {
+        "requests.post": _measure(requests.post, url),
+        "pooled session": _measure(manager.post, url)
+    }
+    manager.close()
+    server.shutdown()
+
+    print(f"{REQUESTS} requests to {url}")
+    print(f"{'client':<16} {'mean ms':>9} {'p50 ms':>9} {'p95 ms':>9}")
+    for name, timings in results.items():
+        timings.sort()
+        p95 = timings[int(len(timings) * 0.95) - 1]
+        print(f"{name:<16} {statistics.mean(timings) * 1000:>9.3f} "
+              f"{statistics.median(timings) * 1000:>9.3f} {p95 * 1000:>9.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark building system prompts and compare the size of each template
+
+Times building the prompt of a request from scratch against looking up the
+compiled one, then simulates requests with the compact template tried on
+half of them, some with glossary terms appended, and prints the prompt
+size reported for each template.
+"""
+import random
+import time
+
+from services.prompts import PromptBuilder, TEMPLATES
+from utils.token_estimator import estimate_tokens
+
+BUILDS = 200000
+REQUESTS = 2000
+
+CONTEXT = ("Textos de suporte ao cliente de uma loja online. Mantenha nomes de "
+           "produtos e códigos de pedido sem traduzir.")
+
+# Text and the glossary terms appended for it
+TEXTS = [
+    ("Your order has been shipped and should arrive within three business days.",
+     "Use estes termos do glossário: \"order\" → \"pedido\"."),
+    ("Please restart the application and try again.", ""),
+    ("We could not process your payment. Check your card details.",
+     "Use estes termos do glossário: \"card\" → \"cartão\"."),
+    ("Thanks for reaching out! A specialist will get back to you shortly.", ""),
+]
+
+
+def old_build(source_lang, target_lang, tone, context):
+    """The prompt as it was built for every request before templates"""
+    return f"{context} Traduza de {source_lang} para {target_lang} em tom {tone}."
+
+
+def main():
+    start = time.perf_counter()
+    for _ in range(BUILDS):
+        old_build("Inglês", "Português", "neutro", CONTEXT)
+    old = (time.perf_counter() - start) / BUILDS
+
+    builder = PromptBuilder()
+    start = time.perf_counter()
+    for _ in range(BUILDS):
+        builder.build("Inglês", "Português", "neutro", CONTEXT)
+    compiled = (time.perf_counter() - start) / BUILDS
+
+    start = time.perf_counter()
+    for _ in range(BUILDS):
+        estimate_tokens(old_build("Inglês", "Português", "neutro", CONTEXT))
+    estimated = (time.perf_counter() - start) / BUILDS
+    print(f"prompt built per request: {old * 10 ** 6:.2f} us, "
+          f"{estimated * 10 ** 6:.2f} us with its size estimated")
+    print(f"compiled prompt looked up: {compiled * 10 ** 6:.2f} us with its size "
+          f"({builder.get_stats()['compiled']})")
+
+    print(f"{'template':<10} {'instructions':>13} {'with context':>13}")
+    for name in TEMPLATES:
+        prompt = builder.build("Inglês", "Português", "neutro", CONTEXT, template=name)
+        print(f"{name:<10} {prompt.instruction_tokens:>13} {prompt.tokens:>13}")
+
+    rng = random.Random(5)
+    random.seed(5)
+    trial = PromptBuilder("default", "compact", 0.5)
+    for _ in range(REQUESTS):
+        text, additions = rng.choice(TEXTS)
+        prompt = trial.build("Inglês", "Português", "neutro", CONTEXT, additions=additions)
+        trial.record(prompt, prompt.tokens + estimate_tokens(text), prompt_caching=True)
+    for name, stats in trial.get_stats()["templates"].items():
+        print(f"{name:<10} {stats['requests']:>5} requests, "
+              f"{stats['avg_prompt_tokens']:.1f} prompt tokens on average, "
+              f"{stats['cacheable_tokens']:,} cacheable")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Benchmark recording token usage: JSON rewrite versus the ledger
+
+The original counter rewrote token_usage.json after every translation.
+The ledger appends a row instead; this times a record against ledgers
+already holding up to 100,000 uncompacted rows, to show the cost doesn't
+grow with the history. Files are written to a temporary directory.
+"""
+import json
+import os
+import tempfile
+import time
+from datetime import date
+
+from utils.token_counter import TokenCounter
+
+RECORDS = 2000
+HISTORY_SIZES = [0, 10 ** 4, 10 ** 5]
+ENGINES = ["OpenAI", "Gemini 2.0", "DeepSeek V3"]
+
+
+def legacy_add_tokens(path, monthly_usage, count, engine):
+    """The original add_tokens: update the totals and rewrite the file"""
+    month = date.today().strftime("%Y-%m")
+    engines = monthly_usage.setdefault(month, {})
+    engines[engine] = engines.get(engine, 0) + count
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(monthly_usage, f, indent=4)
+
+
+def time_records(record):
+    start = time.perf_counter()
+    for i in range(RECORDS):
+        record(100 + i % 50, ENGINES[i % len(ENGINES)])
+    return (time.perf_counter() - start) / RECORDS
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        # Ten years of monthly totals, as the old file would hold
+        monthly_usage = {f"{2016 + i // 12}-{i % 12 + 1:02d}": {engine: 1000 for engine in ENGINES}
+                         for i in range(120)}
+        path = os.path.join(directory, "token_usage.json")
+        legacy = time_records(lambda count, engine: legacy_add_tokens(path, monthly_usage, count, engine))
+        print(f"{'json rewrite':<24} {legacy * 10 ** 6:>8.1f} us/record")
+
+        for history in HISTORY_SIZES:
+            db_file = os.path.join(directory, f"ledger_{history}.db")
+            counter = TokenCounter(db_file)
+            counter.COMPACT_INTERVAL = history + RECORDS + 1
+            with counter._lock:
+                counter._db.executemany(
+                    "INSERT INTO usage_log (month, engine, tokens, created_at) VALUES (?, ?, ?, ?)",
+                    (("2025-01", ENGINES[i % len(ENGINES)], 100, 0.0) for i in range(history)))
+                counter._db.commit()
+
+            ledger = time_records(counter.add_tokens)
+            start = time.perf_counter()
+            counter.compact()
+            compact = time.perf_counter() - start
+            counter.close()
+            print(f"{f'ledger, {history:,} rows':<24} {ledger * 10 ** 6:>8.1f} us/record   "
+                  f"compaction {compact * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
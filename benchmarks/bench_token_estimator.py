@@ -0,0 +1,77 @@
+"""
+Benchmark local token counting on text from 1 KB to 8 MB
+
+Times the heuristic estimator on English and Portuguese prose, code and
+Japanese, and compares its counts with the old four-characters-per-token
+rule. When tiktoken and the cl100k_base vocabulary are available, the BPE
+count is timed too and used as the reference for both estimates.
+"""
+import os
+import time
+
+from services.chunker import split_text
+from utils.token_estimator import _get_encoding, estimate_tokens
+
+SIZES = [10 ** 3, 10 ** 5, 10 ** 6, 8 * 10 ** 6]
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "..", "utils", "data", "corpus")
+
+CODE = ("def handler(event, context):\n"
+        "    items = [item for item in event[\"records\"] if item.get(\"id\")]\n"
+        "    return {\"status\": 200, \"count\": len(items)}\n\n")
+JAPANESE = "会議は明日の午前十時に二階の会議室で行われます。資料を持ってきてください。\n"
+
+
+def read_corpus(code):
+    with open(os.path.join(CORPUS_DIR, f"{code}.txt"), "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def repeat_to(sample, size):
+    return (sample * (size // len(sample) + 1))[:size]
+
+
+def time_call(function, text):
+    repeats = max(1, 10 ** 6 // len(text))
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function(text)
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    bpe = _get_encoding("cl100k_base")
+    if bpe is None:
+        print("tiktoken vocabulary not available: timing the heuristic only")
+
+    samples = [("english", read_corpus("en")), ("portuguese", read_corpus("pt")),
+               ("code", CODE), ("japanese", JAPANESE)]
+
+    header = f"{'input':<11} {'size':>9} {'tokens':>10} {'chars/4':>10} {'MB/s':>7}"
+    if bpe is not None:
+        header += f" {'bpe':>10} {'bpe MB/s':>9} {'error':>7} {'chars/4 error':>14}"
+    print(header)
+
+    for name, sample in samples:
+        for size in SIZES:
+            text = repeat_to(sample, size)
+            mb = len(text.encode("utf-8")) / 10 ** 6
+            tokens, elapsed = time_call(estimate_tokens, text)
+            row = f"{name:<11} {size:>9} {tokens:>10,} {len(text) // 4:>10,} {mb / elapsed:>7.1f}"
+            if bpe is not None:
+                reference, bpe_elapsed = time_call(lambda value: len(bpe.encode_ordinary(value)), text)
+                row += (f" {reference:>10,} {mb / bpe_elapsed:>9.1f}"
+                        f" {(tokens - reference) / reference:>+7.1%}"
+                        f" {(len(text) // 4 - reference) / reference:>+14.1%}")
+            print(row)
+
+    document = repeat_to(read_corpus("en") + CODE, 4 * 10 ** 6)
+    start = time.perf_counter()
+    chunks = split_text(document, 800)
+    elapsed = time.perf_counter() - start
+    print(f"split_text: {len(document) / 10 ** 6:.0f} MB into {len(chunks):,} chunks "
+          f"of at most 800 tokens in {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
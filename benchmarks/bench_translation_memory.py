@@ -0,0 +1,104 @@
+"""
+Benchmark translation memory lookups over 500,000 segments
+
+Fills a history database with synthetic sentences, indexes them, then
+times lookups of texts that differ from a stored one only in numbers, in
+one word or in punctuation, and of new text with no match. The database
+is written to a temporary directory.
+"""
+import os
+import random
+import statistics
+import tempfile
+import time
+
+from services.history_store import HistoryStore
+from services.translation_memory import TranslationMemory
+
+SEGMENTS = 500000
+LOOKUPS = 500
+
+SYLLABLES = ["ka", "lo", "mi", "ter", "sun", "va", "dre", "po", "li", "nar", "es", "tu",
+             "bra", "ven", "co", "ri", "gal", "mo", "den", "ax"]
+
+
+def make_vocabulary(rng, size=5000):
+    return ["".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 4))) for _ in range(size)]
+
+
+def make_sentence(rng, vocabulary):
+    words = [rng.choice(vocabulary) for _ in range(rng.randint(6, 20))]
+    if rng.random() < 0.5:
+        words.insert(rng.randrange(len(words)), str(rng.randint(1, 9999)))
+    return " ".join(words).capitalize() + "."
+
+
+def change_number(sentence, rng):
+    words = sentence.split()
+    numbers = [i for i, word in enumerate(words) if word.rstrip(".").isdigit()]
+    if not numbers:
+        return None
+    index = numbers[0]
+    words[index] = str(rng.randint(10000, 99999)) + ("." if words[index].endswith(".") else "")
+    return " ".join(words)
+
+
+def change_word(sentence, rng, vocabulary):
+    words = sentence.split()
+    words[rng.randrange(len(words))] = rng.choice(vocabulary)
+    return " ".join(words)
+
+
+def time_lookups(memory, texts):
+    times, found = [], 0
+    for text in texts:
+        start = time.perf_counter()
+        match = memory.lookup(text, "Português")
+        times.append(time.perf_counter() - start)
+        found += match is not None
+    times.sort()
+    return statistics.median(times), times[int(len(times) * 0.95)], found
+
+
+def main():
+    rng = random.Random(11)
+    vocabulary = make_vocabulary(rng)
+    sentences = [make_sentence(rng, vocabulary) for _ in range(SEGMENTS)]
+
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "translation_history.db")
+        store = HistoryStore(db_file)
+        with store._lock:
+            store._db.executemany(
+                "INSERT INTO history (created_at, source_lang, target_lang, original, "
+                "translated, cached) VALUES (?, 'Inglês', 'Português', ?, ?, 0)",
+                ((i, sentence, sentence.upper()) for i, sentence in enumerate(sentences)))
+            store._db.commit()
+
+        memory = TranslationMemory(store)
+        start = time.perf_counter()
+        memory.sync()
+        elapsed = time.perf_counter() - start
+        print(f"indexed {SEGMENTS:,} segments in {elapsed:.1f}s "
+              f"({elapsed / SEGMENTS * 10 ** 6:.0f} us each), "
+              f"{os.path.getsize(db_file) / 2 ** 20:.0f} MB with the history")
+
+        samples = rng.sample(sentences, LOOKUPS * 2)
+        cases = [
+            ("numbers changed", [text for text in (change_number(s, rng) for s in samples)
+                                 if text][:LOOKUPS]),
+            ("one word changed", [change_word(s, rng, vocabulary) for s in samples[:LOOKUPS]]),
+            ("punctuation changed", [s.rstrip(".") + "!" for s in samples[:LOOKUPS]]),
+            ("new text", [make_sentence(rng, vocabulary) for _ in range(LOOKUPS)]),
+        ]
+        print(f"{'lookup':<22} {'p50 ms':>8} {'p95 ms':>8} {'matched':>9}")
+        for name, texts in cases:
+            p50, p95, found = time_lookups(memory, texts)
+            print(f"{name:<22} {p50 * 1000:>8.2f} {p95 * 1000:>8.2f} {found:>5}/{len(texts)}")
+        print(memory.get_stats())
+        memory.close()
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark usage queries over a year of per-request records
+
+Fills a ledger with a year of translations across engines and language
+pairs, then times opening it, folding the rows into daily totals and the
+aggregate queries the UI and budgets use. The ledger is written to a
+temporary directory.
+"""
+import os
+import random
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from utils.token_counter import TokenCounter
+
+REQUESTS_PER_DAY = 500
+DAYS = 365
+ENGINES = [("OpenAI", "gpt-3.5-turbo"), ("Gemini 2.0", "gemini-2.0-flash"),
+           ("DeepSeek V3", "deepseek-chat")]
+PAIRS = [("Inglês", "Português"), ("Português", "Inglês"), ("Espanhol", "Português"),
+         ("Alemão", "Inglês"), ("Francês", "Português"), ("Japonês", "Inglês")]
+
+
+def year_of_rows(seed=7):
+    """Rows for the requests table, one day at a time"""
+    rng = random.Random(seed)
+    first_day = datetime.now() - timedelta(days=DAYS - 1)
+    for day_offset in range(DAYS):
+        day = first_day + timedelta(days=day_offset)
+        for _ in range(REQUESTS_PER_DAY):
+            engine, model = rng.choice(ENGINES)
+            source_lang, target_lang = rng.choice(PAIRS)
+            cached = rng.random() < 0.2
+            prompt = 0 if cached else rng.randint(40, 900)
+            yield (day.timestamp(), day.strftime("%Y-%m-%d"), engine, model, source_lang,
+                   target_lang, prompt, int(prompt * 1.2), rng.uniform(300, 3000),
+                   int(cached), prompt * 4, prompt * 5)
+
+
+def time_call(function, repeats=20):
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = function()
+    return result, (time.perf_counter() - start) / repeats
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        db_file = os.path.join(directory, "token_usage.db")
+        counter = TokenCounter(db_file)
+        with counter._lock:
+            counter._db.executemany(
+                "INSERT INTO requests (created_at, day, engine, model, source_lang, "
+                "target_lang, prompt_tokens, completion_tokens, latency_ms, cached, "
+                "bytes_in, bytes_out) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                year_of_rows())
+            counter._db.commit()
+        counter.close()
+        print(f"ledger: {REQUESTS_PER_DAY * DAYS:,} requests over {DAYS} days")
+
+        start = time.perf_counter()
+        counter = TokenCounter(db_file)
+        print(f"{'open (rows already folded)':<32} {(time.perf_counter() - start) * 1000:>9.2f} ms")
+
+        month = datetime.now().strftime("%Y-%m")
+        queries = [
+            ("tokens by day", lambda: counter.query_usage(("day",))),
+            ("tokens by engine", lambda: counter.query_usage(("engine",))),
+            ("tokens by language pair", lambda: counter.query_usage(("language_pair",))),
+            ("engine x month", lambda: counter.query_usage(("engine", "month"))),
+            ("one engine, last 30 days", lambda: counter.query_usage(
+                ("day",), start=(datetime.now() - timedelta(days=29)).strftime("%Y-%m-%d"),
+                engine="OpenAI")),
+            ("current month total", lambda: counter.get_current_month_usage()),
+            ("records of one day (index)", lambda: counter.get_records(
+                start=f"{month}-01", end=f"{month}-01", engine="OpenAI")),
+        ]
+        for name, query in queries:
+            result, elapsed = time_call(query)
+            size = len(result) if hasattr(result, "__len__") else result
+            print(f"{name:<32} {elapsed * 1000:>9.2f} ms   ({size:,})")
+
+        start = time.perf_counter()
+        for _ in range(1000):
+            counter.record_request("OpenAI", "gpt-3.5-turbo", "Inglês", "Português", 100, 120, 0.8)
+        elapsed = (time.perf_counter() - start) / 1000
+        print(f"{'record_request':<32} {elapsed * 1000:>9.2f} ms per call")
+        counter.close()
+
+
+if __name__ == "__main__":
+    main()
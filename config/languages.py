@@ -23,6 +23,13 @@ def get_languages():
         "Turco"
     ]
 
+# Source language option that lets the translator detect the language
+AUTO_DETECT = "Detectar idioma"
+
+def get_source_languages():
+    """Return the source language options, automatic detection first"""
+    return [AUTO_DETECT] + get_languages()
+
 # Mapping between language names and language codes
 LANGUAGE_CODES = {
     "Português": "pt",
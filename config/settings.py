@@ -18,7 +18,46 @@ class Settings:
         self.api_engine = "OpenAI"
         self.api_key = ""
         self.tone = "neutro"
-        self.token_count = 0
+        self.clipboard_backend = "auto"
+        self.translation_workers = 2
+        self.translation_queue_size = 8
+        self.stale_policy = "drop"
+        self.cache_enabled = True
+        self.cache_max_entries = 10000
+        self.cache_max_age_days = 30
+        self.http_pool_size = 8
+        self.http_connect_timeout = 5
+        self.http_read_timeout = 30
+        self.prewarm_connections = True
+        self.stream_translations = True
+        self.chunk_max_tokens = 800
+        self.chunk_concurrency = 4
+        self.rate_limits = {}
+        self.retry_max_attempts = 4
+        self.retry_deadline = 60
+        self.hedge_requests = False
+        self.failover_chain = []
+        self.api_keys = {}
+        self.breaker_failure_threshold = 5
+        self.breaker_recovery_timeout = 30
+        self.skip_target_language = True
+        self.language_confidence = 0.9
+        self.budgets = {}
+        self.budget_warning_ratio = 0.8
+        self.engine_prices = {}
+        self.ui_update_interval = 50
+        self.history_max_entries = 1000
+        self.history_persist = True
+        self.history_retention_days = 365
+        self.history_retention_entries = 1000000
+        self.history_retention_mb = 500
+        self.tm_enabled = True
+        self.tm_min_similarity = 0.7
+        self.tm_reuse = True
+        self.glossary_enabled = True
+        self.prompt_template = "default"
+        self.prompt_trial_template = ""
+        self.prompt_trial_share = 0.0
         
         # Load existing settings if available
         self.load()
@@ -38,7 +77,58 @@ class Settings:
                 self.api_engine = data.get("api_engine", self.api_engine)
                 self.api_key = data.get("api_key", self.api_key)
                 self.tone = data.get("tone", self.tone)
-                self.token_count = data.get("token_count", self.token_count)
+                self.clipboard_backend = data.get("clipboard_backend", self.clipboard_backend)
+                self.translation_workers = data.get("translation_workers", self.translation_workers)
+                self.translation_queue_size = data.get(
+                    "translation_queue_size", self.translation_queue_size)
+                self.stale_policy = data.get("stale_policy", self.stale_policy)
+                self.cache_enabled = data.get("cache_enabled", self.cache_enabled)
+                self.cache_max_entries = data.get("cache_max_entries", self.cache_max_entries)
+                self.cache_max_age_days = data.get("cache_max_age_days", self.cache_max_age_days)
+                self.http_pool_size = data.get("http_pool_size", self.http_pool_size)
+                self.http_connect_timeout = data.get(
+                    "http_connect_timeout", self.http_connect_timeout)
+                self.http_read_timeout = data.get("http_read_timeout", self.http_read_timeout)
+                self.prewarm_connections = data.get(
+                    "prewarm_connections", self.prewarm_connections)
+                self.stream_translations = data.get(
+                    "stream_translations", self.stream_translations)
+                self.chunk_max_tokens = data.get("chunk_max_tokens", self.chunk_max_tokens)
+                self.chunk_concurrency = data.get("chunk_concurrency", self.chunk_concurrency)
+                self.rate_limits = data.get("rate_limits", self.rate_limits)
+                self.retry_max_attempts = data.get("retry_max_attempts", self.retry_max_attempts)
+                self.retry_deadline = data.get("retry_deadline", self.retry_deadline)
+                self.hedge_requests = data.get("hedge_requests", self.hedge_requests)
+                self.failover_chain = data.get("failover_chain", self.failover_chain)
+                self.api_keys = data.get("api_keys", self.api_keys)
+                self.breaker_failure_threshold = data.get(
+                    "breaker_failure_threshold", self.breaker_failure_threshold)
+                self.breaker_recovery_timeout = data.get(
+                    "breaker_recovery_timeout", self.breaker_recovery_timeout)
+                self.skip_target_language = data.get(
+                    "skip_target_language", self.skip_target_language)
+                self.language_confidence = data.get(
+                    "language_confidence", self.language_confidence)
+                self.budgets = data.get("budgets", self.budgets)
+                self.budget_warning_ratio = data.get(
+                    "budget_warning_ratio", self.budget_warning_ratio)
+                self.engine_prices = data.get("engine_prices", self.engine_prices)
+                self.ui_update_interval = data.get("ui_update_interval", self.ui_update_interval)
+                self.history_max_entries = data.get("history_max_entries", self.history_max_entries)
+                self.history_persist = data.get("history_persist", self.history_persist)
+                self.history_retention_days = data.get(
+                    "history_retention_days", self.history_retention_days)
+                self.history_retention_entries = data.get(
+                    "history_retention_entries", self.history_retention_entries)
+                self.history_retention_mb = data.get("history_retention_mb", self.history_retention_mb)
+                self.tm_enabled = data.get("tm_enabled", self.tm_enabled)
+                self.tm_min_similarity = data.get("tm_min_similarity", self.tm_min_similarity)
+                self.tm_reuse = data.get("tm_reuse", self.tm_reuse)
+                self.glossary_enabled = data.get("glossary_enabled", self.glossary_enabled)
+                self.prompt_template = data.get("prompt_template", self.prompt_template)
+                self.prompt_trial_template = data.get(
+                    "prompt_trial_template", self.prompt_trial_template)
+                self.prompt_trial_share = data.get("prompt_trial_share", self.prompt_trial_share)
         except Exception as e:
             print(f"Error loading settings: {str(e)}")
     
@@ -52,7 +142,46 @@ class Settings:
                     "api_engine": self.api_engine,
                     "api_key": self.api_key,
                     "tone": self.tone,
-                    "token_count": self.token_count
+                    "clipboard_backend": self.clipboard_backend,
+                    "translation_workers": self.translation_workers,
+                    "translation_queue_size": self.translation_queue_size,
+                    "stale_policy": self.stale_policy,
+                    "cache_enabled": self.cache_enabled,
+                    "cache_max_entries": self.cache_max_entries,
+                    "cache_max_age_days": self.cache_max_age_days,
+                    "http_pool_size": self.http_pool_size,
+                    "http_connect_timeout": self.http_connect_timeout,
+                    "http_read_timeout": self.http_read_timeout,
+                    "prewarm_connections": self.prewarm_connections,
+                    "stream_translations": self.stream_translations,
+                    "chunk_max_tokens": self.chunk_max_tokens,
+                    "chunk_concurrency": self.chunk_concurrency,
+                    "rate_limits": self.rate_limits,
+                    "retry_max_attempts": self.retry_max_attempts,
+                    "retry_deadline": self.retry_deadline,
+                    "hedge_requests": self.hedge_requests,
+                    "failover_chain": self.failover_chain,
+                    "api_keys": self.api_keys,
+                    "breaker_failure_threshold": self.breaker_failure_threshold,
+                    "breaker_recovery_timeout": self.breaker_recovery_timeout,
+                    "skip_target_language": self.skip_target_language,
+                    "language_confidence": self.language_confidence,
+                    "budgets": self.budgets,
+                    "budget_warning_ratio": self.budget_warning_ratio,
+                    "engine_prices": self.engine_prices,
+                    "ui_update_interval": self.ui_update_interval,
+                    "history_max_entries": self.history_max_entries,
+                    "history_persist": self.history_persist,
+                    "history_retention_days": self.history_retention_days,
+                    "history_retention_entries": self.history_retention_entries,
+                    "history_retention_mb": self.history_retention_mb,
+                    "tm_enabled": self.tm_enabled,
+                    "tm_min_similarity": self.tm_min_similarity,
+                    "tm_reuse": self.tm_reuse,
+                    "glossary_enabled": self.glossary_enabled,
+                    "prompt_template": self.prompt_template,
+                    "prompt_trial_template": self.prompt_trial_template,
+                    "prompt_trial_share": self.prompt_trial_share
                 }
                 json.dump(data, f, indent=4)
         except Exception as e:
@@ -65,7 +194,46 @@ class Settings:
         self.api_engine = "OpenAI"
         self.api_key = ""
         self.tone = "neutro"
-        self.token_count = 0
+        self.clipboard_backend = "auto"
+        self.translation_workers = 2
+        self.translation_queue_size = 8
+        self.stale_policy = "drop"
+        self.cache_enabled = True
+        self.cache_max_entries = 10000
+        self.cache_max_age_days = 30
+        self.http_pool_size = 8
+        self.http_connect_timeout = 5
+        self.http_read_timeout = 30
+        self.prewarm_connections = True
+        self.stream_translations = True
+        self.chunk_max_tokens = 800
+        self.chunk_concurrency = 4
+        self.rate_limits = {}
+        self.retry_max_attempts = 4
+        self.retry_deadline = 60
+        self.hedge_requests = False
+        self.failover_chain = []
+        self.api_keys = {}
+        self.breaker_failure_threshold = 5
+        self.breaker_recovery_timeout = 30
+        self.skip_target_language = True
+        self.language_confidence = 0.9
+        self.budgets = {}
+        self.budget_warning_ratio = 0.8
+        self.engine_prices = {}
+        self.ui_update_interval = 50
+        self.history_max_entries = 1000
+        self.history_persist = True
+        self.history_retention_days = 365
+        self.history_retention_entries = 1000000
+        self.history_retention_mb = 500
+        self.tm_enabled = True
+        self.tm_min_similarity = 0.7
+        self.tm_reuse = True
+        self.glossary_enabled = True
+        self.prompt_template = "default"
+        self.prompt_trial_template = ""
+        self.prompt_trial_share = 0.0
         
         # Save the reset settings
         self.save()
\ No newline at end of file
@@ -1,55 +1,32 @@
-
 """
-API services package initialization
+API integrations for translation services
+
+Engine modules are loaded lazily through the registry in
+services.api.registry; importing this package doesn't import any of them.
 """
-from services.api.openai import test_openai_connection
-from services.api.gemini import test_gemini_connection
-from services.api.deepseek import test_deepseek_connection
+from services.api.registry import get_provider, has_engine
 
 
 def test_api_connection(engine, api_key):
     """Test connection to the specified API
-    
+
     Args:
-        engine (str): Engine to test
-        api_key (str): API key to use
-        
+        engine (str): API engine to test
+        api_key (str): API key to test
+
     Returns:
         tuple: (success, message)
     """
-    if engine == "OpenAI":
-        return test_openai_connection(api_key)
-    elif engine == "Gemini 2.0":
-        return test_gemini_connection(api_key)
-    elif engine == "DeepSeek V3":
-        return test_deepseek_connection(api_key)
-    else:
+    if not has_engine(engine):
         return False, f"Unknown engine: {engine}"
-"""
-API integrations for translation services
-"""
+    return get_provider(engine).test_connection(api_key)
 
-# Make test functions available at module level for convenience
-from services.api.openai import test_openai_connection
-from services.api.gemini import test_gemini_connection
-from services.api.deepseek import test_deepseek_connection
 
+def prewarm_connection(engine):
+    """Open a pooled connection to the engine's API in the background
 
-def test_api_connection(engine, api_key):
-    """Test connection to the specified API
-    
     Args:
-        engine (str): API engine to test
-        api_key (str): API key to test
-        
-    Returns:
-        tuple: (success, message)
+        engine (str): API engine that is about to be used
     """
-    if engine == "OpenAI":
-        return test_openai_connection(api_key)
-    elif engine == "Gemini 2.0":
-        return test_gemini_connection(api_key)
-    elif engine == "DeepSeek V3":
-        return test_deepseek_connection(api_key)
-    else:
-        return False, f"Unknown engine: {engine}"
+    if has_engine(engine):
+        get_provider(engine).prewarm()
@@ -0,0 +1,310 @@
+"""
+Token and cost budgets for translation engines
+
+Each engine can have daily and monthly limits on tokens and on cost. The
+spend of the current day and month is kept in memory per engine, so a
+request is checked against its budget with a few dictionary lookups. Using
+a warning share of a limit notifies the listeners once per period; a request
+that would go over a limit is refused, or handed to a cheaper engine when
+the budget names one.
+"""
+import threading
+import time
+
+from services.api.errors import ApiError
+from services.api.registry import get_provider
+
+# Limits a budget can set, as (period, measure)
+LIMITS = {
+    "daily_tokens": ("day", "tokens"),
+    "monthly_tokens": ("month", "tokens"),
+    "daily_cost": ("day", "cost"),
+    "monthly_cost": ("month", "cost"),
+}
+
+
+class BudgetExceededError(ApiError):
+    """Raised when a request would go over an engine's budget"""
+
+
+class EngineBudget:
+    """Limits on what one engine may spend"""
+
+    def __init__(self, daily_tokens=0, monthly_tokens=0, daily_cost=0.0, monthly_cost=0.0,
+                 downgrade_to=None, downgrade_at=1.0):
+        """Initialize the budget
+
+        Args:
+            daily_tokens (int): Tokens allowed per day (0 for no limit)
+            monthly_tokens (int): Tokens allowed per month (0 for no limit)
+            daily_cost (float): Cost allowed per day, in the currency of the
+                engine prices (0 for no limit)
+            monthly_cost (float): Cost allowed per month (0 for no limit)
+            downgrade_to (str, optional): Cheaper engine that takes over
+                requests instead of refusing them
+            downgrade_at (float): Share of a limit from which requests go to
+                downgrade_to
+        """
+        self.limits = {
+            "daily_tokens": daily_tokens,
+            "monthly_tokens": monthly_tokens,
+            "daily_cost": daily_cost,
+            "monthly_cost": monthly_cost,
+        }
+        self.downgrade_to = downgrade_to
+        self.downgrade_at = downgrade_at
+
+
+class EngineSpend:
+    """Tokens and cost spent by one engine in the current day and month"""
+
+    def __init__(self, day, month):
+        self.periods = {"day": day, "month": month}
+        self.spent = {(period, measure): 0 for period, measure in LIMITS.values()}
+        self.reserved = {(period, measure): 0 for period, measure in LIMITS.values()}
+        self.warned = set()
+
+    def roll(self, day, month):
+        """Start new periods when the day or month has changed"""
+        for period, key in (("day", day), ("month", month)):
+            if self.periods[period] != key:
+                self.periods[period] = key
+                for measure in ("tokens", "cost"):
+                    self.spent[(period, measure)] = 0
+                self.warned = {name for name in self.warned if LIMITS[name][0] != period}
+
+    def projected(self, limit, tokens, cost):
+        """Spend of a limit's period if a request of tokens and cost went ahead"""
+        period, measure = LIMITS[limit]
+        extra = tokens if measure == "tokens" else cost
+        return self.spent[(period, measure)] + self.reserved[(period, measure)] + extra
+
+
+class BudgetTracker:
+    """Checks requests against engine budgets and accounts for their spend"""
+
+    def __init__(self, budgets=None, warning_ratio=0.8, prices=None):
+        """Initialize the tracker
+
+        Args:
+            budgets (dict, optional): Engine name to EngineBudget
+            warning_ratio (float): Share of a limit that triggers a warning
+            prices (dict, optional): Engine name to (prompt, completion) price
+                per million tokens, overriding the engine's own prices
+        """
+        self.budgets = dict(budgets or {})
+        self.warning_ratio = warning_ratio
+        self.prices = dict(prices or {})
+        self.refused = 0
+        self.downgraded = 0
+
+        self._spend = {}
+        self._listeners = []
+        self._lock = threading.Lock()
+
+    def get_price(self, engine):
+        """Get an engine's (prompt, completion) price per million tokens"""
+        price = self.prices.get(engine)
+        if price is None:
+            provider = get_provider(engine)
+            price = (provider.prompt_price, provider.completion_price)
+        return price
+
+    def get_cost(self, engine, prompt_tokens, completion_tokens):
+        """Get the cost of tokens sent to and received from an engine"""
+        prompt_price, completion_price = self.get_price(engine)
+        return (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1000000
+
+    def downgrade_for(self, engine, prompt_tokens, completion_tokens):
+        """Get the engine that should take a request instead of engine
+
+        Returns:
+            str: The budget's downgrade_to engine if the request would use
+                downgrade_at of a limit or more, otherwise None
+        """
+        budget = self.budgets.get(engine)
+        if budget is None or not budget.downgrade_to:
+            return None
+
+        tokens = prompt_tokens + completion_tokens
+        cost = self.get_cost(engine, prompt_tokens, completion_tokens)
+        with self._lock:
+            spend = self._get_spend(engine)
+            for name, allowed in budget.limits.items():
+                if allowed and spend.projected(name, tokens, cost) >= allowed * budget.downgrade_at:
+                    self.downgraded += 1
+                    return budget.downgrade_to
+        return None
+
+    def reserve(self, engine, prompt_tokens, completion_tokens):
+        """Check a request against the engine's budget and hold its spend
+
+        Args:
+            engine (str): Engine name
+            prompt_tokens (int): Estimated tokens sent
+            completion_tokens (int): Estimated tokens received
+
+        Returns:
+            tuple: (tokens, cost) held, to pass to settle()
+
+        Raises:
+            BudgetExceededError: If the request would go over a limit
+        """
+        tokens = prompt_tokens + completion_tokens
+        cost = self.get_cost(engine, prompt_tokens, completion_tokens)
+        budget = self.budgets.get(engine)
+        warnings = []
+
+        with self._lock:
+            spend = self._get_spend(engine)
+            if budget is not None:
+                for name, allowed in budget.limits.items():
+                    if not allowed:
+                        continue
+                    projected = spend.projected(name, tokens, cost)
+                    if projected > allowed:
+                        self.refused += 1
+                        raise BudgetExceededError(
+                            f"{engine} {name.replace('_', ' ')} budget would be exceeded "
+                            f"({_describe_spend(name, spend.projected(name, 0, 0), allowed)})")
+                    if projected >= allowed * self.warning_ratio and name not in spend.warned:
+                        spend.warned.add(name)
+                        warnings.append((name, projected, allowed))
+
+            for period, measure in LIMITS.values():
+                spend.reserved[(period, measure)] += tokens if measure == "tokens" else cost
+
+        for name, used, allowed in warnings:
+            for listener in list(self._listeners):
+                # The reservation is held: a failing listener must not
+                # keep the request from being settled
+                try:
+                    listener(engine, name, used, allowed)
+                except Exception as e:
+                    print(f"Error in budget listener: {str(e)}")
+        return tokens, cost
+
+    def settle(self, engine, reservation, prompt_tokens=0, completion_tokens=0):
+        """Replace a reservation with what the request actually spent
+
+        Args:
+            engine (str): Engine name
+            reservation (tuple): Value returned by reserve()
+            prompt_tokens (int): Tokens sent (0 if the request failed)
+            completion_tokens (int): Tokens received
+        """
+        reserved_tokens, reserved_cost = reservation
+        tokens = prompt_tokens + completion_tokens
+        cost = self.get_cost(engine, prompt_tokens, completion_tokens)
+        with self._lock:
+            spend = self._get_spend(engine)
+            for period, measure in LIMITS.values():
+                spend.reserved[(period, measure)] -= (
+                    reserved_tokens if measure == "tokens" else reserved_cost)
+                spend.spent[(period, measure)] += tokens if measure == "tokens" else cost
+
+    def load_usage(self, token_counter):
+        """Start from the spend a TokenCounter recorded today and this month"""
+        day, month = _current_periods()
+        usage = {
+            "day": token_counter.query_usage(("engine",), start=day, end=day),
+            "month": token_counter.query_usage(("engine",), start=f"{month}-01", end=f"{month}-31"),
+        }
+        with self._lock:
+            self._spend = {}
+            for period, totals in usage.items():
+                for (engine,), total in totals.items():
+                    spend = self._get_spend(engine)
+                    spend.spent[(period, "tokens")] = total["tokens"]
+                    spend.spent[(period, "cost")] = self.get_cost(
+                        engine, total["prompt_tokens"], total["completion_tokens"])
+
+    def add_listener(self, listener):
+        """Register a callback for budget warnings
+
+        Args:
+            listener (callable): Called with (engine, limit name, projected
+                spend, allowed spend) the first time a request reaches the
+                warning share of a limit in a period. It may run on any thread.
+        """
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener):
+        """Unregister a callback added with add_listener"""
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def get_status(self):
+        """Get the spend of every engine in use
+
+        Returns:
+            dict: Engine name to spend per limit (including requests in
+                flight) and its allowed value, plus refusal and downgrade counts
+        """
+        with self._lock:
+            engines = {}
+            for engine, spend in self._spend.items():
+                budget = self.budgets.get(engine)
+                engines[engine] = {
+                    name: {
+                        "spent": spend.projected(name, 0, 0),
+                        "allowed": budget.limits[name] if budget else 0
+                    }
+                    for name in LIMITS
+                }
+            return {"engines": engines, "refused": self.refused, "downgraded": self.downgraded}
+
+    def get_month_cost(self):
+        """Get the cost spent by all engines this month"""
+        with self._lock:
+            return sum(spend.spent[("month", "cost")] for spend in self._spend.values())
+
+    def _get_spend(self, engine):
+        """Get an engine's spend, starting new periods if needed (lock held)"""
+        day, month = _current_periods()
+        spend = self._spend.get(engine)
+        if spend is None:
+            spend = EngineSpend(day, month)
+            self._spend[engine] = spend
+        else:
+            spend.roll(day, month)
+        return spend
+
+
+def _current_periods():
+    """Get the keys of the current day and month"""
+    day = time.strftime("%Y-%m-%d")
+    return day, day[:7]
+
+
+def _describe_spend(limit, spent, allowed):
+    """Describe the spend of a limit for messages"""
+    if LIMITS[limit][1] == "cost":
+        return f"{spent:.2f} of {allowed:.2f} spent"
+    return f"{int(spent):,} of {int(allowed):,} tokens used"
+
+
+_tracker = BudgetTracker()
+
+
+def get_budget_tracker():
+    """Get the tracker shared by all requests"""
+    return _tracker
+
+
+def configure_budgets(budgets, warning_ratio=0.8, prices=None, token_counter=None):
+    """Set engine budgets, e.g. from settings
+
+    Args:
+        budgets (dict): Engine name to a dict of EngineBudget arguments
+        warning_ratio (float): Share of a limit that triggers a warning
+        prices (dict, optional): Engine name to (prompt, completion) price
+            per million tokens
+        token_counter (TokenCounter, optional): Usage ledger the spend of the
+            current day and month is loaded from
+    """
+    _tracker.budgets = {engine: EngineBudget(**options) for engine, options in budgets.items()}
+    _tracker.warning_ratio = warning_ratio
+    _tracker.prices = {engine: tuple(price) for engine, price in (prices or {}).items()}
+    if token_counter is not None:
+        _tracker.load_usage(token_counter)
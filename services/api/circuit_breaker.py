@@ -0,0 +1,203 @@
+"""
+Circuit breakers for translation engines
+
+While an engine keeps failing, its breaker opens and calls are rejected
+immediately instead of waiting for timeouts. After a recovery timeout a
+limited number of probe calls are let through (half-open); a successful
+probe closes the breaker again.
+"""
+import threading
+import time
+
+from services.api.errors import ApiError
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half-open"
+
+
+class CircuitOpenError(ApiError):
+    """Raised when a call is rejected because the engine's breaker is open"""
+
+
+class CircuitBreaker:
+    """Tracks the health of one engine"""
+
+    def __init__(self, name, failure_threshold=5, recovery_timeout=30.0,
+                 half_open_max_calls=1):
+        """Initialize the breaker
+
+        Args:
+            name (str): Engine name
+            failure_threshold (int): Consecutive failures that open the breaker
+            recovery_timeout (float): Seconds the breaker stays open before probing
+            half_open_max_calls (int): Probe calls allowed at once while half-open
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probes = 0
+        self.rejected = 0
+        self.transitions = 0
+
+        # Reentrant so state listeners may query the breaker
+        self._lock = threading.RLock()
+
+    def allow_request(self):
+        """Check whether a call may be sent now
+
+        Returns:
+            bool: False if the breaker is open (or half-open with all probe
+                slots taken)
+        """
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self.opened_at < self.recovery_timeout:
+                    self.rejected += 1
+                    return False
+                self._set_state(HALF_OPEN)
+
+            if self.state == HALF_OPEN:
+                if self.probes >= self.half_open_max_calls:
+                    self.rejected += 1
+                    return False
+                self.probes += 1
+            return True
+
+    def record_success(self):
+        """Record a call that reached the engine and got an answer"""
+        with self._lock:
+            self.failures = 0
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+                self._set_state(CLOSED)
+
+    def record_cancelled(self):
+        """Record a call that was allowed but never reached the engine"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+
+    def record_failure(self):
+        """Record a call that failed because the engine is unhealthy"""
+        with self._lock:
+            self.failures += 1
+            if self.state == HALF_OPEN:
+                self.probes = max(0, self.probes - 1)
+                self._open()
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._open()
+
+    def retry_in(self):
+        """Seconds until an open breaker lets a probe through (0 if not open)"""
+        with self._lock:
+            if self.state != OPEN:
+                return 0.0
+            return max(0.0, self.opened_at + self.recovery_timeout - time.monotonic())
+
+    def get_state(self):
+        """Get the breaker state
+
+        Returns:
+            dict: State, consecutive failures and counters
+        """
+        with self._lock:
+            return {
+                "state": self.state,
+                "failures": self.failures,
+                "rejected": self.rejected,
+                "transitions": self.transitions
+            }
+
+    def _open(self):
+        self.opened_at = time.monotonic()
+        self._set_state(OPEN)
+
+    def _set_state(self, state):
+        if state == self.state:
+            return
+        previous = self.state
+        self.state = state
+        self.transitions += 1
+        if state == CLOSED:
+            self.probes = 0
+        _notify(self.name, previous, state)
+
+
+_breakers = {}
+_breakers_lock = threading.Lock()
+_options = {}
+_listeners = []
+
+
+def _notify(engine, previous, state):
+    """Call the state listeners, ignoring their errors"""
+    for listener in list(_listeners):
+        try:
+            listener(engine, previous, state)
+        except Exception as e:
+            print(f"Error in circuit breaker listener: {str(e)}")
+
+
+def get_circuit_breaker(engine):
+    """Get the breaker shared by all requests to an engine
+
+    Args:
+        engine (str): Engine name
+
+    Returns:
+        CircuitBreaker: The breaker
+    """
+    with _breakers_lock:
+        breaker = _breakers.get(engine)
+        if breaker is None:
+            breaker = CircuitBreaker(engine, **_options)
+            _breakers[engine] = breaker
+        return breaker
+
+
+def configure_circuit_breakers(**options):
+    """Set breaker thresholds, e.g. from settings
+
+    Existing breakers are replaced, so every engine starts closed.
+
+    Args:
+        **options: CircuitBreaker arguments (failure_threshold,
+            recovery_timeout, half_open_max_calls)
+    """
+    with _breakers_lock:
+        _options.clear()
+        _options.update(options)
+        _breakers.clear()
+
+
+def add_state_listener(listener):
+    """Register a callback for breaker transitions
+
+    Args:
+        listener (callable): Called with (engine, previous_state, new_state).
+            It may run on any thread.
+    """
+    _listeners.append(listener)
+
+
+def remove_state_listener(listener):
+    """Unregister a callback added with add_state_listener"""
+    if listener in _listeners:
+        _listeners.remove(listener)
+
+
+def get_circuit_states():
+    """Get the state of every breaker in use
+
+    Returns:
+        dict: Engine name to breaker state
+    """
+    with _breakers_lock:
+        breakers = list(_breakers.items())
+    return {engine: breaker.get_state() for engine, breaker in breakers}
@@ -2,8 +2,10 @@
 """
 DeepSeek API integration for translation (simulated)
 """
+import re
 import time
-import random
+
+from utils.token_estimator import estimate_tokens, predict_request_tokens
 
 
 def translate_with_deepseek(text, context, api_key):
@@ -20,12 +22,66 @@ def translate_with_deepseek(text, context, api_key):
     # Simulate API call delay
     time.sleep(1.2)
     
-    # Simulate token usage based on input length
-    token_count = len(text) // 3 + random.randint(5, 30)
-    
     # For simulation, just return the original text with a prefix
     translated = f"[DeepSeek V3 translation] {text}"
     
+    # Simulate token usage: the prompt plus the translation
+    prompt_tokens, _ = predict_request_tokens(text, context)
+    token_count = prompt_tokens + estimate_tokens(translated)
+    
+    return translated, token_count
+
+
+def stream_with_deepseek(text, context, api_key, on_chunk):
+    """Translate text using DeepSeek API with a streamed response (simulated)
+    
+    Args:
+        text (str): Text to translate
+        context (str): Translation context
+        api_key (str): DeepSeek API key
+        on_chunk (callable): Called with each piece of text as it arrives
+        
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    # Simulate time to first token
+    time.sleep(0.4)
+    
+    # For simulation, stream the original text with a prefix word by word
+    translated = f"[DeepSeek V3 translation] {text}"
+    
+    # Simulate token usage: the prompt plus the translation
+    prompt_tokens, _ = predict_request_tokens(text, context)
+    token_count = prompt_tokens + estimate_tokens(translated)
+    
+    for piece in re.findall(r"\S+\s*", translated):
+        time.sleep(0.02)
+        on_chunk(piece)
+    
+    return translated, token_count
+
+
+def translate_batch_with_deepseek(texts, context, api_key):
+    """Translate several texts in one DeepSeek API request (simulated)
+    
+    Args:
+        texts (list): Texts to translate
+        context (str): Translation context
+        api_key (str): DeepSeek API key
+        
+    Returns:
+        tuple: (list of translated texts, token_count)
+    """
+    # Simulate a single API call delay
+    time.sleep(1.2)
+    
+    # For simulation, just return the original texts with a prefix
+    translated = [f"[DeepSeek V3 translation] {text}" for text in texts]
+    
+    # Simulate token usage: the prompt plus the translations
+    prompt_tokens, _ = predict_request_tokens("\n".join(texts), context)
+    token_count = prompt_tokens + sum(estimate_tokens(item) for item in translated)
+    
     return translated, token_count
 
 
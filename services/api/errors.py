@@ -0,0 +1,56 @@
+"""
+Exceptions raised by the API integrations
+"""
+import email.utils
+import time
+
+
+class ApiError(Exception):
+    """Error response from a translation API"""
+
+    def __init__(self, message, status_code=None, retry_after=None):
+        """Initialize the error
+
+        Args:
+            message (str): Error message shown to the user
+            status_code (int, optional): HTTP status code of the response
+            retry_after (float, optional): Seconds the API asked us to wait
+        """
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+    @property
+    def is_rate_limited(self):
+        """True if the API rejected the request because of rate limits"""
+        return self.status_code == 429
+
+
+class StreamInterruptedError(ApiError):
+    """Raised when a streamed response fails after part of it was delivered
+
+    The text already passed to the stream's callback can't be taken back,
+    so the request isn't retried; the original error is the __cause__.
+    """
+
+
+def parse_retry_after(value):
+    """Parse a Retry-After header value
+
+    Args:
+        value (str): Number of seconds or an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
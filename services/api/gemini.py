@@ -50,8 +50,10 @@ def test_gemini_connection(api_key):
 """
 Gemini API integration for translation (simulated)
 """
+import re
 import time
-import random
+
+from utils.token_estimator import estimate_tokens, predict_request_tokens
 
 
 def translate_with_gemini(text, context, api_key):
@@ -68,12 +70,66 @@ def translate_with_gemini(text, context, api_key):
     # Simulate API call delay
     time.sleep(0.9)
     
-    # Simulate token usage based on input length
-    token_count = len(text) // 4 + random.randint(5, 25)
-    
     # For simulation, just return the original text with a prefix
     translated = f"[Gemini 2.0 translation] {text}"
     
+    # Simulate token usage: the prompt plus the translation
+    prompt_tokens, _ = predict_request_tokens(text, context)
+    token_count = prompt_tokens + estimate_tokens(translated)
+    
+    return translated, token_count
+
+
+def stream_with_gemini(text, context, api_key, on_chunk):
+    """Translate text using Gemini API with a streamed response (simulated)
+    
+    Args:
+        text (str): Text to translate
+        context (str): Translation context
+        api_key (str): Gemini API key
+        on_chunk (callable): Called with each piece of text as it arrives
+        
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    # Simulate time to first token
+    time.sleep(0.3)
+    
+    # For simulation, stream the original text with a prefix word by word
+    translated = f"[Gemini 2.0 translation] {text}"
+    
+    # Simulate token usage: the prompt plus the translation
+    prompt_tokens, _ = predict_request_tokens(text, context)
+    token_count = prompt_tokens + estimate_tokens(translated)
+    
+    for piece in re.findall(r"\S+\s*", translated):
+        time.sleep(0.02)
+        on_chunk(piece)
+    
+    return translated, token_count
+
+
+def translate_batch_with_gemini(texts, context, api_key):
+    """Translate several texts in one Gemini API request (simulated)
+    
+    Args:
+        texts (list): Texts to translate
+        context (str): Translation context
+        api_key (str): Gemini API key
+        
+    Returns:
+        tuple: (list of translated texts, token_count)
+    """
+    # Simulate a single API call delay
+    time.sleep(0.9)
+    
+    # For simulation, just return the original texts with a prefix
+    translated = [f"[Gemini 2.0 translation] {text}" for text in texts]
+    
+    # Simulate token usage: the prompt plus the translations
+    prompt_tokens, _ = predict_request_tokens("\n".join(texts), context)
+    token_count = prompt_tokens + sum(estimate_tokens(item) for item in translated)
+    
     return translated, token_count
 
 
@@ -2,7 +2,17 @@
 """
 OpenAI API integration for translation
 """
-import requests
+import json
+
+from services.api.errors import ApiError, parse_retry_after
+from services.api.rate_limiter import get_rate_limiter
+from services.api.session import get_session_manager
+from utils.token_estimator import count_tokens
+
+OPENAI_API_URL = "https://api.openai.com/v1/chat/completions"
+
+# Vocabulary of gpt-3.5-turbo, used to count tokens before sending
+OPENAI_ENCODING = "cl100k_base"
 
 
 def translate_with_openai(text, context, api_key):
@@ -30,13 +40,15 @@ def translate_with_openai(text, context, api_key):
         "temperature": 0.3
     }
     
-    response = requests.post(
-        "https://api.openai.com/v1/chat/completions",
+    response = get_session_manager().post(
+        OPENAI_API_URL,
         headers=headers,
-        json=payload,
-        timeout=30
+        json=payload
     )
     
+    # Keep the rate limiter in sync with the limits reported by the API
+    get_rate_limiter("OpenAI", api_key).update_from_headers(response.headers)
+    
     if response.status_code == 200:
         response_json = response.json()
         
@@ -50,17 +62,72 @@ def translate_with_openai(text, context, api_key):
         
         return translated, token_count
     else:
-        # Extract error message from response
-        error_message = f"Error {response.status_code}"
-        try:
-            error_json = response.json()
-            if "error" in error_json and "message" in error_json["error"]:
-                error_message = error_json["error"]["message"]
-        except:
-            if response.text:
-                error_message = response.text[:100]
+        raise _api_error(response)
+
+
+def stream_with_openai(text, context, api_key, on_chunk):
+    """Translate text using OpenAI API with a streamed (SSE) response
+    
+    Args:
+        text (str): Text to translate
+        context (str): Translation context
+        api_key (str): OpenAI API key
+        on_chunk (callable): Called with each piece of text as it arrives
         
-        raise Exception(f"OpenAI API Error: {error_message}")
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    headers = {
+        "Content-Type": "application/json",
+        "Authorization": f"Bearer {api_key}"
+    }
+    
+    payload = {
+        "model": "gpt-3.5-turbo",
+        "messages": [
+            {"role": "system", "content": context},
+            {"role": "user", "content": text}
+        ],
+        "temperature": 0.3,
+        "stream": True,
+        "stream_options": {"include_usage": True}
+    }
+    
+    response = get_session_manager().post(
+        OPENAI_API_URL,
+        headers=headers,
+        json=payload,
+        stream=True
+    )
+    
+    with response:
+        get_rate_limiter("OpenAI", api_key).update_from_headers(response.headers)
+        if response.status_code != 200:
+            raise _api_error(response)
+        
+        pieces = []
+        token_count = 0
+        for line in response.iter_lines(decode_unicode=True):
+            # Server-sent events: only "data:" lines carry payloads
+            if not line or not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
+            
+            event = json.loads(data)
+            
+            # The final event carries the usage and no choices
+            if event.get("usage"):
+                token_count = event["usage"]["total_tokens"]
+            
+            for choice in event.get("choices", []):
+                piece = choice.get("delta", {}).get("content")
+                if piece:
+                    pieces.append(piece)
+                    on_chunk(piece)
+    
+    return "".join(pieces).strip(), token_count
 
 
 def test_openai_connection(api_key):
@@ -86,26 +153,50 @@ def test_openai_connection(api_key):
     }
     
     try:
-        response = requests.post(
-            "https://api.openai.com/v1/chat/completions",
+        session_manager = get_session_manager()
+        response = session_manager.post(
+            OPENAI_API_URL,
             headers=headers,
             json=payload,
-            timeout=10
+            timeout=(session_manager.connect_timeout, 10)
         )
         
         if response.status_code == 200:
             return True, "Connection successful"
         else:
-            error_message = f"Error {response.status_code}"
-            try:
-                error_json = response.json()
-                if "error" in error_json and "message" in error_json["error"]:
-                    error_message = error_json["error"]["message"]
-            except:
-                if response.text:
-                    error_message = response.text[:100]
-            
-            return False, error_message
+            return False, _extract_error_message(response)
     
     except Exception as e:
         return False, str(e)
+
+
+def prewarm_openai_connection():
+    """Open a pooled connection to the OpenAI API ahead of the first request"""
+    return get_session_manager().prewarm(OPENAI_API_URL)
+
+
+def estimate_openai_tokens(text):
+    """Count the tokens OpenAI will bill for text, without calling the API"""
+    return count_tokens(text, OPENAI_ENCODING)
+
+
+def _api_error(response):
+    """Build the ApiError for a failed API response"""
+    return ApiError(
+        f"OpenAI API Error: {_extract_error_message(response)}",
+        status_code=response.status_code,
+        retry_after=parse_retry_after(response.headers.get("Retry-After"))
+    )
+
+
+def _extract_error_message(response):
+    """Extract the error message from a failed API response"""
+    error_message = f"Error {response.status_code}"
+    try:
+        error_json = response.json()
+        if "error" in error_json and "message" in error_json["error"]:
+            error_message = error_json["error"]["message"]
+    except:
+        if response.text:
+            error_message = response.text[:100]
+    return error_message
@@ -0,0 +1,331 @@
+"""
+Per-engine rate limiting with adaptive concurrency
+
+Each engine/API key pair gets a RateLimiter combining a requests-per-minute
+and a tokens-per-minute token bucket with an AIMD concurrency limit.
+Callers that exceed the limits wait in FIFO order instead of failing.
+"""
+import hashlib
+import re
+import threading
+import time
+from collections import deque
+
+from services.api.errors import ApiError
+
+# Default limits per engine until the API reports its own
+DEFAULT_LIMITS = {
+    "OpenAI": {"rpm": 500, "tpm": 200000},
+    "Gemini 2.0": {"rpm": 1000, "tpm": 1000000},
+    "DeepSeek V3": {"rpm": 1000, "tpm": 1000000}
+}
+FALLBACK_LIMITS = {"rpm": 60, "tpm": 90000}
+
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+class RateLimitWaitError(ApiError):
+    """Raised when a caller waited too long for capacity of our own limiter
+
+    The API never saw the request, so it isn't retried and doesn't count
+    against the engine's circuit breaker.
+    """
+
+
+def parse_duration(value):
+    """Parse durations like "1s", "6m0s" or "20ms" from rate-limit headers
+
+    Returns:
+        float: Seconds, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+    parts = DURATION_PATTERN.findall(value)
+    if not parts:
+        try:
+            return float(value)
+        except ValueError:
+            return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously up to its capacity"""
+
+    def __init__(self, capacity, period=60.0):
+        """Initialize the bucket
+
+        Args:
+            capacity (float): Maximum tokens, also the amount refilled per period
+            period (float): Seconds to refill the whole capacity
+        """
+        self.capacity = float(capacity)
+        self.period = period
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self.reset_at = None
+
+    @property
+    def rate(self):
+        """Tokens refilled per second"""
+        return self.capacity / self.period
+
+    def refill(self, now):
+        """Add the tokens accumulated since the last refill"""
+        if self.reset_at is not None and now >= self.reset_at:
+            # The API's window was reset: the whole capacity is available
+            self.tokens = self.capacity
+            self.reset_at = None
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def wait_time(self, amount, now):
+        """Seconds until `amount` tokens are available (0 if they are now)"""
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        wait = (amount - self.tokens) / self.rate
+        if self.reset_at is not None:
+            wait = min(wait, self.reset_at - now)
+        return max(wait, 0.001)
+
+    def consume(self, amount):
+        """Take tokens out of the bucket (may go negative to record overuse)"""
+        self.tokens -= min(amount, self.capacity)
+
+    def set_limit(self, capacity, remaining=None, reset=None):
+        """Apply limits reported by the API
+
+        Args:
+            capacity (float): Limit per period
+            remaining (float, optional): Tokens left in the current window
+            reset (float, optional): Seconds until the API refills the window
+        """
+        self.capacity = float(capacity)
+        if remaining is not None:
+            self.tokens = float(remaining)
+        self.tokens = min(self.tokens, self.capacity)
+        if reset is not None:
+            self.reset_at = self.updated_at + reset
+
+
+class RateLimiter:
+    """Limits requests, tokens and in-flight calls for one engine and API key"""
+
+    # Maximum seconds a caller waits for capacity before giving up
+    MAX_WAIT = 120.0
+
+    def __init__(self, name, rpm, tpm, concurrency=4, max_concurrency=16):
+        """Initialize the limiter
+
+        Args:
+            name (str): Engine name, used in error messages
+            rpm (int): Requests per minute
+            tpm (int): Tokens per minute
+            concurrency (int): Initial number of concurrent requests
+            max_concurrency (int): Upper bound for the adaptive concurrency
+        """
+        self.name = name
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.throttled = 0
+        self.rate_limited = 0
+        self.total_wait = 0.0
+
+        self._condition = threading.Condition()
+        self._waiting = deque()
+        self._tickets = 0
+
+    def acquire(self, tokens, timeout=None):
+        """Wait for capacity to send a request
+
+        Callers are served in arrival order.
+
+        Args:
+            tokens (int): Estimated tokens the request will use
+            timeout (float, optional): Maximum seconds to wait (MAX_WAIT if None)
+
+        Raises:
+            RateLimitWaitError: If no capacity became available in time
+        """
+        timeout = self.MAX_WAIT if timeout is None else timeout
+        start = time.monotonic()
+        deadline = start + timeout
+
+        with self._condition:
+            self._tickets += 1
+            ticket = self._tickets
+            self._waiting.append(ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(ticket, tokens, now)
+                    if wait == 0.0:
+                        break
+                    if now >= deadline:
+                        raise RateLimitWaitError(
+                            f"{self.name} rate limit: no capacity after waiting {timeout:.0f}s")
+                    self._condition.wait(min(wait, deadline - now))
+
+                self.requests.consume(1)
+                self.tokens.consume(tokens)
+                self.in_flight += 1
+
+                waited = time.monotonic() - start
+                if waited > 0.001:
+                    self.throttled += 1
+                    self.total_wait += waited
+            finally:
+                self._waiting.remove(ticket)
+                self._condition.notify_all()
+
+    def release(self, estimated_tokens=0, used_tokens=None, rate_limited=False,
+                retry_after=None, failed=False):
+        """Finish a request started with acquire()
+
+        Args:
+            estimated_tokens (int): Tokens passed to acquire()
+            used_tokens (int, optional): Tokens the API actually reported
+            rate_limited (bool): True if the API answered 429
+            retry_after (float, optional): Seconds the API asked us to wait
+            failed (bool): True if the request failed for another reason
+        """
+        with self._condition:
+            self.in_flight -= 1
+
+            # Charge (or refund) the difference between estimate and actual use
+            if used_tokens is not None:
+                self.tokens.consume(used_tokens - estimated_tokens)
+
+            if rate_limited:
+                # Multiplicative decrease
+                self.rate_limited += 1
+                self.concurrency = max(1.0, self.concurrency / 2)
+                pause = retry_after if retry_after is not None else 1.0
+                self.blocked_until = max(self.blocked_until, time.monotonic() + pause)
+            elif not failed:
+                # Additive increase: about +1 per `concurrency` successful requests
+                self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+            self._condition.notify_all()
+
+    def update_from_headers(self, headers):
+        """Apply x-ratelimit-* headers reported by the API
+
+        Args:
+            headers (Mapping): Response headers (case-insensitive mapping)
+        """
+        with self._condition:
+            now = time.monotonic()
+            for kind, bucket in (("requests", self.requests), ("tokens", self.tokens)):
+                limit = _to_float(headers.get(f"x-ratelimit-limit-{kind}"))
+                if not limit:
+                    continue
+                bucket.refill(now)
+                bucket.set_limit(
+                    limit,
+                    _to_float(headers.get(f"x-ratelimit-remaining-{kind}")),
+                    parse_duration(headers.get(f"x-ratelimit-reset-{kind}")))
+            self._condition.notify_all()
+
+    def get_state(self):
+        """Get the limiter state
+
+        Returns:
+            dict: Limits, available capacity, concurrency and counters
+        """
+        with self._condition:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            return {
+                "rpm": self.requests.capacity,
+                "tpm": self.tokens.capacity,
+                "requests_available": int(self.requests.tokens),
+                "tokens_available": int(self.tokens.tokens),
+                "concurrency_limit": int(self.concurrency),
+                "in_flight": self.in_flight,
+                "waiting": len(self._waiting),
+                "blocked_for": max(0.0, self.blocked_until - now),
+                "throttled": self.throttled,
+                "rate_limited": self.rate_limited,
+                "total_wait": self.total_wait
+            }
+
+    def _wait_time(self, ticket, tokens, now):
+        """Seconds until `ticket` may send its request (0 if it may now)"""
+        # Only the caller at the head of the queue may proceed
+        if self._waiting[0] != ticket:
+            return 1.0
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= int(self.concurrency):
+            return 1.0
+
+        self.requests.refill(now)
+        self.tokens.refill(now)
+        return max(self.requests.wait_time(1, now), self.tokens.wait_time(tokens, now))
+
+
+def _to_float(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(engine, api_key):
+    """Get the limiter shared by all requests for an engine and API key
+
+    Args:
+        engine (str): Engine name
+        api_key (str): API key (only a hash of it is kept)
+
+    Returns:
+        RateLimiter: The limiter
+    """
+    key_hash = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+    with _limiters_lock:
+        limiter = _limiters.get((engine, key_hash))
+        if limiter is None:
+            limits = DEFAULT_LIMITS.get(engine, FALLBACK_LIMITS)
+            limiter = RateLimiter(engine, limits["rpm"], limits["tpm"],
+                                  concurrency=limits.get("concurrency", 4))
+            _limiters[(engine, key_hash)] = limiter
+        return limiter
+
+
+def configure_rate_limits(limits):
+    """Override default limits, e.g. from settings
+
+    Args:
+        limits (dict): Engine name to {"rpm": int, "tpm": int} and
+            optionally the initial "concurrency"
+    """
+    with _limiters_lock:
+        for engine, engine_limits in limits.items():
+            DEFAULT_LIMITS[engine] = dict(DEFAULT_LIMITS.get(engine, FALLBACK_LIMITS),
+                                          **engine_limits)
+        _limiters.clear()
+
+
+def get_rate_limiter_states():
+    """Get the state of every limiter in use
+
+    Returns:
+        dict: "engine (key hash)" to limiter state, one entry per engine and API key
+    """
+    with _limiters_lock:
+        limiters = list(_limiters.items())
+    return {f"{engine} ({key_hash[:6]})": limiter.get_state()
+            for (engine, key_hash), limiter in limiters}
@@ -0,0 +1,188 @@
+"""
+Registry of translation engines and their capabilities
+
+Each engine is described by an EngineProvider naming the module and the
+functions implementing its capabilities. The module is only imported the
+first time one of those functions is needed, so SDKs of unused engines
+are never loaded.
+"""
+import importlib
+import threading
+
+from utils.token_estimator import estimate_tokens as default_estimate_tokens, predict_request_tokens
+
+# Capabilities an engine can declare
+CAPABILITIES = ("translate", "stream", "batch", "test_connection", "estimate_tokens", "prewarm")
+
+# Engine used when an unknown engine name is requested
+DEFAULT_ENGINE = "OpenAI"
+
+
+class EngineProvider:
+    """Describes a translation engine and loads its implementation lazily"""
+
+    def __init__(self, name, module, model="", prompt_price=0.0, completion_price=0.0,
+                 prompt_caching=False, **functions):
+        """Initialize the provider
+
+        Args:
+            name (str): Engine name shown to the user
+            module (str): Import path of the module implementing the engine
+            model (str): Model the engine's requests use, recorded with usage
+            prompt_price (float): Price per million tokens sent, in USD
+            completion_price (float): Price per million tokens received, in USD
+            prompt_caching (bool): The API caches repeated prompt prefixes
+                automatically and bills them at a discount
+            **functions: Capability name to function name in the module,
+                e.g. translate="translate_with_openai"
+        """
+        unknown = set(functions) - set(CAPABILITIES)
+        if unknown:
+            raise ValueError(f"Unknown engine capabilities: {', '.join(sorted(unknown))}")
+        if "translate" not in functions:
+            raise ValueError(f"Engine {name} must provide a translate function")
+
+        self.name = name
+        self.module = module
+        self.model = model
+        self.prompt_price = prompt_price
+        self.completion_price = completion_price
+        self.prompt_caching = prompt_caching
+        self.functions = functions
+        self._loaded = None
+        self._lock = threading.Lock()
+
+    def supports(self, capability):
+        """Check whether the engine declares a capability (without importing it)"""
+        return capability in self.functions
+
+    def get_function(self, capability):
+        """Get the function implementing a capability, importing the module if needed
+
+        Returns:
+            callable: The function, or None if the capability isn't declared
+        """
+        if capability not in self.functions:
+            return None
+        with self._lock:
+            if self._loaded is None:
+                self._loaded = importlib.import_module(self.module)
+        return getattr(self._loaded, self.functions[capability])
+
+    def translate(self, text, context, api_key):
+        """Translate text
+
+        Returns:
+            tuple: (translated_text, token_count)
+        """
+        return self.get_function("translate")(text, context, api_key)
+
+    def stream(self, text, context, api_key, on_chunk):
+        """Translate text, calling on_chunk with pieces as they arrive
+
+        Engines without streaming support report the whole translation as a
+        single chunk.
+
+        Returns:
+            tuple: (translated_text, token_count)
+        """
+        if not self.supports("stream"):
+            translated, token_count = self.translate(text, context, api_key)
+            on_chunk(translated)
+            return translated, token_count
+        return self.get_function("stream")(text, context, api_key, on_chunk)
+
+    def test_connection(self, api_key):
+        """Test the connection to the engine's API
+
+        Returns:
+            tuple: (success, message)
+        """
+        if not self.supports("test_connection"):
+            return True, "Connection test not available"
+        return self.get_function("test_connection")(api_key)
+
+    def estimate_tokens(self, text):
+        """Estimate the number of tokens the engine will count for text"""
+        if not self.supports("estimate_tokens"):
+            return default_estimate_tokens(text)
+        return self.get_function("estimate_tokens")(text)
+
+    def estimate_request(self, text, context):
+        """Predict the tokens a translation request to the engine will use
+
+        Returns:
+            tuple: (prompt_tokens, completion_tokens)
+        """
+        return predict_request_tokens(text, context, self.estimate_tokens)
+
+    def prewarm(self):
+        """Open a connection to the engine's API ahead of the first request"""
+        if self.supports("prewarm"):
+            self.get_function("prewarm")()
+
+
+_providers = {}
+
+
+def register_engine(provider):
+    """Add an engine to the registry, replacing any engine with the same name"""
+    _providers[provider.name] = provider
+
+
+def get_engine_names():
+    """Get the names of all registered engines, in registration order"""
+    return list(_providers)
+
+
+def has_engine(name):
+    """Check whether an engine is registered"""
+    return name in _providers
+
+
+def get_provider(name):
+    """Get the provider for an engine
+
+    Args:
+        name (str): Engine name
+
+    Returns:
+        EngineProvider: The engine's provider, or the default engine's
+            provider if the name is unknown
+    """
+    return _providers.get(name) or _providers[DEFAULT_ENGINE]
+
+
+# Built-in engines
+register_engine(EngineProvider(
+    "OpenAI", "services.api.openai",
+    model="gpt-3.5-turbo",
+    prompt_price=0.50,
+    completion_price=1.50,
+    translate="translate_with_openai",
+    stream="stream_with_openai",
+    test_connection="test_openai_connection",
+    estimate_tokens="estimate_openai_tokens",
+    prewarm="prewarm_openai_connection"
+))
+register_engine(EngineProvider(
+    "Gemini 2.0", "services.api.gemini",
+    model="gemini-2.0-flash",
+    prompt_price=0.10,
+    completion_price=0.40,
+    translate="translate_with_gemini",
+    stream="stream_with_gemini",
+    batch="translate_batch_with_gemini",
+    test_connection="test_gemini_connection"
+))
+register_engine(EngineProvider(
+    "DeepSeek V3", "services.api.deepseek",
+    model="deepseek-chat",
+    prompt_price=0.27,
+    completion_price=1.10,
+    prompt_caching=True,
+    translate="translate_with_deepseek",
+    stream="stream_with_deepseek",
+    batch="translate_batch_with_deepseek",
+    test_connection="test_deepseek_connection"
+))
@@ -0,0 +1,217 @@
+"""
+Retry policy for API calls: exponential backoff with jitter, an overall
+deadline and optional hedged requests
+"""
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+
+from services.api.errors import ApiError
+
+# HTTP statuses worth retrying: timeouts, conflicts, rate limits, server errors
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+
+
+class RetryPolicy:
+    """How failed API calls are retried"""
+
+    def __init__(self, max_attempts=4, base_delay=0.5, max_delay=8.0, deadline=60.0,
+                 hedge=False, hedge_quantile=0.95, hedge_min_samples=20):
+        """Initialize the policy
+
+        Args:
+            max_attempts (int): Maximum attempts including the first one
+            base_delay (float): Backoff before the first retry, doubled each time
+            max_delay (float): Upper bound for a single backoff
+            deadline (float): Seconds after which no new attempt is started
+            hedge (bool): Send a duplicate request when the first one is slow
+            hedge_quantile (float): Latency quantile after which to hedge
+            hedge_min_samples (int): Latencies needed before hedging starts
+        """
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.hedge = hedge
+        self.hedge_quantile = hedge_quantile
+        self.hedge_min_samples = hedge_min_samples
+
+    def backoff(self, attempt, retry_after=None):
+        """Seconds to wait before retry number `attempt` (0-based)
+
+        Uses "full jitter": a random delay up to the exponential bound, so
+        clients that failed together don't retry together.
+        """
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        if retry_after is not None:
+            delay = max(delay, retry_after)
+        return delay
+
+
+def is_retryable(error):
+    """Check whether a failed call is worth retrying
+
+    Args:
+        error (Exception): Error raised by the call
+
+    Returns:
+        bool: True for transient errors (timeouts, connection errors,
+            rate limits and server errors)
+    """
+    if isinstance(error, ApiError):
+        return error.status_code in RETRYABLE_STATUS
+    return isinstance(error, (requests.ConnectionError, requests.Timeout,
+                              requests.exceptions.ChunkedEncodingError))
+
+
+class EngineCallStats:
+    """Latency samples and retry/hedge counters for one engine"""
+
+    def __init__(self, samples=200):
+        self.latencies = deque(maxlen=samples)
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def quantile(self, q):
+        """Latency quantile of recent successful calls, or None if no samples"""
+        if not self.latencies:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+_stats = {}
+_stats_lock = threading.Lock()
+_default_policy = RetryPolicy()
+
+# Threads for hedged calls; the losing request finishes in the background
+_hedge_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="hedge")
+
+
+def configure_retry_policy(**options):
+    """Replace the default retry policy
+
+    Args:
+        **options: RetryPolicy arguments
+    """
+    global _default_policy
+    _default_policy = RetryPolicy(**options)
+
+
+def _get_stats(engine):
+    with _stats_lock:
+        if engine not in _stats:
+            _stats[engine] = EngineCallStats()
+        return _stats[engine]
+
+
+def _update_stats(engine, **counters):
+    stats = _get_stats(engine)
+    with _stats_lock:
+        for counter, amount in counters.items():
+            setattr(stats, counter, getattr(stats, counter) + amount)
+
+
+def get_retry_stats():
+    """Get retry and hedging counters per engine
+
+    Returns:
+        dict: Engine name to counters and latency quantiles in milliseconds
+    """
+    with _stats_lock:
+        items = list(_stats.items())
+        return {
+            engine: {
+                "calls": stats.calls,
+                "retries": stats.retries,
+                "failures": stats.failures,
+                "hedges": stats.hedges,
+                "hedge_wins": stats.hedge_wins,
+                "p50_ms": (stats.quantile(0.5) or 0.0) * 1000,
+                "p95_ms": (stats.quantile(0.95) or 0.0) * 1000
+            }
+            for engine, stats in items
+        }
+
+
+def _timed(engine, call):
+    """Run call and record its latency if it succeeds"""
+    start = time.monotonic()
+    result = call()
+    latency = time.monotonic() - start
+    stats = _get_stats(engine)
+    with _stats_lock:
+        stats.latencies.append(latency)
+    return result
+
+
+def _call_hedged(engine, call, policy):
+    """Run call, sending a duplicate if it's slower than the hedge quantile"""
+    stats = _get_stats(engine)
+    with _stats_lock:
+        enough_samples = len(stats.latencies) >= policy.hedge_min_samples
+        threshold = stats.quantile(policy.hedge_quantile) if enough_samples else None
+    if threshold is None:
+        return _timed(engine, call)
+
+    primary = _hedge_executor.submit(_timed, engine, call)
+    done, _ = wait([primary], timeout=threshold)
+    if done:
+        return primary.result()
+
+    _update_stats(engine, hedges=1)
+    hedge = _hedge_executor.submit(_timed, engine, call)
+    pending = {primary, hedge}
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is hedge:
+                    _update_stats(engine, hedge_wins=1)
+                return future.result()
+            error = future.exception()
+    raise error
+
+
+def call_with_retry(engine, call, policy=None, hedge=True):
+    """Call an API, retrying transient failures
+
+    Args:
+        engine (str): Engine name, for statistics
+        call (callable): Performs the request
+        policy (RetryPolicy, optional): Policy to use (the default if None)
+        hedge (bool): Allow hedged duplicates (disable for calls with side
+            effects such as streaming callbacks)
+
+    Returns:
+        The value returned by call
+    """
+    policy = policy or _default_policy
+    deadline = time.monotonic() + policy.deadline
+    _update_stats(engine, calls=1)
+
+    for attempt in range(policy.max_attempts):
+        try:
+            if hedge and policy.hedge:
+                return _call_hedged(engine, call, policy)
+            return _timed(engine, call)
+        except Exception as e:
+            if not is_retryable(e) or attempt == policy.max_attempts - 1:
+                _update_stats(engine, failures=1)
+                raise
+
+            delay = policy.backoff(attempt, getattr(e, "retry_after", None))
+            if time.monotonic() + delay > deadline:
+                _update_stats(engine, failures=1)
+                raise
+
+            _update_stats(engine, retries=1)
+            time.sleep(delay)
@@ -0,0 +1,118 @@
+"""
+Shared HTTP session management for the API clients
+
+All API clients send their requests through one pooled requests.Session, so
+DNS, TCP and TLS setup are paid once per connection instead of once per
+clipboard copy.
+"""
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+
+
+class SessionManager:
+    """Owns a pooled, keep-alive requests.Session shared by all API clients"""
+
+    def __init__(self, pool_connections=4, pool_maxsize=8, connect_timeout=5, read_timeout=30):
+        """Initialize the session manager
+
+        Args:
+            pool_connections (int): Number of hosts to keep connection pools for
+            pool_maxsize (int): Maximum connections kept alive per host
+            connect_timeout (float): Seconds to wait for a connection
+            read_timeout (float): Seconds to wait for response data
+        """
+        self.pool_connections = pool_connections
+        self.pool_maxsize = pool_maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def timeout(self):
+        """Default (connect, read) timeout for requests"""
+        return (self.connect_timeout, self.read_timeout)
+
+    def configure(self, pool_connections=None, pool_maxsize=None,
+                  connect_timeout=None, read_timeout=None):
+        """Change pool sizes or timeouts
+
+        Pool size changes take effect on the next request, with a new session.
+        """
+        with self._lock:
+            if pool_connections is not None:
+                self.pool_connections = pool_connections
+            if pool_maxsize is not None:
+                self.pool_maxsize = pool_maxsize
+            if connect_timeout is not None:
+                self.connect_timeout = connect_timeout
+            if read_timeout is not None:
+                self.read_timeout = read_timeout
+            self._close_session()
+
+    def get_session(self):
+        """Get the shared session, creating it on first use
+
+        Returns:
+            requests.Session: Session with pooled HTTP(S) adapters
+        """
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                # Retries are handled by the API layer, not by urllib3
+                adapter = HTTPAdapter(
+                    pool_connections=self.pool_connections,
+                    pool_maxsize=self.pool_maxsize,
+                    max_retries=0
+                )
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                self._session = session
+            return self._session
+
+    def post(self, url, **kwargs):
+        """POST through the shared session using the default timeout"""
+        kwargs.setdefault("timeout", self.timeout)
+        return self.get_session().post(url, **kwargs)
+
+    def prewarm(self, url):
+        """Open a pooled connection to `url` in the background
+
+        Sends a HEAD request so the TCP/TLS handshake is already done when
+        the first translation is requested. Failures are ignored.
+
+        Returns:
+            threading.Thread: The background thread
+        """
+        def warm():
+            try:
+                self.get_session().head(url, timeout=self.timeout)
+            except requests.RequestException:
+                pass
+
+        thread = threading.Thread(target=warm)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def close(self):
+        """Close the shared session and its pooled connections"""
+        with self._lock:
+            self._close_session()
+
+    def _close_session(self):
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+
+# Shared instance used by all API clients
+_session_manager = SessionManager()
+
+
+def get_session_manager():
+    """Get the shared SessionManager"""
+    return _session_manager
@@ -0,0 +1,87 @@
+"""
+Text segmentation for translating large clipboard payloads in chunks
+"""
+import re
+
+from utils.token_estimator import estimate_tokens
+
+# Paragraph breaks: a newline followed by optional whitespace and another newline
+PARAGRAPH_PATTERN = re.compile(r".*?(?:\n[ \t]*\n\s*|$)", re.S)
+
+# Sentences end with terminal punctuation followed by whitespace
+SENTENCE_PATTERN = re.compile(r".*?(?:[.!?。！？]+[\"')\]]*\s+|$)", re.S)
+
+# Words with their trailing whitespace
+WORD_PATTERN = re.compile(r"\S*\s*")
+
+# Leading whitespace, content, trailing whitespace
+EDGES_PATTERN = re.compile(r"(\s*)(.*?)(\s*)$", re.S)
+
+
+def _pieces(text, pattern):
+    """Split text with a pattern whose matches cover the whole string"""
+    return [piece for piece in pattern.findall(text) if piece]
+
+
+def _units(text, max_tokens, estimate):
+    """Break text into units no larger than max_tokens where possible
+
+    Paragraphs are preferred, then sentences, then words. A single word
+    larger than the budget is cut into fixed-size pieces.
+    """
+    units = []
+    for paragraph in _pieces(text, PARAGRAPH_PATTERN):
+        if estimate(paragraph) <= max_tokens:
+            units.append(paragraph)
+            continue
+
+        for sentence in _pieces(paragraph, SENTENCE_PATTERN):
+            if estimate(sentence) <= max_tokens:
+                units.append(sentence)
+                continue
+
+            for word in _pieces(sentence, WORD_PATTERN):
+                if estimate(word) <= max_tokens:
+                    units.append(word)
+                    continue
+
+                size = max(1, len(word) * max_tokens // estimate(word))
+                units.extend(word[i:i + size] for i in range(0, len(word), size))
+    return units
+
+
+def split_text(text, max_tokens=800, estimate=estimate_tokens):
+    """Split text into chunks of at most max_tokens on natural boundaries
+
+    Joining the returned chunks gives back the original text exactly, so
+    whitespace and line breaks between chunks are preserved.
+
+    Args:
+        text (str): Text to split
+        max_tokens (int): Token budget per chunk
+        estimate (callable): Function estimating the tokens in a string
+
+    Returns:
+        list: Chunks of text, in order
+    """
+    chunks = []
+    current = ""
+    current_tokens = 0
+
+    for unit in _units(text, max_tokens, estimate):
+        unit_tokens = estimate(unit)
+        if current and current_tokens + unit_tokens > max_tokens:
+            chunks.append(current)
+            current = ""
+            current_tokens = 0
+        current += unit
+        current_tokens += unit_tokens
+
+    if current or not chunks:
+        chunks.append(current)
+    return chunks
+
+
+def split_edges(chunk):
+    """Separate a chunk into (leading whitespace, content, trailing whitespace)"""
+    return EDGES_PATTERN.match(chunk).groups()
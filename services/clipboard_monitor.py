@@ -4,31 +4,106 @@ Clipboard monitoring service for the translator
 """
 import threading
 import time
-import pyperclip
 
-from services.translator import translate_text
-from utils.text_analyzer import is_code
+from config.languages import AUTO_DETECT
+from services.api.budget import get_budget_tracker
+from services.api.circuit_breaker import (
+    OPEN, add_state_listener, get_circuit_states, remove_state_listener)
+from services.api.rate_limiter import get_rate_limiter_states
+from services.api.registry import get_provider
+from services.api.retry import get_retry_stats
+from services.clipboard_sources import PollingClipboardSource, create_clipboard_source
+from services.glossary import format_terms
+from services.preflight import PreflightFilter
+from services.prompts import get_prompt_builder
+from services.translation_memory import request_key
+from services.translation_pipeline import TranslationPipeline
+from services.translator import (
+    EngineUsage, add_downgrade_listener, build_context, get_failover_candidates,
+    remove_downgrade_listener, translate_mixed, translate_table, translate_text,
+    translate_text_chunked)
+from utils.text_analyzer import CODE, CODE_SCAN_LIMIT, MIXED, classify_content, is_tabular
+
+
+class StaleTranslationError(Exception):
+    """Raised from a stream's callback to stop a translation nobody will see"""
 
 
 class ClipboardMonitor:
-    """Monitors clipboard for text to translate"""
+    """Monitors clipboard for text to translate
+    
+    A detector thread watches the clipboard and queues new text; translations
+    run on a TranslationPipeline. If the clipboard changes again before a
+    translation finishes, the result is stale: with stale_policy "drop" it is
+    discarded, with "history" it is reported to on_translation_complete but
+    never written to the clipboard.
+    """
+    
+    # Seconds a change source may block before the loop re-checks `monitoring`
+    WAIT_TIMEOUT = 0.5
     
-    def __init__(self, on_text_detected=None, on_translation_complete=None, on_error=None):
+    def __init__(self, on_text_detected=None, on_translation_complete=None, on_error=None,
+                 source=None, workers=2, max_queue=8, stale_policy="drop", cache=None,
+                 on_partial_translation=None, stream=True, chunk_max_tokens=800,
+                 chunk_concurrency=4, on_status=None,
+                 skip_target_language=True, language_confidence=0.9, token_counter=None,
+                 translation_memory=None, glossary=None):
         """Initialize the clipboard monitor
         
         Args:
             on_text_detected: Callback when text is detected
             on_translation_complete: Callback when translation is complete
             on_error: Callback when an error occurs
+            source: ClipboardSource used to detect changes (auto-detected if None)
+            workers: Number of translation worker threads
+            max_queue: Maximum number of queued translations
+            stale_policy: "drop" or "history" for results of outdated text
+            cache: TranslationCache consulted before calling the API (optional)
+            on_partial_translation: Callback with (original, partial_text) while a
+                translation is streamed, and (original, None) if the stream stops
+                without a translation being reported
+            stream: Stream translations when on_partial_translation is set
+            chunk_max_tokens: Texts larger than this are translated in chunks
+            chunk_concurrency: Maximum number of chunks translated at once
+            on_status: Callback with a status message, e.g. when an engine's
+                circuit breaker opens or closes
+            skip_target_language: Don't translate text already in the target language
+            language_confidence: Confidence needed to act on the detected language
+            token_counter: TokenCounter recording the usage of each translation (optional)
+            translation_memory: TranslationMemory consulted after the cache, whose
+                matches are reused or sent to the engine as examples (optional)
+            glossary: Glossary whose terms found in a text are sent with it and
+                checked in its translation (optional)
         """
         self.on_text_detected = on_text_detected
         self.on_translation_complete = on_translation_complete
         self.on_error = on_error
+        self.on_partial_translation = on_partial_translation
+        self.on_status = on_status
+        self.stream = stream
+        self.chunk_max_tokens = chunk_max_tokens
+        self.chunk_concurrency = chunk_concurrency
+        self.source = source or create_clipboard_source()
+        self.stale_policy = stale_policy
+        self.cache = cache
+        self.token_counter = token_counter
+        self.translation_memory = translation_memory
+        self.glossary = glossary
+        self.preflight = PreflightFilter(
+            skip_target_language=skip_target_language,
+            language_confidence=language_confidence)
+        self.pipeline = TranslationPipeline(
+            self._translate_job, workers=workers, max_queue=max_queue)
         
         self.monitoring = False
         self.last_clipboard = ""
         self.monitor_thread = None
         
+        # Clipboard generation, bumped on every external clipboard change
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._last_seen = None
+        
         # Translation settings
         self.api_key = ""
         self.source_lang = ""
@@ -59,7 +134,20 @@ class ClipboardMonitor:
         self.context = context
         self.engine = engine
         
+        # Open the change source, falling back to polling if it is unusable
+        try:
+            self.source.open()
+        except Exception as e:
+            print(f"Clipboard source '{self.source.name}' unavailable: {str(e)}")
+            self.source = PollingClipboardSource()
+            self.source.open()
+        
         # Start monitoring
+        self._last_seen = None
+        add_state_listener(self._on_circuit_change)
+        get_budget_tracker().add_listener(self._on_budget_warning)
+        add_downgrade_listener(self._on_downgrade_skipped)
+        self.pipeline.start()
         self.monitoring = True
         self.monitor_thread = threading.Thread(target=self._monitor_loop)
         self.monitor_thread.daemon = True
@@ -71,50 +159,320 @@ class ClipboardMonitor:
         if self.monitor_thread:
             self.monitor_thread.join(timeout=1.0)
             self.monitor_thread = None
+        self.pipeline.stop()
+        self.source.close()
+        remove_state_listener(self._on_circuit_change)
+        get_budget_tracker().remove_listener(self._on_budget_warning)
+        remove_downgrade_listener(self._on_downgrade_skipped)
+    
+    def get_stats(self):
+        """Get clipboard detection and translation pipeline counters
+        
+        Returns:
+            dict: {"source": detection counters, "pipeline": queue counters,
+                   "rate_limits": limiter state per engine and API key,
+                   "retries": retry and hedging counters per engine,
+                   "circuits": circuit breaker state per engine,
+                   "preflight": texts skipped before translation and the calls
+                   and tokens avoided,
+                   "budgets": spend per engine against its budget,
+                   "translation_memory": lookups, reused translations and fuzzy
+                   matches (when a translation memory is used),
+                   "glossary": terms found and terms missing from translations
+                   (when a glossary is used),
+                   "prompts": prompt size per template and of the last request}
+        """
+        source_stats = self.source.stats.snapshot()
+        source_stats["name"] = self.source.name
+        stats = {
+            "source": source_stats,
+            "pipeline": self.pipeline.get_stats(),
+            "rate_limits": get_rate_limiter_states(),
+            "retries": get_retry_stats(),
+            "circuits": get_circuit_states(),
+            "preflight": self.preflight.stats.snapshot(),
+            "budgets": get_budget_tracker().get_status(),
+            "prompts": get_prompt_builder().get_stats()
+        }
+        if self.translation_memory:
+            stats["translation_memory"] = self.translation_memory.get_stats()
+        if self.glossary:
+            stats["glossary"] = self.glossary.get_stats()
+        return stats
+    
+    def _record_usage(self, job, source_lang, translated, usage, cached):
+        """Record a finished translation in the token counter
+        
+        Tokens are recorded under the engines that served the requests,
+        which failover or budget downgrades may have picked instead of the
+        selected one. A translation served by several engines is recorded
+        once per engine; the sizes and latency go with the one that used
+        the most tokens.
+        """
+        items = usage.items() or [(self.engine, 0, 0)]
+        for index, (engine, prompt_tokens, completion_tokens) in enumerate(items):
+            first = index == 0
+            self.token_counter.record_request(
+                engine=engine,
+                model=get_provider(engine).model,
+                source_lang=source_lang,
+                target_lang=self.target_lang,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens,
+                latency=time.monotonic() - job.started_at if first else 0.0,
+                cached=cached,
+                bytes_in=len(job.text.encode("utf-8")) if first else 0,
+                bytes_out=len(translated.encode("utf-8")) if first else 0
+            )
+    
+    def _on_budget_warning(self, engine, limit, used, allowed):
+        """Report an engine nearing one of its budget limits"""
+        if self.on_status:
+            self.on_status(
+                f"{engine} has used {used / allowed:.0%} of its {limit.replace('_', ' ')} budget")
+    
+    def _on_downgrade_skipped(self, engine, downgrade):
+        """Report a budget downgrade that can't happen for lack of an API key"""
+        if self.on_status:
+            self.on_status(f"{engine} budget nearly used, but {downgrade} has no API key: "
+                           f"still using {engine}")
+    
+    def _on_circuit_change(self, engine, previous, state):
+        """Report circuit breaker transitions of the engines in use"""
+        if not self.on_status:
+            return
+        if state == OPEN:
+            fallbacks = [candidate for candidate, _ in
+                         get_failover_candidates(self.engine, self.api_key) if candidate != engine]
+            if fallbacks:
+                self.on_status(f"{engine} is failing, using {', '.join(fallbacks)}")
+            else:
+                self.on_status(f"{engine} is unavailable, retrying later")
+        elif previous == OPEN:
+            self.on_status(f"{engine} is being retried")
+        else:
+            self.on_status(f"{engine} recovered")
     
     def _monitor_loop(self):
-        """Main monitoring loop"""
+        """Detector loop: watch the clipboard and queue new text"""
         while self.monitoring:
             try:
-                # Get current clipboard content
-                current_clipboard = pyperclip.paste()
+                # Wait for the clipboard to change
+                current_clipboard = self.source.wait_for_change(self.WAIT_TIMEOUT)
+                if current_clipboard is None:
+                    continue
                 
-                # Check if it's new content and not empty
-                if (current_clipboard != self.last_clipboard and
-                        current_clipboard.strip() and
-                        not is_code(current_clipboard)):
+                with self._lock:
+                    # Ignore our own translations and repeated notifications
+                    if current_clipboard in (self.last_clipboard, self._last_seen):
+                        continue
+                    
+                    # Any other change makes in-flight translations stale
+                    self._last_seen = current_clipboard
+                    self._generation += 1
+                    generation = self._generation
+                
+                if not current_clipboard.strip():
+                    continue
+                
+                # Check if it's text worth translating (code-only content isn't);
+                # huge payloads are judged by their beginning and classified
+                # in full by the worker
+                analysis = classify_content(current_clipboard[:CODE_SCAN_LIMIT])
+                if analysis.kind != CODE:
                     
                     # Notify text detected
                     if self.on_text_detected:
                         self.on_text_detected(current_clipboard)
                     
-                    # Translate text
-                    translated, token_count = translate_text(
-                        text=current_clipboard,
-                        source_lang=self.source_lang,
-                        target_lang=self.target_lang,
-                        tone=self.tone,
-                        context=self.context,
-                        engine=self.engine,
-                        api_key=self.api_key
+                    if len(current_clipboard) > CODE_SCAN_LIMIT:
+                        analysis = None
+                    self.pipeline.submit(current_clipboard, generation, analysis)
+            
+            except Exception as e:
+                # Notify error
+                if self.on_error:
+                    self.on_error(str(e))
+                
+                # Back off so a persistent failure doesn't spin the loop
+                time.sleep(self.WAIT_TIMEOUT)
+    
+    def _is_stale(self, job):
+        """Check whether the clipboard changed after the job was queued"""
+        with self._lock:
+            return job.generation != self._generation
+    
+    def _make_chunk_handler(self, job):
+        """Create the on_chunk callback that reports a job's partial text"""
+        pieces = []
+        
+        def on_chunk(piece):
+            if job.first_chunk_at is None:
+                job.first_chunk_at = time.monotonic()
+            pieces.append(piece)
+            
+            # Nobody will see the result of a dropped job: stop the stream
+            if self.stale_policy == "drop" and self._is_stale(job):
+                raise StaleTranslationError("Clipboard changed during translation")
+            self.on_partial_translation(job.text, "".join(pieces))
+        
+        return on_chunk
+    
+    def _end_partial(self, job):
+        """Remove the preview of a streamed job that won't be reported"""
+        if job.first_chunk_at is not None and self.on_partial_translation:
+            self.on_partial_translation(job.text, None)
+    
+    def _translate_job(self, job):
+        """Worker stage: translate a queued job and publish the result"""
+        # Don't pay for a translation nobody will see
+        if self.stale_policy == "drop" and self._is_stale(job):
+            self.pipeline.stats.increment("dropped_stale")
+            return
+        
+        # Pre-flight: numbers, URLs, identifiers and text already in the
+        # target language never reach the API
+        preflight = self.preflight.check(
+            job.text, self.source_lang, self.target_lang, self.tone, self.context, self.engine)
+        if preflight.skipped:
+            if self.on_status:
+                self.on_status(f"Not translated ({preflight.skip_reason})")
+            return
+        
+        # Fill in an automatic source language with the detected one
+        source_lang = self.source_lang
+        if source_lang == AUTO_DETECT and preflight.language:
+            source_lang = preflight.language
+        
+        # Only the glossary terms in the text are sent with it
+        context = self.context
+        additions = ""
+        terms = self.glossary.find_terms(job.text) if self.glossary else []
+        if terms:
+            additions = format_terms(terms)
+            context = f"{self.context} {additions}".strip()
+        
+        request = {
+            "text": job.text,
+            "source_lang": source_lang,
+            "target_lang": self.target_lang,
+            "tone": self.tone,
+            "context": context,
+            "engine": self.engine
+        }
+        
+        # Cache hits bypass the network and cost no tokens
+        translated = self.cache.get(**request) if self.cache else None
+        cached = translated is not None
+        token_count = 0
+        usage = EngineUsage()
+        
+        # Text differing from a past one only in its numbers reuses its
+        # translation if it was made with the same settings; similar text
+        # sends the past one as an example
+        memory_key = request_key(source_lang, self.tone, context)
+        if not cached and self.translation_memory:
+            match = self.translation_memory.lookup(job.text, self.target_lang, memory_key)
+            if match and match.reusable:
+                translated = match.translated
+                cached = True
+            elif match:
+                additions = f"{additions} {match.as_example()}"
+        
+        if not cached:
+            # The user's context is compiled into the prompt, the additions
+            # of this text are appended to it; the estimate and every request
+            # of the job use the same template
+            engine_request = dict(request, context=self.context, additions=additions,
+                                  template=get_prompt_builder().choose_template())
+            provider = get_provider(self.engine)
+            prompt_tokens, completion_tokens = provider.estimate_request(
+                job.text, build_context(
+                    source_lang, self.target_lang, self.tone, self.context,
+                    engine_request["template"], additions))
+            if self.on_status:
+                self.on_status(f"Translating (~{prompt_tokens + completion_tokens:,} tokens, "
+                               f"prompt ~{prompt_tokens:,})")
+            
+            try:
+                analysis = job.analysis or classify_content(job.text)
+                if analysis.kind == MIXED:
+                    # Only the prose is sent; code is kept as it is
+                    translated, token_count = translate_mixed(
+                        api_key=self.api_key,
+                        analysis=analysis,
+                        max_batch_tokens=self.chunk_max_tokens,
+                        usage=usage,
+                        **engine_request
+                    )
+                elif is_tabular(job.text):
+                    # Spreadsheet cells and label lists go out in batches
+                    translated, token_count = translate_table(
+                        api_key=self.api_key,
+                        max_batch_tokens=self.chunk_max_tokens,
+                        usage=usage,
+                        **engine_request
+                    )
+                elif provider.estimate_tokens(job.text) > self.chunk_max_tokens:
+                    # Large payloads are split and translated in parallel
+                    translated, token_count = translate_text_chunked(
+                        api_key=self.api_key,
+                        max_chunk_tokens=self.chunk_max_tokens,
+                        max_workers=self.chunk_concurrency,
+                        usage=usage,
+                        **engine_request
                     )
+                else:
+                    on_chunk = None
+                    if self.stream and self.on_partial_translation:
+                        on_chunk = self._make_chunk_handler(job)
                     
-                    if translated:
-                        # Store as last clipboard to prevent loops
-                        self.last_clipboard = translated
-                        
-                        # Copy to clipboard
-                        pyperclip.copy(translated)
-                        
-                        # Notify translation complete
-                        if self.on_translation_complete:
-                            self.on_translation_complete(
-                                current_clipboard, translated, token_count)
-            
+                    translated, token_count = translate_text(
+                        api_key=self.api_key, on_chunk=on_chunk, usage=usage, **engine_request)
+            except StaleTranslationError:
+                self.pipeline.stats.increment("dropped_stale")
+                self._end_partial(job)
+                return
             except Exception as e:
+                self._end_partial(job)
                 # Notify error
                 if self.on_error:
                     self.on_error(str(e))
+                raise
             
-            # Sleep to reduce CPU usage
-            time.sleep(0.5)
+            if translated and self.cache:
+                self.cache.put(translated=translated, **request)
+        
+        if not translated:
+            return
+        
+        if self.token_counter:
+            self._record_usage(job, source_lang, translated, usage, cached)
+        
+        with self._lock:
+            stale = job.generation != self._generation
+            if not stale:
+                # Store as last clipboard to prevent loops; copying the
+                # original again is then a new change
+                self.last_clipboard = translated
+                self._last_seen = translated
+                
+                # Copy to clipboard
+                self.source.write(translated)
+        
+        if stale:
+            self.pipeline.stats.increment("dropped_stale")
+            if self.stale_policy == "drop":
+                self._end_partial(job)
+                return
+        
+        # Notify translation complete
+        if self.on_translation_complete:
+            self.on_translation_complete(job.text, translated, token_count, cached=cached,
+                                         source_lang=source_lang, request_key=memory_key)
+        
+        # Check the approved translations of the glossary terms were used
+        missing = self.glossary.verify(terms, translated) if terms else []
+        if missing and self.on_status:
+            self.on_status("Glossary terms not used: " + ", ".join(
+                f"{term.source} → {term.target}" for term in missing))
@@ -0,0 +1,429 @@
+"""
+Clipboard change sources for the clipboard monitor
+
+A change source tells the monitor when the clipboard may hold new content.
+Event-driven sources sleep until the platform reports a change, while the
+polling source keeps the original behaviour of reading the clipboard on a
+fixed interval and is used as a fallback everywhere else.
+"""
+import abc
+import ctypes
+import ctypes.util
+import os
+import select
+import sys
+import threading
+import time
+
+import pyperclip
+
+
+class ClipboardSourceStats:
+    """Wakeup and detection latency counters for a change source"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        """Reset all counters"""
+        with self._lock:
+            self.wakeups = 0
+            self.changes = 0
+            self.total_latency = 0.0
+            self.max_latency = 0.0
+            self.last_latency = 0.0
+
+    def record_wakeup(self):
+        """Record that the source woke up to look at the clipboard"""
+        with self._lock:
+            self.wakeups += 1
+
+    def record_change(self, signalled_at):
+        """Record a detected change
+
+        Args:
+            signalled_at (float): time.monotonic() value of the moment the
+                change happened (or the earliest moment it could have happened)
+        """
+        latency = max(0.0, time.monotonic() - signalled_at)
+        with self._lock:
+            self.changes += 1
+            self.total_latency += latency
+            self.last_latency = latency
+            self.max_latency = max(self.max_latency, latency)
+
+    def snapshot(self):
+        """Get a copy of the counters
+
+        Returns:
+            dict: Counter values, latencies in milliseconds
+        """
+        with self._lock:
+            avg = self.total_latency / self.changes if self.changes else 0.0
+            return {
+                "wakeups": self.wakeups,
+                "changes": self.changes,
+                "avg_latency_ms": avg * 1000,
+                "max_latency_ms": self.max_latency * 1000,
+                "last_latency_ms": self.last_latency * 1000
+            }
+
+
+class ClipboardSource(abc.ABC):
+    """Base class for clipboard change sources
+
+    Subclasses implement _wait(), which blocks for at most `timeout` seconds
+    and returns the new clipboard text, or None if nothing changed.
+    """
+
+    name = "base"
+
+    def __init__(self):
+        self.stats = ClipboardSourceStats()
+        self._primed = False
+
+    def open(self):
+        """Acquire any resources needed to watch the clipboard"""
+        self._primed = False
+
+    def close(self):
+        """Release resources acquired by open()"""
+
+    def read(self):
+        """Read the current clipboard text"""
+        return pyperclip.paste()
+
+    def write(self, text):
+        """Replace the clipboard text"""
+        pyperclip.copy(text)
+
+    def wait_for_change(self, timeout):
+        """Wait until the clipboard may have changed
+
+        The first call after open() returns the current clipboard content
+        immediately, so text copied before monitoring started is still seen.
+
+        Args:
+            timeout (float): Maximum number of seconds to block
+
+        Returns:
+            str: Current clipboard text, or None if nothing changed
+        """
+        if not self._primed:
+            self._primed = True
+            self.stats.record_wakeup()
+            return self.read()
+        return self._wait(timeout)
+
+    @abc.abstractmethod
+    def _wait(self, timeout):
+        """Block until the clipboard changes or timeout seconds pass
+
+        Returns:
+            str: The new clipboard text, or None if nothing changed
+        """
+
+
+class PollingClipboardSource(ClipboardSource):
+    """Reads the clipboard on a fixed interval (original behaviour)"""
+
+    name = "polling"
+
+    def __init__(self, interval=0.5, reader=None, writer=None):
+        """Initialize the polling source
+
+        Args:
+            interval (float): Seconds between clipboard reads
+            reader (callable, optional): Replacement for pyperclip.paste
+            writer (callable, optional): Replacement for pyperclip.copy
+        """
+        super().__init__()
+        self.interval = interval
+        self.reader = reader or pyperclip.paste
+        self.writer = writer or pyperclip.copy
+        self._last_value = None
+        self._last_poll = time.monotonic()
+
+    def open(self):
+        super().open()
+        self._last_value = None
+        self._last_poll = time.monotonic()
+
+    def read(self):
+        value = self.reader()
+        self._last_value = value
+        self._last_poll = time.monotonic()
+        return value
+
+    def write(self, text):
+        self.writer(text)
+
+    def _wait(self, timeout):
+        time.sleep(min(self.interval, timeout))
+        self.stats.record_wakeup()
+
+        previous_poll = self._last_poll
+        previous_value = self._last_value
+        value = self.read()
+        if value == previous_value:
+            return None
+
+        # The change happened at some point since the previous read, so the
+        # latency recorded here is the worst case for this poll
+        self.stats.record_change(previous_poll)
+        return value
+
+
+class LocalClipboard:
+    """In-process clipboard stand-in that notifies waiters on every write
+
+    Used for benchmarks and headless environments where no system clipboard
+    is available.
+    """
+
+    def __init__(self, text=""):
+        self._condition = threading.Condition()
+        self._text = text
+        self._sequence = 0
+        self._written_at = time.monotonic()
+
+    def copy(self, text):
+        """Write text to the stand-in clipboard"""
+        with self._condition:
+            self._text = text
+            self._sequence += 1
+            self._written_at = time.monotonic()
+            self._condition.notify_all()
+
+    def paste(self):
+        """Read text from the stand-in clipboard"""
+        with self._condition:
+            return self._text
+
+    def wait(self, sequence, timeout):
+        """Wait for a write newer than `sequence`
+
+        Returns:
+            tuple: (sequence, text, written_at) after the wait
+        """
+        with self._condition:
+            self._condition.wait_for(lambda: self._sequence != sequence, timeout)
+            return self._sequence, self._text, self._written_at
+
+
+class LocalClipboardSource(ClipboardSource):
+    """Event-driven source watching a LocalClipboard"""
+
+    name = "local"
+
+    def __init__(self, clipboard=None):
+        super().__init__()
+        self.clipboard = clipboard or LocalClipboard()
+        self._sequence = 0
+
+    def read(self):
+        sequence, text, _ = self.clipboard.wait(-1, 0)
+        self._sequence = sequence
+        return text
+
+    def write(self, text):
+        self.clipboard.copy(text)
+
+    def _wait(self, timeout):
+        sequence, text, written_at = self.clipboard.wait(self._sequence, timeout)
+        if sequence == self._sequence:
+            return None
+
+        self.stats.record_wakeup()
+        self._sequence = sequence
+        self.stats.record_change(written_at)
+        return text
+
+
+class XFixesClipboardSource(ClipboardSource):
+    """Event-driven source using X11 XFixes selection-owner notifications
+
+    The X server tells us whenever another client takes ownership of the
+    CLIPBOARD selection, so the clipboard is only read after a real copy.
+    """
+
+    name = "xfixes"
+
+    # XFixes selection event masks and event codes
+    SET_SELECTION_OWNER_NOTIFY_MASK = 1 << 0
+    SELECTION_WINDOW_DESTROY_NOTIFY_MASK = 1 << 1
+    SELECTION_CLIENT_CLOSE_NOTIFY_MASK = 1 << 2
+    SELECTION_NOTIFY = 0
+
+    def __init__(self):
+        super().__init__()
+        self._xlib = None
+        self._xfixes = None
+        self._display = None
+        self._fd = None
+        self._event_base = 0
+
+    @classmethod
+    def is_available(cls):
+        """Check whether an X display and the XFixes library can be used"""
+        if not os.environ.get("DISPLAY"):
+            return False
+        return bool(ctypes.util.find_library("X11") and
+                    ctypes.util.find_library("Xfixes"))
+
+    def _load_libraries(self):
+        xlib = ctypes.cdll.LoadLibrary(ctypes.util.find_library("X11"))
+        xfixes = ctypes.cdll.LoadLibrary(ctypes.util.find_library("Xfixes"))
+
+        xlib.XOpenDisplay.argtypes = [ctypes.c_char_p]
+        xlib.XOpenDisplay.restype = ctypes.c_void_p
+        xlib.XCloseDisplay.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.argtypes = [ctypes.c_void_p]
+        xlib.XDefaultRootWindow.restype = ctypes.c_ulong
+        xlib.XInternAtom.argtypes = [ctypes.c_void_p, ctypes.c_char_p, ctypes.c_int]
+        xlib.XInternAtom.restype = ctypes.c_ulong
+        xlib.XConnectionNumber.argtypes = [ctypes.c_void_p]
+        xlib.XPending.argtypes = [ctypes.c_void_p]
+        xlib.XNextEvent.argtypes = [ctypes.c_void_p, ctypes.c_void_p]
+        xlib.XFlush.argtypes = [ctypes.c_void_p]
+
+        xfixes.XFixesQueryExtension.argtypes = [
+            ctypes.c_void_p, ctypes.POINTER(ctypes.c_int), ctypes.POINTER(ctypes.c_int)]
+        xfixes.XFixesSelectSelectionInput.argtypes = [
+            ctypes.c_void_p, ctypes.c_ulong, ctypes.c_ulong, ctypes.c_ulong]
+
+        return xlib, xfixes
+
+    def open(self):
+        super().open()
+        if self._display:
+            return
+
+        self._xlib, self._xfixes = self._load_libraries()
+        display = self._xlib.XOpenDisplay(None)
+        if not display:
+            raise RuntimeError("Cannot open X display")
+
+        event_base = ctypes.c_int()
+        error_base = ctypes.c_int()
+        if not self._xfixes.XFixesQueryExtension(
+                display, ctypes.byref(event_base), ctypes.byref(error_base)):
+            self._xlib.XCloseDisplay(display)
+            raise RuntimeError("XFixes extension not available")
+
+        root = self._xlib.XDefaultRootWindow(display)
+        clipboard_atom = self._xlib.XInternAtom(display, b"CLIPBOARD", False)
+        mask = (self.SET_SELECTION_OWNER_NOTIFY_MASK |
+                self.SELECTION_WINDOW_DESTROY_NOTIFY_MASK |
+                self.SELECTION_CLIENT_CLOSE_NOTIFY_MASK)
+        self._xfixes.XFixesSelectSelectionInput(display, root, clipboard_atom, mask)
+        self._xlib.XFlush(display)
+
+        self._display = display
+        self._fd = self._xlib.XConnectionNumber(display)
+        self._event_base = event_base.value
+
+    def close(self):
+        if self._display:
+            self._xlib.XCloseDisplay(self._display)
+        self._display = None
+        self._fd = None
+
+    def _drain_events(self):
+        """Consume queued X events and report whether the selection changed"""
+        changed = False
+        # XEvent is a union padded to 24 longs
+        event = (ctypes.c_long * 24)()
+        while self._xlib.XPending(self._display):
+            self._xlib.XNextEvent(self._display, event)
+            event_type = ctypes.cast(event, ctypes.POINTER(ctypes.c_int))[0]
+            if event_type == self._event_base + self.SELECTION_NOTIFY:
+                changed = True
+        return changed
+
+    def _wait(self, timeout):
+        if not self._xlib.XPending(self._display):
+            readable, _, _ = select.select([self._fd], [], [], timeout)
+            if not readable:
+                return None
+
+        self.stats.record_wakeup()
+        signalled_at = time.monotonic()
+        if not self._drain_events():
+            return None
+
+        text = self.read()
+        self.stats.record_change(signalled_at)
+        return text
+
+
+class Win32ClipboardSource(ClipboardSource):
+    """Windows source watching the clipboard sequence number
+
+    GetClipboardSequenceNumber is a cheap system call, so it can be checked
+    often without reading (and copying) the clipboard content each time.
+    """
+
+    name = "win32"
+
+    def __init__(self, interval=0.05):
+        super().__init__()
+        self.interval = interval
+        self._user32 = None
+        self._sequence = None
+
+    @classmethod
+    def is_available(cls):
+        """Check whether the Win32 clipboard API can be used"""
+        return sys.platform == "win32"
+
+    def open(self):
+        super().open()
+        self._user32 = ctypes.windll.user32
+        self._user32.GetClipboardSequenceNumber.restype = ctypes.c_uint32
+        self._sequence = self._user32.GetClipboardSequenceNumber()
+
+    def _wait(self, timeout):
+        deadline = time.monotonic() + timeout
+        last_check = time.monotonic()
+        while True:
+            sequence = self._user32.GetClipboardSequenceNumber()
+            if sequence != self._sequence:
+                break
+            last_check = time.monotonic()
+            if last_check >= deadline:
+                return None
+            time.sleep(min(self.interval, deadline - last_check))
+
+        self.stats.record_wakeup()
+        self._sequence = sequence
+        text = self.read()
+        self.stats.record_change(last_check)
+        return text
+
+
+# Available backends, in "auto" preference order
+CLIPBOARD_BACKENDS = ["xfixes", "win32", "polling"]
+
+
+def create_clipboard_source(backend="auto", poll_interval=0.5):
+    """Create a clipboard change source
+
+    Args:
+        backend (str): "auto", "xfixes", "win32", "polling" or "local"
+        poll_interval (float): Interval for the polling fallback
+
+    Returns:
+        ClipboardSource: The requested source, or the polling fallback when
+            the requested backend is not available on this system
+    """
+    if backend == "local":
+        return LocalClipboardSource()
+
+    if backend in ("auto", "xfixes") and XFixesClipboardSource.is_available():
+        return XFixesClipboardSource()
+    if backend in ("auto", "win32") and Win32ClipboardSource.is_available():
+        return Win32ClipboardSource()
+
+    return PollingClipboardSource(interval=poll_interval)
@@ -0,0 +1,208 @@
+"""
+Glossary of company terminology applied to translations
+
+Terms are matched word by word with an Aho-Corasick automaton, so finding
+the terms in a clipboard payload takes one pass over its words whatever the
+size of the glossary. Only the terms found are added to the instructions
+sent to the engine, and the translation is then checked for their
+approved translations.
+"""
+import csv
+import os
+import re
+import threading
+
+from utils.aho_corasick import AhoCorasick
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def split_words(text):
+    """Get the casefolded words of text and where each one is"""
+    matches = list(WORD_PATTERN.finditer(text.casefold()))
+    return [match.group() for match in matches], [match.span() for match in matches]
+
+
+class GlossaryTerm:
+    """A glossary term found in a text"""
+
+    def __init__(self, source, target, note="", start=0, end=0):
+        """Initialize the term
+
+        Args:
+            source (str): Term in the source language
+            target (str): Approved translation
+            note (str): Usage note for the engine
+            start (int): Position of the term in the text
+            end (int): Position after the term in the text
+        """
+        self.source = source
+        self.target = target
+        self.note = note
+        self.start = start
+        self.end = end
+
+
+class Glossary:
+    """Source terms and their approved translations"""
+
+    FILE = "glossary.tsv"
+
+    def __init__(self, path=None):
+        """Initialize the glossary
+
+        Args:
+            path (str, optional): TSV file the glossary is saved in, or None
+                for the default file
+        """
+        self.path = path or self.FILE
+        self.entries = {}  # Casefolded source words to (source, target, note)
+        self.texts_checked = 0
+        self.terms_found = 0
+        self.terms_missing = 0
+
+        self._matcher = None
+        self._lock = threading.Lock()
+        self.load()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def add(self, source, target, note=""):
+        """Add a term, replacing an existing entry for the same source term
+
+        Returns:
+            bool: False if the source term has no words
+        """
+        words = tuple(split_words(source)[0])
+        if not words or not target.strip():
+            return False
+        with self._lock:
+            self.entries[words] = (source.strip(), target.strip(), note.strip())
+            self._matcher = None
+        return True
+
+    def import_file(self, path):
+        """Add the terms of a CSV or TSV file and save the glossary
+
+        Rows are source term, target term and an optional note. A header
+        row is skipped when its first cell is "source" or "term".
+
+        Returns:
+            int: Number of terms added or updated
+        """
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            sample = f.read(4096)
+            f.seek(0)
+            delimiter = "\t" if path.lower().endswith(".tsv") or "\t" in sample else ","
+            if delimiter == "," and ";" in sample and "," not in sample:
+                delimiter = ";"
+
+            added = 0
+            for row in csv.reader(f, delimiter=delimiter):
+                if len(row) < 2:
+                    continue
+                if added == 0 and row[0].strip().casefold() in ("source", "term"):
+                    continue
+                if self.add(row[0], row[1], row[2] if len(row) > 2 else ""):
+                    added += 1
+        self.save()
+        return added
+
+    def load(self):
+        """Load the saved glossary"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8", newline="") as f:
+                for row in csv.reader(f, delimiter="\t"):
+                    if len(row) >= 2:
+                        self.add(row[0], row[1], row[2] if len(row) > 2 else "")
+        except Exception as e:
+            print(f"Error loading glossary: {str(e)}")
+
+    def save(self):
+        """Save the glossary"""
+        try:
+            with self._lock:
+                rows = list(self.entries.values())
+            with open(self.path, "w", encoding="utf-8", newline="") as f:
+                csv.writer(f, delimiter="\t").writerows(rows)
+        except Exception as e:
+            print(f"Error saving glossary: {str(e)}")
+
+    def clear(self):
+        """Remove every term and save the empty glossary"""
+        with self._lock:
+            self.entries = {}
+            self._matcher = None
+        self.save()
+
+    def find_terms(self, text):
+        """Find the glossary terms in a text
+
+        Overlapping terms resolve to the leftmost, then the longest one;
+        each term is listed once.
+
+        Returns:
+            list: GlossaryTerm for each term found, in order of appearance
+        """
+        if not self.entries:
+            return []
+        words, spans = split_words(text)
+        terms = {}
+        for start, end, (source, target, note) in self._get_matcher().find_longest(words):
+            if source not in terms:
+                terms[source] = GlossaryTerm(source, target, note, spans[start][0], spans[end - 1][1])
+        with self._lock:
+            self.texts_checked += 1
+            self.terms_found += len(terms)
+        return list(terms.values())
+
+    def verify(self, terms, translated):
+        """Find the terms whose approved translation is missing from a translation
+
+        Returns:
+            list: GlossaryTerm of each term not used
+        """
+        translated_words = " ".join(split_words(translated)[0])
+        missing = [term for term in terms
+                   if f" {' '.join(split_words(term.target)[0])} " not in f" {translated_words} "]
+        with self._lock:
+            self.terms_missing += len(missing)
+        return missing
+
+    def get_stats(self):
+        """Get glossary counters
+
+        Returns:
+            dict: Number of terms, texts checked, terms found and terms
+                missing from translations
+        """
+        with self._lock:
+            return {
+                "terms": len(self.entries),
+                "texts_checked": self.texts_checked,
+                "terms_found": self.terms_found,
+                "terms_missing": self.terms_missing
+            }
+
+    def _get_matcher(self):
+        """Get the automaton of the current entries, building it if needed"""
+        with self._lock:
+            if self._matcher is None:
+                matcher = AhoCorasick()
+                for words, entry in self.entries.items():
+                    matcher.add(words, entry)
+                matcher.build()
+                self._matcher = matcher
+            return self._matcher
+
+
+def format_terms(terms):
+    """Describe glossary terms for the engine's instructions"""
+    described = []
+    for term in terms:
+        note = f" ({term.note})" if term.note else ""
+        described.append(f"\"{term.source}\" → \"{term.target}\"{note}")
+    return f"Use estes termos do glossário: {'; '.join(described)}."
@@ -0,0 +1,328 @@
+"""
+Persistent translation history with full-text search
+
+Translations are appended to a SQLite table in WAL mode, with an FTS5
+index over originals and translations kept in sync by triggers. Reading
+the newest entries and searching both walk the rowid in descending order
+and stop at the requested page, so neither depends on the size of the
+history. Retention by age, count and size runs on a background thread.
+"""
+import re
+import sqlite3
+import threading
+import time
+
+# Words of a search query; each must appear in the original or translation
+QUERY_TERM_PATTERN = re.compile(r"\w+")
+
+
+class HistoryStore:
+    """Stores translated entries and searches them"""
+
+    DB_FILE = "translation_history.db"
+
+    # Seconds between retention runs
+    RETENTION_INTERVAL = 600
+
+    # Rows deleted per transaction by retention, so writers aren't held up
+    RETENTION_BATCH = 1000
+
+    def __init__(self, db_file=None, max_age_days=0, max_entries=0, max_size_mb=0):
+        """Initialize the store
+
+        Args:
+            db_file (str, optional): SQLite file of the history, or None for
+                the default file. Pass ":memory:" to disable persistence.
+            max_age_days (float): Entries older than this are deleted (0 to
+                keep them)
+            max_entries (int): Only the newest max_entries are kept (0 for
+                no limit)
+            max_size_mb (float): Oldest entries are deleted while the data
+                takes more than this (0 for no limit)
+        """
+        self.db_file = db_file or self.DB_FILE
+        self.max_age = max_age_days * 86400
+        self.max_entries = max_entries
+        self.max_size = max_size_mb * 1024 * 1024
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._retention_thread = None
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error opening translation history: {str(e)}")
+            self._db = None
+
+    def add(self, source_lang, target_lang, original, translated, cached=False, timestamp=None,
+            request_key=""):
+        """Append an entry to the history
+
+        Args:
+            request_key (str): Key of the settings the text was translated
+                with, which the translation memory checks before reusing it
+
+        Returns:
+            dict: The stored entry, or None if it couldn't be written
+        """
+        entry = {
+            'created_at': timestamp if timestamp is not None else time.time(),
+            'source_lang': source_lang,
+            'target_lang': target_lang,
+            'original': original,
+            'translated': translated,
+            'cached': cached,
+            'request_key': request_key
+        }
+        if not self._db:
+            return None
+
+        with self._lock:
+            try:
+                cursor = self._db.execute(
+                    "INSERT INTO history (created_at, source_lang, target_lang, original, "
+                    "translated, cached, request_key) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (entry['created_at'], source_lang, target_lang, original, translated,
+                     int(cached), request_key))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing translation history: {str(e)}")
+                return None
+        entry['id'] = cursor.lastrowid
+        return entry
+
+    def get_recent(self, limit=1000, before_id=None):
+        """Get a page of entries, newest first
+
+        Args:
+            limit (int): Maximum number of entries
+            before_id (int, optional): Return entries older than this id, to
+                read the page after one already loaded
+
+        Returns:
+            list: Entry dicts
+        """
+        query = "SELECT * FROM history"
+        params = []
+        if before_id is not None:
+            query += " WHERE id < ?"
+            params.append(before_id)
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+        return self._fetch(query, params)
+
+    def get_since(self, after_id=0, limit=1000):
+        """Get a page of entries added after after_id, oldest first"""
+        return self._fetch(
+            "SELECT * FROM history WHERE id > ? ORDER BY id LIMIT ?", (after_id, limit))
+
+    def get_entries(self, ids):
+        """Get the entries with the given ids that are still stored"""
+        ids = list(ids)
+        if not ids:
+            return []
+        return self._fetch(
+            f"SELECT * FROM history WHERE id IN ({', '.join('?' * len(ids))})", ids)
+
+    def get_oldest_id(self):
+        """Get the id of the oldest stored entry, or None if the history is empty"""
+        entries = self._fetch("SELECT * FROM history ORDER BY id LIMIT 1", ())
+        return entries[0]['id'] if entries else None
+
+    def search(self, text, limit=100):
+        """Find entries whose original or translation contains every word of text
+
+        The last word also matches longer words it is the start of, so
+        results can be shown while typing.
+
+        Returns:
+            list: Matching entry dicts, newest first
+        """
+        terms = QUERY_TERM_PATTERN.findall(text)
+        if not terms:
+            return []
+        match = " ".join(f'"{term}"' for term in terms) + "*"
+        return self._fetch(
+            "SELECT * FROM history WHERE id IN ("
+            "SELECT rowid FROM history_fts WHERE history_fts MATCH ? "
+            "ORDER BY rowid DESC LIMIT ?) ORDER BY id DESC",
+            (match, limit))
+
+    def clear(self):
+        """Remove every entry
+
+        The delete trigger would remove each row from the FTS index one by
+        one, so it is dropped while the table is emptied in bulk and the
+        index is emptied with the FTS5 'delete-all' command, all in one
+        transaction.
+        """
+        if not self._db:
+            return
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.execute("BEGIN")
+                    self._db.execute("DROP TRIGGER IF EXISTS history_delete")
+                    self._db.execute("DELETE FROM history")
+                    self._db.execute("INSERT INTO history_fts (history_fts) VALUES ('delete-all')")
+                    self._create_tables()
+            except sqlite3.Error as e:
+                print(f"Error clearing translation history: {str(e)}")
+
+    def start_retention(self):
+        """Apply the retention limits now and every RETENTION_INTERVAL seconds"""
+        if not self._db or self._retention_thread is not None:
+            return
+        if not (self.max_age or self.max_entries or self.max_size):
+            return
+        self._stop_event.clear()
+        self._retention_thread = threading.Thread(target=self._retention_loop)
+        self._retention_thread.daemon = True
+        self._retention_thread.start()
+
+    def apply_retention(self):
+        """Delete the entries outside the age, count and size limits
+
+        Returns:
+            int: Number of entries deleted
+        """
+        if not self._db:
+            return 0
+
+        deleted = 0
+        try:
+            if self.max_age:
+                cutoff = time.time() - self.max_age
+                deleted += self._delete_batches(
+                    "SELECT id FROM history WHERE created_at < ? ORDER BY id LIMIT ?",
+                    lambda: (cutoff, self.RETENTION_BATCH))
+
+            if self.max_entries:
+                with self._lock:
+                    row = self._db.execute(
+                        "SELECT id FROM history ORDER BY id DESC LIMIT 1 OFFSET ?",
+                        (self.max_entries - 1,)).fetchone()
+                if row is not None:
+                    deleted += self._delete_batches(
+                        "SELECT id FROM history WHERE id < ? ORDER BY id LIMIT ?",
+                        lambda: (row[0], self.RETENTION_BATCH))
+
+            if self.max_size:
+                # Deleted pages are reused rather than returned to the disk,
+                # so the size counted is the pages in use
+                while self._get_used_size() > self.max_size and not self._stop_event.is_set():
+                    removed = self._delete_batches(
+                        "SELECT id FROM history ORDER BY id LIMIT ?",
+                        lambda: (self.RETENTION_BATCH,), once=True)
+                    if not removed:
+                        break
+                    deleted += removed
+        except sqlite3.Error as e:
+            print(f"Error applying history retention: {str(e)}")
+        return deleted
+
+    def close(self):
+        """Stop the retention thread and close the database"""
+        self._stop_event.set()
+        if self._retention_thread is not None:
+            self._retention_thread.join(timeout=5)
+            self._retention_thread = None
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _retention_loop(self):
+        """Apply the retention limits until the store is closed"""
+        while not self._stop_event.is_set():
+            self.apply_retention()
+            self._stop_event.wait(self.RETENTION_INTERVAL)
+
+    def _delete_batches(self, select, params, once=False):
+        """Delete the ids a query selects, one batch per transaction
+
+        Args:
+            select (str): Query returning at most RETENTION_BATCH ids
+            params (callable): Returns the query parameters
+            once (bool): Delete a single batch
+
+        Returns:
+            int: Number of entries deleted
+        """
+        deleted = 0
+        while not self._stop_event.is_set():
+            with self._lock:
+                if not self._db:
+                    break
+                ids = self._db.execute(select, params()).fetchall()
+                if ids:
+                    self._db.executemany("DELETE FROM history WHERE id = ?", ids)
+                    self._db.commit()
+            deleted += len(ids)
+            if once or len(ids) < self.RETENTION_BATCH:
+                break
+        return deleted
+
+    def _get_used_size(self):
+        """Get the bytes of the database pages holding data"""
+        with self._lock:
+            page_size = self._db.execute("PRAGMA page_size").fetchone()[0]
+            pages = self._db.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = self._db.execute("PRAGMA freelist_count").fetchone()[0]
+        return (pages - free_pages) * page_size
+
+    def _fetch(self, query, params):
+        """Run a query over the history table and build entry dicts"""
+        if not self._db:
+            return []
+        with self._lock:
+            try:
+                rows = self._db.execute(query, params).fetchall()
+            except sqlite3.Error as e:
+                print(f"Error reading translation history: {str(e)}")
+                return []
+        return [
+            {
+                'id': row[0],
+                'created_at': row[1],
+                'source_lang': row[2],
+                'target_lang': row[3],
+                'original': row[4],
+                'translated': row[5],
+                'cached': bool(row[6]),
+                'request_key': row[7]
+            }
+            for row in rows
+        ]
+
+    def _create_tables(self):
+        """Create the history table, its FTS index and the triggers syncing them"""
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS history ("
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, "
+            "source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, "
+            "original TEXT NOT NULL, translated TEXT NOT NULL, "
+            "cached INTEGER NOT NULL DEFAULT 0, request_key TEXT NOT NULL DEFAULT '')")
+        columns = [row[1] for row in self._db.execute("PRAGMA table_info(history)")]
+        if "request_key" not in columns:
+            # Entries saved before the key was stored never match one
+            self._db.execute(
+                "ALTER TABLE history ADD COLUMN request_key TEXT NOT NULL DEFAULT ''")
+        self._db.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS history_fts USING fts5("
+            "original, translated, content='history', content_rowid='id', "
+            "tokenize='unicode61 remove_diacritics 2')")
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_insert AFTER INSERT ON history BEGIN "
+            "INSERT INTO history_fts (rowid, original, translated) "
+            "VALUES (new.id, new.original, new.translated); END")
+        self._db.execute(
+            "CREATE TRIGGER IF NOT EXISTS history_delete AFTER DELETE ON history BEGIN "
+            "INSERT INTO history_fts (history_fts, rowid, original, translated) "
+            "VALUES ('delete', old.id, old.original, old.translated); END")
@@ -0,0 +1,121 @@
+"""
+Pre-flight checks that keep untranslatable clipboard content off the API
+
+Numbers, URLs, paths, identifiers and text already in the target language
+are recognized before a request is built, and the calls and tokens that
+were avoided are counted.
+"""
+import threading
+
+from services.api.registry import get_provider
+from services.translator import build_context
+from utils.language_id import identify_language
+from utils.text_analyzer import find_noop_reason
+
+
+class PreflightResult:
+    """Outcome of PreflightFilter.check"""
+
+    def __init__(self, skip_reason=None, language=None, confidence=0.0):
+        """Initialize the result
+
+        Args:
+            skip_reason (str, optional): Why the text needs no translation,
+                or None if it should be translated
+            language (str, optional): Language detected with enough confidence
+            confidence (float): Confidence of the detected language
+        """
+        self.skip_reason = skip_reason
+        self.language = language
+        self.confidence = confidence
+
+    @property
+    def skipped(self):
+        """True if the text should not be sent to the API"""
+        return self.skip_reason is not None
+
+
+class PreflightStats:
+    """Counters of checked texts and of the work avoided"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checked = 0
+        self.passed = 0
+        self.skipped = {}
+        self.calls_avoided = 0
+        self.tokens_avoided = 0
+
+    def record(self, result, tokens=0):
+        """Record a check result and the tokens a request would have cost"""
+        with self._lock:
+            self.checked += 1
+            if result.skipped:
+                self.skipped[result.skip_reason] = self.skipped.get(result.skip_reason, 0) + 1
+                self.calls_avoided += 1
+                self.tokens_avoided += tokens
+            else:
+                self.passed += 1
+
+    def snapshot(self):
+        """Get a copy of the counters
+
+        Returns:
+            dict: Counter values, with skips broken down by reason
+        """
+        with self._lock:
+            return {
+                "checked": self.checked,
+                "passed": self.passed,
+                "skipped": dict(self.skipped),
+                "calls_avoided": self.calls_avoided,
+                "tokens_avoided": self.tokens_avoided
+            }
+
+
+class PreflightFilter:
+    """Decides whether clipboard text is worth a translation request"""
+
+    def __init__(self, skip_target_language=True, language_confidence=0.9):
+        """Initialize the filter
+
+        Args:
+            skip_target_language (bool): Skip text already in the target language
+            language_confidence (float): Confidence needed to act on the
+                detected language
+        """
+        self.skip_target_language = skip_target_language
+        self.language_confidence = language_confidence
+        self.stats = PreflightStats()
+
+    def check(self, text, source_lang, target_lang, tone, context, engine=None):
+        """Check text before it is translated
+
+        Args:
+            text (str): Text to translate
+            source_lang (str): Source language
+            target_lang (str): Target language
+            tone (str): Translation tone
+            context (str): Additional context for translation
+            engine (str, optional): Engine the request would go to, used to
+                count the tokens avoided
+
+        Returns:
+            PreflightResult: Whether to skip the text and the detected language
+        """
+        result = PreflightResult(find_noop_reason(text))
+
+        if not result.skipped:
+            ranked = identify_language(text)
+            if ranked and ranked[0][1] >= self.language_confidence:
+                result.language, result.confidence = ranked[0]
+                if self.skip_target_language and result.language == target_lang:
+                    result.skip_reason = "already in target language"
+
+        tokens = 0
+        if result.skipped:
+            # What the request would have cost
+            prompt = build_context(source_lang, target_lang, tone, context)
+            tokens = sum(get_provider(engine).estimate_request(text, prompt))
+        self.stats.record(result, tokens)
+        return result
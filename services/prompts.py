@@ -0,0 +1,217 @@
+"""
+Prompt templates for translation requests
+
+The static part of a system prompt depends only on the languages, the
+tone, the template and the user's context, so it is compiled once per such
+configuration and reused: its text and its estimated size are looked up
+instead of rebuilt. Instructions come first and the context last, so the
+static part is a common prefix of the requests (which engines with prompt
+caching bill at a discount). Additions made per request, like glossary
+terms and past translations, are appended to it without being compiled.
+
+A second template can be tried on a share of the requests, and the prompt
+size of each template is reported so their costs can be compared.
+"""
+import hashlib
+import random
+import re
+import threading
+from collections import OrderedDict
+
+from config.languages import AUTO_DETECT
+from utils.token_estimator import estimate_tokens
+
+# Template name to (instructions with a source language, instructions for
+# an automatically detected one)
+TEMPLATES = {
+    "default": ("Traduza de {source_lang} para {target_lang} em tom {tone}.",
+                "Traduza para {target_lang} em tom {tone}."),
+    "compact": ("{source_lang} para {target_lang}, tom {tone}.",
+                "Para {target_lang}, tom {tone}."),
+}
+
+
+class CompiledPrompt(str):
+    """System prompt text that remembers how it was built
+
+    Being a str, it is passed to the engines like any other prompt; code
+    that knows about templates reads its attributes.
+    """
+
+    def __new__(cls, text, template="", tokens=0, instruction_tokens=0, cacheable_tokens=None):
+        prompt = super().__new__(cls, text)
+        prompt.template = template
+        prompt.tokens = tokens
+        prompt.instruction_tokens = instruction_tokens
+        # Tokens of the static prefix, shared by the requests of a configuration
+        prompt.cacheable_tokens = tokens if cacheable_tokens is None else cacheable_tokens
+        prompt.cache_key = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        return prompt
+
+
+def normalize_context(context):
+    """Drop the spaces and blank lines of a context that only cost tokens"""
+    context = re.sub(r"[ \t]+", " ", context or "")
+    return re.sub(r"\s*\n\s*", "\n", context).strip()
+
+
+class PromptStats:
+    """Prompt size counters of one template"""
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cacheable_tokens = 0
+
+    def snapshot(self):
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "avg_prompt_tokens": self.prompt_tokens / self.requests if self.requests else 0.0,
+            "cacheable_tokens": self.cacheable_tokens
+        }
+
+
+class PromptBuilder:
+    """Compiles system prompts and reports their size"""
+
+    # Compiled prompts kept for reuse
+    MAX_COMPILED = 256
+
+    def __init__(self, template="default", trial_template=None, trial_share=0.0):
+        """Initialize the builder
+
+        Args:
+            template (str): Name of the template in TEMPLATES used by default
+            trial_template (str, optional): Template tried on a share of the
+                requests, to compare with template
+            trial_share (float): Share of the prompts built with trial_template
+        """
+        self.template = template
+        self.trial_template = trial_template
+        self.trial_share = trial_share
+        self.hits = 0
+        self.misses = 0
+
+        self._compiled = OrderedDict()
+        self._stats = {}
+        self._last = None
+        self._lock = threading.Lock()
+
+    def choose_template(self):
+        """Pick the template of the next prompt, trying trial_template on its share"""
+        if self.trial_template and random.random() < self.trial_share:
+            return self.trial_template
+        return self.template
+
+    def build(self, source_lang, target_lang, tone, context, template=None, additions=""):
+        """Get the system prompt of a request
+
+        Args:
+            source_lang (str): Source language
+            target_lang (str): Target language
+            tone (str): Translation tone
+            context (str): Additional context for translation, the same
+                across requests
+            template (str, optional): Template to use instead of choosing one
+            additions (str): Instructions of this request only, appended
+                after the compiled prompt
+
+        Returns:
+            CompiledPrompt: The prompt, with its template and estimated size
+        """
+        prompt = self._compile(source_lang, target_lang, tone, context, template)
+        additions = normalize_context(additions)
+        if not additions:
+            return prompt
+        return CompiledPrompt(
+            f"{prompt} {additions}", prompt.template,
+            prompt.tokens + estimate_tokens(additions), prompt.instruction_tokens,
+            prompt.tokens)
+
+    def record(self, prompt, prompt_tokens, prompt_caching=False):
+        """Record the prompt of a request that was sent
+
+        Args:
+            prompt (str): System prompt sent (only CompiledPrompt is counted)
+            prompt_tokens (int): Estimated tokens of the whole request prompt
+            prompt_caching (bool): The engine caches repeated prompt prefixes
+        """
+        template = getattr(prompt, "template", None)
+        if template is None:
+            return
+        with self._lock:
+            stats = self._stats.setdefault(template, PromptStats())
+            stats.requests += 1
+            stats.prompt_tokens += prompt_tokens
+            if prompt_caching:
+                stats.cacheable_tokens += prompt.cacheable_tokens
+            self._last = {"template": template, "system_tokens": prompt.tokens,
+                          "prompt_tokens": prompt_tokens}
+
+    def get_stats(self):
+        """Get prompt size counters
+
+        Returns:
+            dict: {"templates": size counters per template, "last": sizes of
+                   the last request, "compiled": hits and misses of the
+                   compiled prompts}
+        """
+        with self._lock:
+            return {
+                "templates": {name: stats.snapshot() for name, stats in self._stats.items()},
+                "last": dict(self._last) if self._last else None,
+                "compiled": {"hits": self.hits, "misses": self.misses,
+                             "entries": len(self._compiled)}
+            }
+
+    def _compile(self, source_lang, target_lang, tone, context, template):
+        """Get the compiled static part of a prompt, compiling it if needed"""
+        template = template or self.choose_template()
+        if template not in TEMPLATES:
+            template = "default"
+        key = (template, source_lang, target_lang, tone, context or "")
+
+        with self._lock:
+            prompt = self._compiled.get(key)
+            if prompt is not None:
+                self._compiled.move_to_end(key)
+                self.hits += 1
+                return prompt
+            self.misses += 1
+
+        with_source, auto_source = TEMPLATES[template]
+        instructions = (auto_source if source_lang == AUTO_DETECT else with_source).format(
+            source_lang=source_lang, target_lang=target_lang, tone=tone)
+        context = normalize_context(context)
+        text = f"{instructions} {context}" if context else instructions
+        prompt = CompiledPrompt(text, template, estimate_tokens(text), estimate_tokens(instructions))
+
+        with self._lock:
+            self._compiled[key] = prompt
+            while len(self._compiled) > self.MAX_COMPILED:
+                self._compiled.popitem(last=False)
+        return prompt
+
+
+_builder = PromptBuilder()
+
+
+def get_prompt_builder():
+    """Get the builder shared by all requests"""
+    return _builder
+
+
+def configure_prompts(template="default", trial_template=None, trial_share=0.0):
+    """Set the prompt templates, e.g. from settings
+
+    Args:
+        template (str): Template used by default
+        trial_template (str, optional): Template tried on a share of requests
+        trial_share (float): Share of requests using trial_template
+    """
+    with _builder._lock:
+        _builder.template = template
+        _builder.trial_template = trial_template or None
+        _builder.trial_share = trial_share
+        _builder._compiled.clear()
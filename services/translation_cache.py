@@ -0,0 +1,174 @@
+"""
+Translation cache with an in-memory LRU tier and a persistent SQLite tier
+"""
+import hashlib
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+
+
+class TranslationCache:
+    """Caches translations keyed by text, languages, tone, context and engine"""
+
+    DB_FILE = "translation_cache.db"
+
+    # Run disk eviction after this many writes
+    PRUNE_INTERVAL = 100
+
+    def __init__(self, db_file=None, memory_entries=256, max_entries=10000, max_age_days=30):
+        """Initialize the cache
+
+        Args:
+            db_file (str, optional): SQLite file for the disk tier, or None for
+                the default file. Pass ":memory:" to disable persistence.
+            memory_entries (int): Capacity of the in-memory LRU tier
+            max_entries (int): Maximum number of rows kept on disk
+            max_age_days (float): Entries older than this are evicted
+        """
+        self.db_file = db_file or self.DB_FILE
+        self.memory_entries = memory_entries
+        self.max_entries = max_entries
+        self.max_age = max_age_days * 86400
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.hits = 0
+        self.misses = 0
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS translations ("
+                "key TEXT PRIMARY KEY, translated TEXT NOT NULL, "
+                "created_at REAL NOT NULL, last_used REAL NOT NULL)")
+            self._db.execute(
+                "CREATE INDEX IF NOT EXISTS translations_last_used "
+                "ON translations (last_used)")
+            self._prune(time.time())
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error opening translation cache: {str(e)}")
+            self._db = None
+
+    @staticmethod
+    def normalize(text):
+        """Normalize text so trivially different copies share a cache entry"""
+        text = unicodedata.normalize("NFC", text).strip()
+        return re.sub(r"[ \t]+", " ", text)
+
+    @classmethod
+    def make_key(cls, text, source_lang, target_lang, tone, context, engine):
+        """Build the cache key for a translation request
+
+        Returns:
+            str: Hex digest identifying the request
+        """
+        parts = [cls.normalize(text), source_lang, target_lang, tone,
+                 (context or "").strip(), engine]
+        return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+    def get(self, text, source_lang, target_lang, tone, context, engine):
+        """Look up a cached translation
+
+        Returns:
+            str: Cached translation, or None on a miss
+        """
+        key = self.make_key(text, source_lang, target_lang, tone, context, engine)
+        now = time.time()
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and now - entry[1] <= self.max_age:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+
+            translated = self._disk_get(key, now)
+            if translated is None:
+                self.misses += 1
+                return None
+
+            self._remember(key, translated, now)
+            self.hits += 1
+            return translated
+
+    def put(self, text, source_lang, target_lang, tone, context, engine, translated):
+        """Store a translation in both tiers"""
+        key = self.make_key(text, source_lang, target_lang, tone, context, engine)
+        now = time.time()
+
+        with self._lock:
+            self._remember(key, translated, now)
+            if not self._db:
+                return
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO translations VALUES (?, ?, ?, ?)",
+                    (key, translated, now, now))
+                self._writes += 1
+                if self._writes % self.PRUNE_INTERVAL == 0:
+                    self._prune(now)
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error writing translation cache: {str(e)}")
+
+    def clear(self):
+        """Remove every cached translation"""
+        with self._lock:
+            self._memory.clear()
+            if self._db:
+                self._db.execute("DELETE FROM translations")
+                self._db.commit()
+
+    def get_stats(self):
+        """Get hit/miss counters
+
+        Returns:
+            dict: Hits, misses and number of entries in memory
+        """
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_entries": len(self._memory)
+            }
+
+    def _remember(self, key, translated, now):
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._memory[key] = (translated, now)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_entries:
+            self._memory.popitem(last=False)
+
+    def _disk_get(self, key, now):
+        """Read an entry from the disk tier, ignoring expired rows"""
+        if not self._db:
+            return None
+        try:
+            row = self._db.execute(
+                "SELECT translated FROM translations WHERE key = ? AND created_at >= ?",
+                (key, now - self.max_age)).fetchone()
+            if row is None:
+                return None
+            self._db.execute(
+                "UPDATE translations SET last_used = ? WHERE key = ?", (now, key))
+            self._db.commit()
+            return row[0]
+        except sqlite3.Error as e:
+            print(f"Error reading translation cache: {str(e)}")
+            return None
+
+    def _prune(self, now):
+        """Evict expired rows and the least recently used rows over the limit"""
+        self._db.execute(
+            "DELETE FROM translations WHERE created_at < ?", (now - self.max_age,))
+        self._db.execute(
+            "DELETE FROM translations WHERE key IN ("
+            "SELECT key FROM translations ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,))
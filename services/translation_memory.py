@@ -0,0 +1,487 @@
+"""
+Translation memory: reuse past translations of near-identical text
+
+Segments are the originals saved in the translation history. Each one is
+indexed twice, in tables kept next to the history:
+
+- by a key of its text with numbers masked, so a copy that only differs
+  in its numbers is found with one lookup and its translation is reused
+  with the new numbers put in;
+- by locality-sensitive hashing of a MinHash signature of its shingles
+  (overlapping 5-byte pieces), so a text that differs by a name or some
+  punctuation finds the few segments likely to be similar without
+  scanning the others.
+
+Candidates are then ranked by the Jaccard similarity of their shingles.
+A translation is only reused when it was made with the same source
+language, tone, context and glossary terms as the new request. Matches
+above min_similarity that can't be reused as they are are sent to the
+engine as a reference translation.
+"""
+import hashlib
+import re
+import sqlite3
+import struct
+import threading
+import zlib
+
+# Bytes per shingle
+SHINGLE_SIZE = 5
+
+# The signature is BANDS bands of ROWS_PER_BAND values; texts sharing any
+# band are candidates (about 99% of pairs at 0.7 similarity, 0.2% at 0.1)
+BANDS = 16
+ROWS_PER_BAND = 4
+SIGNATURE_SIZE = BANDS * ROWS_PER_BAND
+
+# Shingle hashes are split into a bin (low bits) and a value (the rest)
+BIN_BITS = 6
+BIN_VALUES = 1 << (32 - BIN_BITS)
+
+# Longer texts are only matched by key, and only reused (never sent as examples)
+MAX_SEGMENT_CHARS = 2000
+
+# Candidates ranked by similarity per lookup
+MAX_CANDIDATES = 20
+
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def request_key(source_lang, tone, context):
+    """Get the key of the settings a translation is made with
+
+    The context is the one sent to the engine, so it includes the glossary
+    terms found in the text. Its whitespace is collapsed.
+
+    Returns:
+        str: Hex digest of the settings
+    """
+    settings = "\x1f".join((source_lang, tone, " ".join(context.split())))
+    return hashlib.blake2b(settings.encode("utf-8"), digest_size=8).hexdigest()
+
+
+def mask_numbers(text):
+    """Collapse whitespace and replace every number with 0"""
+    return NUMBER_PATTERN.sub("0", " ".join(text.split()))
+
+
+def shingle_hashes(text):
+    """Hash the shingles of text, ignoring case and numbers
+
+    Shingles are taken from the UTF-8 bytes, which saves encoding each one
+    and only makes them shorter for non-Latin scripts.
+
+    Returns:
+        set: 32-bit shingle hashes
+    """
+    data = mask_numbers(text).casefold().encode("utf-8")
+    if len(data) <= SHINGLE_SIZE:
+        return {zlib.crc32(data)} if data else set()
+    return {zlib.crc32(data[i:i + SHINGLE_SIZE]) for i in range(len(data) - SHINGLE_SIZE + 1)}
+
+
+def minhash_signature(hashes):
+    """Compute a MinHash signature with one permutation hashing
+
+    Each shingle hash goes to one of SIGNATURE_SIZE bins and each bin keeps
+    its smallest value, so the signature takes one pass over the shingles
+    instead of one per value. An empty bin borrows the value of the next
+    filled bin, offset by the distance so the borrowed values differ.
+
+    Returns:
+        list: SIGNATURE_SIZE integers, or None if there are no shingles
+    """
+    if not hashes:
+        return None
+    empty = BIN_VALUES
+    bins = [empty] * SIGNATURE_SIZE
+    for value in hashes:
+        index = value & (SIGNATURE_SIZE - 1)
+        value >>= BIN_BITS
+        if value < bins[index]:
+            bins[index] = value
+
+    # Walk backwards twice around the ring so every empty bin has seen the
+    # next filled one
+    filled = [value < empty for value in bins]
+    borrowed, distance = None, 0
+    for index in range(2 * SIGNATURE_SIZE - 1, -1, -1):
+        index %= SIGNATURE_SIZE
+        if filled[index]:
+            borrowed, distance = bins[index], 0
+        elif borrowed is not None:
+            distance += 1
+            bins[index] = borrowed + distance * BIN_VALUES
+    return bins
+
+
+def band_buckets(signature, target_lang):
+    """Get the LSH bucket of each band of a signature
+
+    Buckets include the target language, so segments translated into other
+    languages are never candidates.
+    """
+    seed = zlib.crc32(target_lang.encode("utf-8"))
+    return [
+        (band << 32) | zlib.crc32(struct.pack(
+            f"<{ROWS_PER_BAND}Q",
+            *signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]), seed)
+        for band in range(BANDS)
+    ]
+
+
+def jaccard(first, second):
+    """Jaccard similarity of two sets"""
+    if not first or not second:
+        return 0.0
+    return len(first & second) / len(first | second)
+
+
+def reuse_translation(entry, text):
+    """Adapt the translation of an entry to text that differs only in numbers
+
+    Returns:
+        str: The translation with the numbers of text, or None if the old
+            numbers can't all be found in it
+    """
+    old_numbers = NUMBER_PATTERN.findall(entry['original'])
+    new_numbers = NUMBER_PATTERN.findall(text)
+    if len(old_numbers) != len(new_numbers):
+        return None
+
+    replacements = {}
+    for old, new in zip(old_numbers, new_numbers):
+        if replacements.setdefault(old, new) != new:
+            return None
+    replacements = {old: new for old, new in replacements.items() if old != new}
+    if not replacements:
+        return entry['translated']
+
+    # Every changed number must appear in the translation as often as in
+    # the original, or it may have been reworded
+    translated_numbers = NUMBER_PATTERN.findall(entry['translated'])
+    for old in replacements:
+        if translated_numbers.count(old) != old_numbers.count(old):
+            return None
+    return NUMBER_PATTERN.sub(
+        lambda match: replacements.get(match.group(), match.group()), entry['translated'])
+
+
+class MemoryMatch:
+    """A past translation similar to the text being translated"""
+
+    def __init__(self, entry, similarity, translated=None):
+        """Initialize the match
+
+        Args:
+            entry (dict): History entry of the matched segment
+            similarity (float): Similarity of the texts, from 0 to 1
+            translated (str, optional): Translation of the new text when it
+                can be reused without calling the engine
+        """
+        self.entry = entry
+        self.similarity = similarity
+        self.translated = translated
+
+    @property
+    def reusable(self):
+        """True if the translation can be used without calling the engine"""
+        return self.translated is not None
+
+    def as_example(self):
+        """Describe the match for the engine's instructions"""
+        return (f"Tradução anterior de um texto parecido: "
+                f"\"{self.entry['original']}\" → \"{self.entry['translated']}\".")
+
+
+class TranslationMemory:
+    """Finds past translations of text similar to new clipboard text"""
+
+    # History entries indexed per lookup; older backlogs are indexed by the
+    # background thread
+    SYNC_BATCH = 50
+
+    # History entries indexed per transaction by the background thread
+    INDEX_BATCH = 1000
+
+    # Seconds between checks for segments whose history entries were deleted
+    PRUNE_INTERVAL = 600
+
+    # SQLite page cache of the index connection, in KiB
+    CACHE_KB = 32768
+
+    def __init__(self, store, min_similarity=0.7, reuse=True):
+        """Initialize the memory
+
+        Args:
+            store (HistoryStore): History the segments come from. The index
+                is kept in the same database file.
+            min_similarity (float): Least shingle similarity of a match
+            reuse (bool): Return the translation of text that only differs in
+                its numbers instead of calling the engine
+        """
+        self.store = store
+        self.min_similarity = min_similarity
+        self.reuse = reuse
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._index_thread = None
+        self._indexed_through = 0
+        self.lookups = 0
+        self.reused = 0
+        self.fuzzy_matches = 0
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(store.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            # Buckets are spread over the whole table; keep more of it cached
+            self._db.execute(f"PRAGMA cache_size=-{self.CACHE_KB}")
+            self._create_tables()
+            row = self._db.execute(
+                "SELECT value FROM tm_meta WHERE name = 'indexed_through'").fetchone()
+            self._indexed_through = int(row[0]) if row else 0
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error opening translation memory: {str(e)}")
+            self._db = None
+
+    def lookup(self, text, target_lang, request_key=""):
+        """Find the most similar past translation into target_lang
+
+        Args:
+            text (str): Text to translate
+            target_lang (str): Target language
+            request_key (str): Key of the settings of the request; a past
+                translation made with other settings is only an example
+
+        Returns:
+            MemoryMatch: The best match, or None if none reaches min_similarity
+        """
+        if not self._db or not text.strip():
+            return None
+        self.sync(self.SYNC_BATCH)
+
+        with self._lock:
+            self.lookups += 1
+            try:
+                match = self._lookup_key(text, target_lang, request_key)
+                if match is None and len(text) <= MAX_SEGMENT_CHARS:
+                    match = self._lookup_similar(text, target_lang)
+            except sqlite3.Error as e:
+                print(f"Error reading translation memory: {str(e)}")
+                return None
+
+            if match is not None:
+                if match.reusable:
+                    self.reused += 1
+                else:
+                    self.fuzzy_matches += 1
+            return match
+
+    def sync(self, limit=None):
+        """Index history entries added since the last sync
+
+        Args:
+            limit (int, optional): Maximum number of entries indexed
+
+        Returns:
+            int: Number of entries indexed
+        """
+        if not self._db:
+            return 0
+        indexed = 0
+        while limit is None or indexed < limit:
+            batch = self.INDEX_BATCH if limit is None else min(self.INDEX_BATCH, limit - indexed)
+            with self._lock:
+                entries = self.store.get_since(self._indexed_through, batch)
+                if not entries:
+                    break
+                try:
+                    for entry in entries:
+                        self._index(entry)
+                    self._indexed_through = entries[-1]['id']
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO tm_meta VALUES ('indexed_through', ?)",
+                        (self._indexed_through,))
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    print(f"Error indexing translation memory: {str(e)}")
+                    self._db.rollback()
+                    break
+            indexed += len(entries)
+            if len(entries) < batch or self._stop_event.is_set():
+                break
+        return indexed
+
+    def prune(self):
+        """Drop segments whose history entries were deleted
+
+        Retention deletes the oldest history entries, so these are the
+        segments pointing below the oldest entry left.
+
+        Returns:
+            int: Number of segments dropped
+        """
+        if not self._db:
+            return 0
+        oldest = self.store.get_oldest_id()
+        with self._lock:
+            try:
+                if oldest is None:
+                    rows = self._db.execute("SELECT id, buckets FROM tm_segments").fetchall()
+                else:
+                    rows = self._db.execute(
+                        "SELECT id, buckets FROM tm_segments WHERE history_id < ?",
+                        (oldest,)).fetchall()
+                for segment, buckets in rows:
+                    self._db.executemany(
+                        "DELETE FROM tm_buckets WHERE bucket = ? AND segment = ?",
+                        ((bucket, segment) for bucket in _unpack_buckets(buckets)))
+                self._db.executemany("DELETE FROM tm_segments WHERE id = ?",
+                                     ((segment,) for segment, _ in rows))
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Error pruning translation memory: {str(e)}")
+                return 0
+        return len(rows)
+
+    def start_indexing(self):
+        """Index the history backlog and prune dropped segments in the background"""
+        if not self._db or self._index_thread is not None:
+            return
+        self._stop_event.clear()
+        self._index_thread = threading.Thread(target=self._index_loop)
+        self._index_thread.daemon = True
+        self._index_thread.start()
+
+    def get_stats(self):
+        """Get lookup counters
+
+        Returns:
+            dict: Lookups, translations reused and fuzzy matches sent as examples
+        """
+        with self._lock:
+            return {
+                "lookups": self.lookups,
+                "reused": self.reused,
+                "fuzzy_matches": self.fuzzy_matches,
+                "indexed_through": self._indexed_through
+            }
+
+    def close(self):
+        """Stop the background thread and close the index"""
+        self._stop_event.set()
+        if self._index_thread is not None:
+            self._index_thread.join(timeout=5)
+            self._index_thread = None
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def _index_loop(self):
+        """Index new history entries and prune until the memory is closed"""
+        while not self._stop_event.is_set():
+            self.sync()
+            self.prune()
+            self._stop_event.wait(self.PRUNE_INTERVAL)
+
+    def _lookup_key(self, text, target_lang, request_key):
+        """Find a segment equal to text apart from its numbers (lock held)"""
+        key = _segment_key(text, target_lang)
+        row = self._db.execute(
+            "SELECT history_id FROM tm_segments WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        entries = self.store.get_entries([row[0]])
+        # The entry may have been deleted since it was indexed
+        if not entries or _segment_key(entries[0]['original'], entries[0]['target_lang']) != key:
+            return None
+
+        translated = None
+        if self.reuse and entries[0]['request_key'] == request_key:
+            translated = reuse_translation(entries[0], text)
+        if translated is None and len(text) > MAX_SEGMENT_CHARS:
+            # Too long to send as an example
+            return None
+        return MemoryMatch(entries[0], 1.0, translated)
+
+    def _lookup_similar(self, text, target_lang):
+        """Find the most similar segment through the LSH buckets (lock held)"""
+        hashes = shingle_hashes(text)
+        signature = minhash_signature(hashes)
+        if signature is None:
+            return None
+
+        buckets = band_buckets(signature, target_lang)
+        rows = self._db.execute(
+            "SELECT s.history_id FROM tm_buckets b JOIN tm_segments s ON s.id = b.segment "
+            f"WHERE b.bucket IN ({', '.join('?' * len(buckets))}) "
+            "GROUP BY b.segment ORDER BY COUNT(*) DESC LIMIT ?",
+            (*buckets, MAX_CANDIDATES)).fetchall()
+        if not rows:
+            return None
+
+        best, best_similarity = None, 0.0
+        for entry in self.store.get_entries(row[0] for row in rows):
+            if entry['target_lang'] != target_lang:
+                continue
+            similarity = jaccard(hashes, shingle_hashes(entry['original']))
+            if similarity > best_similarity:
+                best, best_similarity = entry, similarity
+        if best is None or best_similarity < self.min_similarity:
+            return None
+        return MemoryMatch(best, best_similarity)
+
+    def _index(self, entry):
+        """Add a history entry to the index (lock held)"""
+        key = _segment_key(entry['original'], entry['target_lang'])
+        row = self._db.execute("SELECT id FROM tm_segments WHERE key = ?", (key,)).fetchone()
+        if row is not None:
+            # Point the segment at the newest translation of the text
+            self._db.execute(
+                "UPDATE tm_segments SET history_id = ? WHERE id = ?", (entry['id'], row[0]))
+            return
+
+        buckets = []
+        if len(entry['original']) <= MAX_SEGMENT_CHARS:
+            signature = minhash_signature(shingle_hashes(entry['original']))
+            if signature is not None:
+                buckets = band_buckets(signature, entry['target_lang'])
+
+        cursor = self._db.execute(
+            "INSERT INTO tm_segments (key, history_id, buckets) VALUES (?, ?, ?)",
+            (key, entry['id'], struct.pack(f"<{len(buckets)}q", *buckets)))
+        self._db.executemany(
+            "INSERT OR IGNORE INTO tm_buckets VALUES (?, ?)",
+            ((bucket, cursor.lastrowid) for bucket in buckets))
+
+    def _create_tables(self):
+        """Create the segment and bucket tables"""
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tm_segments ("
+            "id INTEGER PRIMARY KEY, key INTEGER NOT NULL UNIQUE, "
+            "history_id INTEGER NOT NULL, buckets BLOB NOT NULL)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS tm_segments_history ON tm_segments (history_id)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tm_buckets ("
+            "bucket INTEGER NOT NULL, segment INTEGER NOT NULL, "
+            "PRIMARY KEY (bucket, segment)) WITHOUT ROWID")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS tm_meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+
+def _segment_key(text, target_lang):
+    """Get the 64-bit key of a text with its numbers masked"""
+    digest = hashlib.blake2b(
+        f"{target_lang}\x1f{mask_numbers(text)}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little", signed=True)
+
+
+def _unpack_buckets(data):
+    """Read the buckets packed in a segment row"""
+    return struct.unpack(f"<{len(data) // 8}q", data)
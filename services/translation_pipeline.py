@@ -0,0 +1,245 @@
+"""
+Bounded worker pool for clipboard translation jobs
+
+The clipboard monitor only detects changes; translations run here so a slow
+API call never stops new clipboard content from being seen.
+"""
+import itertools
+import threading
+import time
+from collections import deque
+
+
+class TranslationJob:
+    """A single clipboard text waiting for (or undergoing) translation"""
+
+    def __init__(self, job_id, text, generation, analysis=None):
+        """Initialize the job
+
+        Args:
+            job_id (int): Unique, increasing job identifier
+            text (str): Clipboard text to translate
+            generation (int): Clipboard generation the text belongs to
+            analysis (ContentAnalysis, optional): Result of classify_content(text)
+        """
+        self.job_id = job_id
+        self.text = text
+        self.generation = generation
+        self.analysis = analysis
+        self.created_at = time.monotonic()
+        self.started_at = None
+        self.first_chunk_at = None
+        self.finished_at = None
+
+    @property
+    def wait_time(self):
+        """Seconds spent in the queue before a worker picked the job up"""
+        if self.started_at is None:
+            return 0.0
+        return self.started_at - self.created_at
+
+    @property
+    def time_to_first_chunk(self):
+        """Seconds from the worker starting the job to the first streamed text"""
+        if self.started_at is None or self.first_chunk_at is None:
+            return None
+        return self.first_chunk_at - self.started_at
+
+    @property
+    def service_time(self):
+        """Seconds a worker spent processing the job"""
+        if self.started_at is None or self.finished_at is None:
+            return 0.0
+        return self.finished_at - self.started_at
+
+
+class PipelineStats:
+    """Queue and timing counters for a TranslationPipeline"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.dropped_overflow = 0
+        self.dropped_stale = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_service = 0.0
+        self.max_service = 0.0
+        self.streamed = 0
+        self.total_first_chunk = 0.0
+        self.max_first_chunk = 0.0
+
+    def increment(self, counter, amount=1):
+        """Increment one of the integer counters by name"""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    def record_job(self, job, failed=False):
+        """Record timings of a job that a worker finished"""
+        with self._lock:
+            if failed:
+                self.failed += 1
+            else:
+                self.completed += 1
+            self.total_wait += job.wait_time
+            self.max_wait = max(self.max_wait, job.wait_time)
+            self.total_service += job.service_time
+            self.max_service = max(self.max_service, job.service_time)
+            if job.time_to_first_chunk is not None:
+                self.streamed += 1
+                self.total_first_chunk += job.time_to_first_chunk
+                self.max_first_chunk = max(self.max_first_chunk, job.time_to_first_chunk)
+
+    def snapshot(self):
+        """Get a copy of the counters
+
+        Returns:
+            dict: Counter values, times in milliseconds
+        """
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "dropped_overflow": self.dropped_overflow,
+                "dropped_stale": self.dropped_stale,
+                "avg_wait_ms": (self.total_wait / finished * 1000) if finished else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_service_ms": (self.total_service / finished * 1000) if finished else 0.0,
+                "max_service_ms": self.max_service * 1000,
+                "avg_first_chunk_ms": (
+                    self.total_first_chunk / self.streamed * 1000) if self.streamed else 0.0,
+                "max_first_chunk_ms": self.max_first_chunk * 1000
+            }
+
+
+class TranslationPipeline:
+    """Runs translation jobs on a fixed number of worker threads
+
+    The queue is bounded: when it is full the oldest pending job is dropped,
+    since newer clipboard content always supersedes it.
+    """
+
+    def __init__(self, handler, workers=2, max_queue=8):
+        """Initialize the pipeline
+
+        Args:
+            handler (callable): Called with each TranslationJob on a worker
+                thread; exceptions it raises are counted as failures
+            workers (int): Number of worker threads
+            max_queue (int): Maximum number of pending jobs
+        """
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.max_queue = max(1, max_queue)
+        self.stats = PipelineStats()
+
+        self._ids = itertools.count(1)
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._running = False
+        self._epoch = 0
+        self._in_flight = 0
+
+    def start(self):
+        """Start the worker threads"""
+        with self._condition:
+            if self._running:
+                return
+            self._running = True
+            self._epoch += 1
+            epoch = self._epoch
+
+        for i in range(self.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, args=(epoch,), name=f"translator-{i}")
+            thread.daemon = True
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout=1.0):
+        """Stop the workers and discard pending jobs
+
+        Jobs already running are allowed to finish in the background.
+        """
+        with self._condition:
+            self._running = False
+            self._pending.clear()
+            self._condition.notify_all()
+
+        for thread in self._threads:
+            thread.join(timeout=timeout)
+        self._threads = []
+
+    def submit(self, text, generation, analysis=None):
+        """Queue text for translation
+
+        Args:
+            text (str): Clipboard text
+            generation (int): Clipboard generation of the text
+            analysis (ContentAnalysis, optional): Result of classify_content(text)
+
+        Returns:
+            TranslationJob: The queued job
+        """
+        job = TranslationJob(next(self._ids), text, generation, analysis)
+        with self._condition:
+            if len(self._pending) >= self.max_queue:
+                self._pending.popleft()
+                self.stats.increment("dropped_overflow")
+            self._pending.append(job)
+            self.stats.increment("submitted")
+            self._condition.notify()
+        return job
+
+    def queue_depth(self):
+        """Number of jobs waiting for a worker"""
+        with self._condition:
+            return len(self._pending)
+
+    def get_stats(self):
+        """Get pipeline counters including the current queue depth
+
+        Returns:
+            dict: Counter values, times in milliseconds
+        """
+        stats = self.stats.snapshot()
+        with self._condition:
+            stats["queue_depth"] = len(self._pending)
+            stats["in_flight"] = self._in_flight
+        return stats
+
+    def _worker_loop(self, epoch):
+        """Take jobs off the queue until the pipeline stops
+
+        Args:
+            epoch (int): Start generation; workers left over from a previous
+                start() exit instead of joining the new pool
+        """
+        while True:
+            with self._condition:
+                self._condition.wait_for(lambda: self._pending or not self._running)
+                if not self._running:
+                    return
+                if self._epoch != epoch:
+                    # Hand the wakeup on to a worker of the current pool
+                    self._condition.notify()
+                    return
+                job = self._pending.popleft()
+                self._in_flight += 1
+
+            job.started_at = time.monotonic()
+            failed = False
+            try:
+                self.handler(job)
+            except Exception:
+                failed = True
+            finally:
+                job.finished_at = time.monotonic()
+                self.stats.record_job(job, failed)
+                with self._condition:
+                    self._in_flight -= 1
@@ -2,14 +2,596 @@
 """
 Translation service for text translation
 """
-from services.api.openai import translate_with_openai
-from services.api.gemini import translate_with_gemini
-from services.api.deepseek import translate_with_deepseek
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
+from services.chunker import split_edges, split_text
+from services.api.budget import get_budget_tracker
+from services.api.circuit_breaker import CircuitOpenError, get_circuit_breaker
+from services.api.errors import ApiError, StreamInterruptedError
+from services.api.rate_limiter import RateLimitWaitError, get_rate_limiter
+from services.api.registry import get_provider, has_engine
+from services.api.retry import call_with_retry, is_retryable
+from services.prompts import get_prompt_builder
+from utils.text_analyzer import (
+    PROSE, classify_content, join_cells, mask_inline_code, split_cells, unmask_inline_code)
 
-def translate_text(text, source_lang, target_lang, tone, context, engine, api_key):
+# Engines tried in order when the requested engine is unavailable
+_failover_chain = []
+_failover_keys = {}
+
+# Callbacks for budget downgrades that can't happen
+_downgrade_listeners = []
+
+
+class EngineUsage:
+    """Tokens used by each engine that served a translation
+    
+    Failover, budget downgrades and chunked or batched requests can spread
+    one translation over several engines, so every successful call_engine
+    request adds its tokens here under the engine that served it.
+    """
+    
+    def __init__(self):
+        self.engines = {}  # Engine name to [prompt_tokens, completion_tokens]
+        self._lock = threading.Lock()
+    
+    def add(self, engine, prompt_tokens, completion_tokens):
+        """Add the tokens of a request an engine served"""
+        with self._lock:
+            tokens = self.engines.setdefault(engine, [0, 0])
+            tokens[0] += prompt_tokens
+            tokens[1] += completion_tokens
+    
+    def items(self):
+        """Get (engine, prompt_tokens, completion_tokens) tuples, most tokens first"""
+        with self._lock:
+            items = [(engine, prompt, completion)
+                     for engine, (prompt, completion) in self.engines.items()]
+        return sorted(items, key=lambda item: item[1] + item[2], reverse=True)
+
+
+def build_context(source_lang, target_lang, tone, context, template=None, additions=""):
+    """Build the system prompt for a translation request
+    
+    Args:
+        source_lang (str): Source language
+        target_lang (str): Target language
+        tone (str): Translation tone
+        context (str): Additional context for translation
+        template (str, optional): Prompt template, chosen by the shared
+            PromptBuilder if None
+        additions (str): Instructions of this request only, like glossary
+            terms, appended to the compiled prompt
+        
+    Returns:
+        CompiledPrompt: Instructions sent to the engine, compiled once per
+            configuration by the shared PromptBuilder
+    """
+    return get_prompt_builder().build(
+        source_lang, target_lang, tone, context, template=template, additions=additions)
+
+
+def configure_failover(chain, api_keys=None):
+    """Set the engines used when the requested engine is unavailable
+    
+    Args:
+        chain (list): Engine names in the order they are tried
+        api_keys (dict, optional): Engine name to API key; engines without
+            a key are skipped
+    """
+    global _failover_chain, _failover_keys
+    _failover_chain = [engine for engine in chain if has_engine(engine)]
+    _failover_keys = dict(api_keys or {})
+
+
+def get_failover_candidates(engine, api_key):
+    """Get the engines to try for a request, the requested one first
+    
+    Args:
+        engine (str): Requested engine
+        api_key (str): API key for the requested engine
+        
+    Returns:
+        list: (engine, api_key) pairs
+    """
+    candidates = [(engine, api_key)]
+    for fallback in _failover_chain:
+        if fallback != engine and _failover_keys.get(fallback):
+            candidates.append((fallback, _failover_keys[fallback]))
+    return candidates
+
+
+def should_fail_over(error):
+    """Check whether an error means the engine is unavailable right now"""
+    return isinstance(error, CircuitOpenError) or is_retryable(error)
+
+
+def add_downgrade_listener(listener):
+    """Register a callback for budget downgrades skipped for lack of an API key
+    
+    Args:
+        listener (callable): Called with (engine, downgrade_engine). It may
+            run on any thread.
+    """
+    _downgrade_listeners.append(listener)
+
+
+def remove_downgrade_listener(listener):
+    """Unregister a callback added with add_downgrade_listener"""
+    if listener in _downgrade_listeners:
+        _downgrade_listeners.remove(listener)
+
+
+def get_engine_key(engine, current_engine, current_key):
+    """Get the API key to call an engine with instead of current_engine
+    
+    Returns:
+        str: The engine's configured key, or current_key if both engines
+            are served by the same API, or None
+    """
+    if _failover_keys.get(engine):
+        return _failover_keys[engine]
+    if get_provider(engine).module == get_provider(current_engine).module:
+        return current_key
+    return None
+
+
+def route_by_budget(engine, api_key, text, context):
+    """Pick the engine a request goes to under the engine budgets
+    
+    An engine whose budget is (nearly) used up hands the request to the
+    cheaper engine its budget names, if there is an API key for it (its
+    own, or the current one when both engines use the same API). Without
+    one the request stays and the downgrade listeners are told.
+    
+    Args:
+        engine (str): Requested engine
+        api_key (str): API key for the requested engine
+        text (str): Text to translate
+        context (str): System prompt sent with the text
+        
+    Returns:
+        tuple: (engine, api_key) to use
+    """
+    budget = get_budget_tracker()
+    tried = {engine}
+    while True:
+        prompt_tokens, completion_tokens = get_provider(engine).estimate_request(text, context)
+        downgrade = budget.downgrade_for(engine, prompt_tokens, completion_tokens)
+        if not downgrade or downgrade in tried or not has_engine(downgrade):
+            return engine, api_key
+        
+        downgrade_key = get_engine_key(downgrade, engine, api_key)
+        if not downgrade_key:
+            for listener in list(_downgrade_listeners):
+                try:
+                    listener(engine, downgrade)
+                except Exception as e:
+                    print(f"Error in downgrade listener: {str(e)}")
+            return engine, api_key
+        engine, api_key = downgrade, downgrade_key
+        tried.add(downgrade)
+
+
+def translate_text(text, source_lang, target_lang, tone, context, engine, api_key,
+                   on_chunk=None, usage=None, template=None, additions=""):
     """Translate text using the specified engine
     
+    If the engine's budget is nearly used up, the cheaper engine it names is
+    used instead. If the engine is unavailable (open circuit breaker or
+    transient errors after retries), the next engine of the failover chain
+    is used.
+    
+    Args:
+        text (str): Text to translate
+        source_lang (str): Source language
+        target_lang (str): Target language
+        tone (str): Translation tone
+        context (str): Additional context for translation
+        engine (str): Translation engine to use
+        api_key (str): API key for the translation service
+        on_chunk (callable, optional): If given, the response is streamed and
+            on_chunk is called with each piece of text as it arrives
+        usage (EngineUsage, optional): Receives the tokens used, under the
+            engine that served the request
+        template (str, optional): Prompt template (see build_context)
+        additions (str): Instructions of this request only (see build_context)
+        
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    # Format the context
+    context = build_context(source_lang, target_lang, tone, context, template, additions)
+    engine, api_key = route_by_budget(engine, api_key, text, context)
+    
+    # A stream that already produced text can't be retried or switch
+    # engines halfway: its text would be repeated
+    streamed = []
+    if on_chunk:
+        def on_stream_chunk(piece):
+            streamed.append(True)
+            on_chunk(piece)
+        
+        def stream(provider, candidate_key):
+            try:
+                return provider.stream(text, context, candidate_key, on_stream_chunk)
+            except Exception as e:
+                if streamed and is_retryable(e):
+                    raise StreamInterruptedError(
+                        f"{provider.name} stream interrupted: {str(e)}") from e
+                raise
+    
+    error = None
+    for candidate, candidate_key in get_failover_candidates(engine, api_key):
+        # Route to the engine's provider (the default engine if not recognized)
+        provider = get_provider(candidate)
+        try:
+            if on_chunk:
+                return call_engine(
+                    provider, candidate_key, text, context,
+                    lambda: stream(provider, candidate_key), hedge=False, usage=usage)
+            return call_engine(provider, candidate_key, text, context,
+                               lambda: provider.translate(text, context, candidate_key),
+                               usage=usage)
+        except Exception as e:
+            if streamed or not should_fail_over(e):
+                raise
+            error = e
+    raise error
+
+
+def call_engine(provider, api_key, text, context, call, hedge=True, usage=None):
+    """Run a provider call under the engine's budget, breaker, rate limiter and retry policy
+    
+    The estimated tokens and cost are held against the engine's budget until
+    the call finishes; a hedged duplicate that also succeeds is charged too.
+    Each attempt waits for request, token and concurrency capacity first.
+    Transient failures (including 429 responses) are retried with backoff;
+    if they persist, they count against the engine's circuit breaker.
+    
+    Args:
+        provider (EngineProvider): Engine being called
+        api_key (str): API key for the translation service
+        text (str): Text sent, used to estimate token usage
+        context (str): System prompt sent, used to estimate token usage
+        call (callable): Performs the request and returns (result, token_count)
+        hedge (bool): Allow hedged duplicate requests for this call
+        usage (EngineUsage, optional): Receives the tokens used
+        
+    Returns:
+        tuple: The value returned by call
+        
+    Raises:
+        BudgetExceededError: If the request would go over the engine's budget
+        CircuitOpenError: If the engine's breaker is open
+    """
+    # Prompt and completion tokens predicted for the engine
+    prompt_tokens, completion_tokens = provider.estimate_request(text, context)
+    estimated = prompt_tokens + completion_tokens
+    
+    # Requests the engine's budget can't cover are refused before anything else
+    budget = get_budget_tracker()
+    reservation = budget.reserve(provider.name, prompt_tokens, completion_tokens)
+    
+    breaker = get_circuit_breaker(provider.name)
+    if not breaker.allow_request():
+        budget.settle(provider.name, reservation)
+        raise CircuitOpenError(
+            f"{provider.name} is unavailable (circuit open, "
+            f"retrying in {breaker.retry_in():.0f}s)")
+    
+    limiter = get_rate_limiter(provider.name, api_key)
+    
+    # Results of successful calls; a hedged call finishing after the
+    # winner was picked charges itself
+    succeeded = []
+    picked = threading.Event()
+    charge_lock = threading.Lock()
+    
+    def charge(tokens):
+        """Charge a successful call that isn't the one returned"""
+        charged_prompt = min(prompt_tokens, tokens)
+        budget.settle(provider.name, (0, 0.0), charged_prompt, tokens - charged_prompt)
+        if usage is not None:
+            usage.add(provider.name, charged_prompt, tokens - charged_prompt)
+    
+    def limited_call():
+        limiter.acquire(estimated)
+        try:
+            result = call()
+        except ApiError as e:
+            limiter.release(estimated, rate_limited=e.is_rate_limited,
+                            retry_after=e.retry_after, failed=True)
+            raise
+        except Exception:
+            limiter.release(estimated, failed=True)
+            raise
+        
+        limiter.release(estimated, used_tokens=result[1])
+        with charge_lock:
+            late = picked.is_set()
+            if not late:
+                succeeded.append(result)
+        if late:
+            charge(result[1])
+        return result
+    
+    try:
+        result = call_with_retry(provider.name, limited_call, hedge=hedge)
+    except Exception as e:
+        budget.settle(provider.name, reservation)
+        
+        # Errors like an invalid key still prove the engine is reachable;
+        # a request that gave up waiting for our own limiter proves nothing
+        cause = e.__cause__ if isinstance(e, StreamInterruptedError) else e
+        if isinstance(cause, RateLimitWaitError):
+            breaker.record_cancelled()
+        elif is_retryable(cause):
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    
+    breaker.record_success()
+    
+    # Engines report a single total: the prompt's share is the estimate
+    used_prompt = min(prompt_tokens, result[1])
+    budget.settle(provider.name, reservation, used_prompt, result[1] - used_prompt)
+    if usage is not None:
+        usage.add(provider.name, used_prompt, result[1] - used_prompt)
+    
+    # The losing request of a hedge that also finished costs tokens too
+    with charge_lock:
+        picked.set()
+        losers = [other for other in succeeded if other is not result]
+    for other in losers:
+        charge(other[1])
+    
+    # Report the prompt size of each template
+    get_prompt_builder().record(context, prompt_tokens, provider.prompt_caching)
+    return result
+
+
+def translate_text_chunked(text, source_lang, target_lang, tone, context, engine, api_key,
+                           max_chunk_tokens=800, max_workers=4, usage=None, template=None,
+                           additions=""):
+    """Translate large text as chunks translated in parallel
+    
+    The text is split on paragraph/sentence boundaries into chunks of at most
+    max_chunk_tokens, translated concurrently and reassembled in order with
+    the original whitespace between chunks. Each chunk's request is retried
+    by the engine's retry policy; a chunk that still fails fails the text.
+    
+    Args:
+        text (str): Text to translate
+        source_lang (str): Source language
+        target_lang (str): Target language
+        tone (str): Translation tone
+        context (str): Additional context for translation
+        engine (str): Translation engine to use
+        api_key (str): API key for the translation service
+        max_chunk_tokens (int): Token budget per chunk
+        max_workers (int): Maximum number of chunks translated at once
+        usage (EngineUsage, optional): Receives the tokens used per engine
+        template (str, optional): Prompt template of every chunk
+        additions (str): Instructions of this request only (see build_context)
+        
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    if template is None:
+        template = get_prompt_builder().choose_template()
+    chunks = split_text(text, max_chunk_tokens, get_provider(engine).estimate_tokens)
+    if len(chunks) == 1:
+        return translate_text(text, source_lang, target_lang, tone, context, engine, api_key,
+                              usage=usage, template=template, additions=additions)
+    
+    def translate_chunk(chunk):
+        leading, content, trailing = split_edges(chunk)
+        if not content:
+            return chunk, 0
+        
+        translated, token_count = translate_text(
+            content, source_lang, target_lang, tone, context, engine, api_key, usage=usage,
+            template=template, additions=additions)
+        return leading + translated + trailing, token_count
+    
+    with ThreadPoolExecutor(max_workers=max(1, max_workers)) as executor:
+        results = list(executor.map(translate_chunk, chunks))
+    
+    translated = "".join(chunk for chunk, _ in results)
+    token_count = sum(count for _, count in results)
+    return translated, token_count
+
+
+def parse_batch_response(response, count):
+    """Extract the translated items from a batch response
+    
+    Accepts a JSON array of strings (or of {"id", "text"} objects) anywhere in
+    the response, e.g. wrapped in a code fence or preceded by a remark.
+    
+    Args:
+        response (str): Text returned by the engine
+        count (int): Number of items that were sent
+        
+    Returns:
+        list: Translated strings in order, or None if the response is malformed
+    """
+    decoder = json.JSONDecoder()
+    start = response.find("[")
+    while start != -1:
+        try:
+            value, _ = decoder.raw_decode(response, start)
+        except ValueError:
+            value = None
+        
+        if isinstance(value, list) and len(value) == count:
+            if all(isinstance(item, dict) for item in value):
+                value = sorted(value, key=lambda item: item.get("id", 0))
+                value = [item.get("text") for item in value]
+            if all(isinstance(item, str) for item in value):
+                return value
+        
+        start = response.find("[", start + 1)
+    return None
+
+
+def _group_batch(indexes, texts, max_batch_tokens, max_items, estimate):
+    """Group item indexes into batches within the token and item limits"""
+    groups = []
+    current = []
+    current_tokens = 0
+    for index in indexes:
+        tokens = estimate(texts[index])
+        if current and (current_tokens + tokens > max_batch_tokens or len(current) >= max_items):
+            groups.append(current)
+            current = []
+            current_tokens = 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+def translate_batch(texts, source_lang, target_lang, tone, context, engine, api_key,
+                    max_batch_tokens=800, max_items=50, usage=None, template=None, additions=""):
+    """Translate many short texts with as few requests as possible
+    
+    Items are packed into JSON arrays and sent in one request per batch.
+    Engines with native batch support receive the list directly. If a
+    response can't be parsed back into the same number of items, or the
+    engine is unavailable, that batch falls back to one translate_text call
+    per item (which can fail over to another engine). Each batch goes to the
+    engine picked by route_by_budget.
+    
+    Args:
+        texts (list): Texts to translate
+        source_lang (str): Source language
+        target_lang (str): Target language
+        tone (str): Translation tone
+        context (str): Additional context for translation
+        engine (str): Translation engine to use
+        api_key (str): API key for the translation service
+        max_batch_tokens (int): Token budget per request
+        max_items (int): Maximum number of items per request
+        usage (EngineUsage, optional): Receives the tokens used per engine
+        template (str, optional): Prompt template of every request
+        additions (str): Instructions of this request only (see build_context)
+        
+    Returns:
+        tuple: (list of translated texts, token_count)
+    """
+    results = list(texts)
+    token_count = 0
+    
+    # Blank items are kept as they are
+    indexes = [i for i, text in enumerate(texts) if text.strip()]
+    
+    if template is None:
+        template = get_prompt_builder().choose_template()
+    prompt = build_context(source_lang, target_lang, tone, context, template, additions)
+    
+    groups = _group_batch(
+        indexes, texts, max_batch_tokens, max_items, get_provider(engine).estimate_tokens)
+    for group in groups:
+        items = [texts[i] for i in group]
+        batch_engine, batch_key = route_by_budget(engine, api_key, "".join(items), prompt)
+        provider = get_provider(batch_engine)
+        
+        try:
+            if provider.supports("batch"):
+                batch = provider.get_function("batch")
+                translated, tokens = call_engine(
+                    provider, batch_key, "".join(items), prompt,
+                    lambda: batch(items, prompt, batch_key), usage=usage)
+            else:
+                batch_prompt = build_context(
+                    source_lang, target_lang, tone, context, template,
+                    f"{additions} Você receberá um array JSON com {len(items)} textos. "
+                    f"Responda somente com um array JSON de {len(items)} strings "
+                    f"traduzidas, na mesma ordem."
+                )
+                batch_text = json.dumps(items, ensure_ascii=False)
+                response, tokens = call_engine(
+                    provider, batch_key, batch_text, batch_prompt,
+                    lambda: provider.translate(batch_text, batch_prompt, batch_key), usage=usage)
+                translated = parse_batch_response(response, len(items))
+            token_count += tokens
+        except Exception as e:
+            if not should_fail_over(e):
+                raise
+            # Engine unavailable: the items fail over one by one
+            translated = None
+        
+        if translated is None or len(translated) != len(items):
+            # Malformed output or unavailable engine: translate item by item
+            translated = []
+            for item in items:
+                item_translated, tokens = translate_text(
+                    item, source_lang, target_lang, tone, context, engine, api_key, usage=usage,
+                    template=template, additions=additions)
+                translated.append(item_translated)
+                token_count += tokens
+        
+        for index, item_translated in zip(group, translated):
+            results[index] = item_translated
+    
+    return results, token_count
+
+
+def translate_table(text, source_lang, target_lang, tone, context, engine, api_key,
+                    max_batch_tokens=800, usage=None, template=None, additions=""):
+    """Translate tab/newline separated text cell by cell in batches
+    
+    Cells without letters (numbers, dates, blanks) are kept unchanged and
+    the original separators are preserved.
+    
+    Args:
+        text (str): Tabular text to translate
+        source_lang (str): Source language
+        target_lang (str): Target language
+        tone (str): Translation tone
+        context (str): Additional context for translation
+        engine (str): Translation engine to use
+        api_key (str): API key for the translation service
+        max_batch_tokens (int): Token budget per request
+        usage (EngineUsage, optional): Receives the tokens used per engine
+        template (str, optional): Prompt template of every request
+        additions (str): Instructions of this request only (see build_context)
+        
+    Returns:
+        tuple: (translated_text, token_count)
+    """
+    cells, separators = split_cells(text)
+    
+    # Translate only the text of cells containing letters
+    indexes = [i for i, cell in enumerate(cells) if any(c.isalpha() for c in cell)]
+    edges = [split_edges(cells[i]) for i in indexes]
+    
+    translated, token_count = translate_batch(
+        [content for _, content, _ in edges],
+        source_lang, target_lang, tone, context, engine, api_key,
+        max_batch_tokens=max_batch_tokens, usage=usage, template=template, additions=additions
+    )
+    
+    for index, (leading, _, trailing), cell in zip(indexes, edges, translated):
+        cells[index] = leading + cell + trailing
+    
+    return join_cells(cells, separators), token_count
+
+
+def translate_mixed(text, source_lang, target_lang, tone, context, engine, api_key,
+                    analysis=None, max_batch_tokens=800, usage=None, template=None,
+                    additions=""):
+    """Translate the prose of mixed content, keeping code untouched
+    
+    Only prose regions are sent, in batches. Code blocks are spliced back
+    as they are, and URLs, paths and identifiers inside the prose are
+    replaced with placeholders while it is translated.
+    
     Args:
         text (str): Text to translate
         source_lang (str): Source language
@@ -18,23 +600,43 @@ def translate_text(text, source_lang, target_lang, tone, context, engine, api_ke
         context (str): Additional context for translation
         engine (str): Translation engine to use
         api_key (str): API key for the translation service
+        analysis (ContentAnalysis, optional): Result of classify_content(text)
+        max_batch_tokens (int): Token budget per request
+        usage (EngineUsage, optional): Receives the tokens used per engine
+        template (str, optional): Prompt template of every request
+        additions (str): Instructions of this request only (see build_context)
         
     Returns:
         tuple: (translated_text, token_count)
     """
-    # Format the context if not provided
-    if not context:
-        context = f"Traduza de {source_lang} para {target_lang} em tom {tone}."
-    else:
-        context = f"{context} Traduza de {source_lang} para {target_lang} em tom {tone}."
-    
-    # Route to the appropriate translation service
-    if engine == "OpenAI":
-        return translate_with_openai(text, context, api_key)
-    elif engine == "Gemini 2.0":
-        return translate_with_gemini(text, context, api_key)
-    elif engine == "DeepSeek V3":
-        return translate_with_deepseek(text, context, api_key)
-    else:
-        # Default to OpenAI if engine not recognized
-        return translate_with_openai(text, context, api_key)
+    if template is None:
+        template = get_prompt_builder().choose_template()
+    analysis = analysis or classify_content(text)
+    pieces = [region.text for region in analysis.regions]
+    
+    # Prose regions containing words, with inline code masked out
+    indexes = [i for i, region in enumerate(analysis.regions)
+               if region.kind == PROSE and any(c.isalpha() for c in region.text)]
+    edges = [split_edges(pieces[i]) for i in indexes]
+    masked = [mask_inline_code(content) for _, content, _ in edges]
+    
+    instructions = "Mantenha os marcadores ⟦n⟧ exatamente como estão."
+    translated, token_count = translate_batch(
+        [masked_text for masked_text, _ in masked],
+        source_lang, target_lang, tone, context, engine, api_key,
+        max_batch_tokens=max_batch_tokens, usage=usage, template=template,
+        additions=f"{additions} {instructions}"
+    )
+    
+    for index, (leading, content, trailing), (_, spans), item in zip(
+            indexes, edges, masked, translated):
+        restored = unmask_inline_code(item, spans)
+        if restored is None:
+            # The engine mangled a placeholder: translate the original prose
+            restored, tokens = translate_text(
+                content, source_lang, target_lang, tone, context, engine, api_key, usage=usage,
+                template=template, additions=additions)
+            token_count += tokens
+        pieces[index] = leading + restored + trailing
+    
+    return "".join(pieces), token_count
@@ -0,0 +1,35 @@
+"""
+Tests for the Aho-Corasick automaton
+"""
+from utils.aho_corasick import AhoCorasick
+
+
+def make_matcher(*patterns):
+    matcher = AhoCorasick()
+    for pattern in patterns:
+        matcher.add(pattern, pattern)
+    return matcher
+
+
+def test_finds_overlapping_patterns():
+    matcher = make_matcher("he", "she", "his", "hers")
+    assert sorted(matcher.find_all("ushers")) == [(1, 4, "she"), (2, 4, "he"), (2, 6, "hers")]
+
+
+def test_longest_match_wins_at_the_same_start():
+    matcher = make_matcher(("order",), ("order", "number"))
+    words = "please send the order number".split()
+    assert matcher.find_longest(words) == [(3, 5, ("order", "number"))]
+
+
+def test_leftmost_match_wins_over_an_overlapping_one():
+    matcher = make_matcher(("credit", "card"), ("card", "number"))
+    words = "credit card number".split()
+    assert matcher.find_longest(words) == [(0, 2, ("credit", "card"))]
+
+
+def test_patterns_added_after_a_search_are_found():
+    matcher = make_matcher("abc")
+    assert list(matcher.find_all("xabcx")) == [(1, 4, "abc")]
+    matcher.add("bcx", "bcx")
+    assert sorted(matcher.find_all("xabcx")) == [(1, 4, "abc"), (2, 5, "bcx")]
@@ -0,0 +1,24 @@
+"""
+Tests for engine budgets
+"""
+import pytest
+
+from services.api.budget import BudgetExceededError, BudgetTracker, EngineBudget
+
+ENGINE = "Budget test engine"
+
+
+def test_failing_warning_listener_does_not_leak_the_reservation():
+    tracker = BudgetTracker({ENGINE: EngineBudget(daily_tokens=100)}, warning_ratio=0.5)
+
+    def listener(engine, limit, used, allowed):
+        raise RuntimeError("listener failed")
+
+    tracker.add_listener(listener)
+    reservation = tracker.reserve(ENGINE, 50, 10)
+    tracker.settle(ENGINE, reservation)
+
+    # The failed request spent nothing, so the whole budget is left
+    tracker.settle(ENGINE, tracker.reserve(ENGINE, 80, 20), 80, 20)
+    with pytest.raises(BudgetExceededError):
+        tracker.reserve(ENGINE, 1, 0)
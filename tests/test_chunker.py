@@ -0,0 +1,90 @@
+"""
+Tests for splitting large texts into chunks and reassembling them
+"""
+import random
+
+import pytest
+
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services.chunker import split_edges, split_text
+from services.translator import translate_text_chunked
+
+ENGINE = "Chunk test engine"
+
+TEXTS = [
+    "",
+    "One short sentence.",
+    "First paragraph. It has two sentences!\n\nSecond paragraph?\n  \n\tIndented third.\n",
+    "  leading and trailing whitespace  \n\n",
+    "Uma frase em português. 日本語の文です。もう一つ！ Final sentence without a stop",
+    "x" * 500,
+    "\n\n\n",
+]
+
+
+def words(count):
+    return " ".join(f"word{i}" for i in range(count))
+
+
+def estimate(text):
+    return len(text) // 4 + 1
+
+
+def upper_stub(text, context, api_key):
+    return text.upper(), 1
+
+
+register_engine(EngineProvider(ENGINE, __name__, translate="upper_stub"))
+configure_rate_limits({ENGINE: {"rpm": 100000, "tpm": 10 ** 8, "concurrency": 4}})
+
+
+@pytest.mark.parametrize("text", TEXTS)
+@pytest.mark.parametrize("max_tokens", [1, 5, 20, 800])
+def test_chunks_join_back_to_the_original_text(text, max_tokens):
+    assert "".join(split_text(text, max_tokens, estimate)) == text
+
+
+def test_random_texts_round_trip():
+    rng = random.Random(6)
+    alphabet = ["word", "Sentence.", "?", "!", " ", "  ", "\n", "\n\n", "\t", "日本", "。"]
+    for _ in range(300):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 200)))
+        assert "".join(split_text(text, rng.randint(1, 30), estimate)) == text
+
+
+def test_chunks_respect_the_budget():
+    text = "\n\n".join(f"{words(30)}. {words(12)}." for _ in range(6))
+    chunks = split_text(text, 40, estimate)
+
+    assert len(chunks) > 1
+    assert all(estimate(chunk) <= 40 for chunk in chunks[:-1])
+
+
+def test_paragraph_boundaries_are_preferred():
+    text = "First paragraph here.\n\nSecond paragraph here.\n\nThird one."
+    chunks = split_text(text, 8, estimate)
+
+    assert chunks == ["First paragraph here.\n\n", "Second paragraph here.\n\n", "Third one."]
+
+
+def test_oversized_word_is_cut():
+    chunks = split_text("y" * 200, 10, estimate)
+
+    assert len(chunks) > 1
+    assert "".join(chunks) == "y" * 200
+
+
+def test_split_edges():
+    assert split_edges("\n  Hello world \n\n") == ("\n  ", "Hello world", " \n\n")
+    assert split_edges("   ") == ("   ", "", "")
+    assert split_edges("Hello") == ("", "Hello", "")
+
+
+def test_chunked_translation_keeps_whitespace_between_chunks():
+    text = "First paragraph here.\n\n  Second paragraph here.\n\n\nThird one.\n"
+    translated, tokens = translate_text_chunked(
+        text, "English", "Spanish", "Neutral", "", ENGINE, "key", max_chunk_tokens=8)
+
+    assert translated == text.upper()
+    assert tokens == 3
@@ -0,0 +1,113 @@
+"""
+Tests for the engine circuit breakers
+"""
+import pytest
+
+from services.api import circuit_breaker
+from services.api.circuit_breaker import (
+    CLOSED, HALF_OPEN, OPEN, CircuitBreaker, add_state_listener, remove_state_listener)
+
+ENGINE = "Breaker test engine"
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def transitions():
+    seen = []
+
+    def listener(engine, previous, state):
+        if engine == ENGINE:
+            seen.append((previous, state))
+
+    add_state_listener(listener)
+    yield seen
+    remove_state_listener(listener)
+
+
+def open_breaker(**options):
+    breaker = CircuitBreaker(ENGINE, failure_threshold=3, recovery_timeout=30.0, **options)
+    for _ in range(3):
+        assert breaker.allow_request()
+        breaker.record_failure()
+    return breaker
+
+
+def test_consecutive_failures_open_the_breaker(clock, transitions):
+    breaker = CircuitBreaker(ENGINE, failure_threshold=3)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.get_state()["rejected"] == 1
+    assert transitions == [(CLOSED, OPEN)]
+
+
+def test_successful_probe_closes_the_breaker(clock, transitions):
+    breaker = open_breaker()
+    clock[0] += 10
+    assert breaker.retry_in() == 20
+    assert not breaker.allow_request()
+
+    clock[0] += 20
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    # Only one probe at a time
+    assert not breaker.allow_request()
+
+    breaker.record_success()
+    assert breaker.state == CLOSED
+    assert breaker.allow_request()
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+
+def test_failed_probe_reopens_the_breaker(clock, transitions):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.retry_in() == 30
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, OPEN)]
+
+
+def test_cancelled_probe_frees_its_slot(clock):
+    breaker = open_breaker()
+    clock[0] += 30
+    assert breaker.allow_request()
+    breaker.record_cancelled()
+
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+
+
+def test_half_open_allows_several_probes(clock):
+    breaker = open_breaker(half_open_max_calls=2)
+    clock[0] += 30
+    assert breaker.allow_request()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+
+def test_failing_listener_does_not_break_the_breaker(clock):
+    def listener(engine, previous, state):
+        raise RuntimeError("listener failed")
+
+    add_state_listener(listener)
+    try:
+        breaker = open_breaker()
+    finally:
+        remove_state_listener(listener)
+    assert breaker.state == OPEN
@@ -0,0 +1,118 @@
+"""
+Tests for the clipboard monitor's change detection
+"""
+import time
+
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services import clipboard_monitor
+from services.clipboard_monitor import ClipboardMonitor
+from services.clipboard_sources import LocalClipboard, LocalClipboardSource
+
+ENGINE = "Test engine"
+
+
+def translate_stub(text, context, api_key):
+    return f"PT: {text}", 10
+
+
+def stream_stub(text, context, api_key, on_chunk):
+    pieces = [f"PT{i} " for i in range(20)]
+    for piece in pieces:
+        on_chunk(piece)
+        time.sleep(0.02)
+    return "".join(pieces), 10
+
+
+register_engine(EngineProvider(ENGINE, __name__, translate="translate_stub",
+                               stream="stream_stub"))
+configure_rate_limits({ENGINE: {"rpm": 100000, "tpm": 10 ** 8, "concurrency": 4}})
+
+
+def wait_until(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def start_monitor(clipboard, completed, on_partial_translation=None):
+    monitor = ClipboardMonitor(
+        on_translation_complete=lambda original, translated, *args, **kwargs:
+            completed.append((original, translated)),
+        source=LocalClipboardSource(clipboard), skip_target_language=False,
+        on_partial_translation=on_partial_translation)
+    monitor.start("key", "Inglês", "Português", "neutro", "", ENGINE)
+    return monitor
+
+
+def test_copying_the_original_again_translates_it_again():
+    clipboard = LocalClipboard()
+    completed = []
+    monitor = start_monitor(clipboard, completed)
+    try:
+        text = "The meeting has been moved to Thursday afternoon."
+        clipboard.copy(text)
+        wait_until(lambda: clipboard.paste() == f"PT: {text}")
+
+        clipboard.copy(text)
+        wait_until(lambda: len(completed) == 2)
+        assert monitor.pipeline.get_stats()["submitted"] == 2
+        assert completed[1] == (text, f"PT: {text}")
+    finally:
+        monitor.stop()
+
+
+def test_own_translation_is_not_translated():
+    clipboard = LocalClipboard()
+    completed = []
+    monitor = start_monitor(clipboard, completed)
+    try:
+        text = "Please send the report before noon."
+        clipboard.copy(text)
+        wait_until(lambda: len(completed) == 1)
+        time.sleep(0.2)
+        assert monitor.pipeline.get_stats()["submitted"] == 1
+        assert clipboard.paste() == f"PT: {text}"
+    finally:
+        monitor.stop()
+
+
+def test_stale_stream_is_stopped_and_its_preview_removed():
+    clipboard = LocalClipboard()
+    completed = []
+    partials = []
+    monitor = start_monitor(clipboard, completed,
+                            lambda original, partial: partials.append((original, partial)))
+    try:
+        first = "The first document is being translated slowly."
+        clipboard.copy(first)
+        wait_until(lambda: partials)
+        second = "A second document replaces the first one."
+        clipboard.copy(second)
+        wait_until(lambda: any(original == second for original, _ in completed))
+
+        first_updates = [partial for original, partial in partials if original == first]
+        assert first_updates[-1] is None
+        assert len(first_updates) < 20
+        assert [original for original, _ in completed] == [second]
+        assert monitor.pipeline.get_stats()["dropped_stale"] == 1
+    finally:
+        monitor.stop()
+
+
+def test_text_is_classified_once(monkeypatch):
+    classified = []
+    classify_content = clipboard_monitor.classify_content
+    monkeypatch.setattr(clipboard_monitor, "classify_content",
+                        lambda text: classified.append(text) or classify_content(text))
+
+    clipboard = LocalClipboard()
+    completed = []
+    monitor = start_monitor(clipboard, completed)
+    try:
+        clipboard.copy("Run `make test` before sending the patch.")
+        wait_until(lambda: completed)
+        assert len(classified) == 1
+    finally:
+        monitor.stop()
@@ -0,0 +1,48 @@
+"""
+Tests for the clipboard change sources
+"""
+import threading
+
+import pytest
+
+from services.clipboard_sources import (
+    ClipboardSource, LocalClipboard, LocalClipboardSource, PollingClipboardSource,
+    create_clipboard_source)
+
+
+def test_base_source_cannot_be_used_without_a_wait():
+    with pytest.raises(TypeError):
+        ClipboardSource()
+
+
+def test_first_wait_returns_the_current_text():
+    source = LocalClipboardSource(LocalClipboard("Copied before"))
+    source.open()
+    assert source.wait_for_change(0.01) == "Copied before"
+    assert source.wait_for_change(0.01) is None
+
+
+def test_local_source_wakes_up_on_a_copy():
+    clipboard = LocalClipboard()
+    source = LocalClipboardSource(clipboard)
+    source.open()
+    source.wait_for_change(0.01)
+    timer = threading.Timer(0.05, clipboard.copy, ("New text",))
+    timer.start()
+    assert source.wait_for_change(2.0) == "New text"
+    assert source.stats.snapshot()["changes"] == 1
+
+
+def test_polling_source_reports_only_changes():
+    values = iter(["first", "first", "second"])
+    source = PollingClipboardSource(interval=0.001, reader=lambda: next(values))
+    source.open()
+    assert source.wait_for_change(0.01) == "first"
+    assert source.wait_for_change(0.01) is None
+    assert source.wait_for_change(0.01) == "second"
+
+
+def test_unavailable_backend_falls_back_to_polling(monkeypatch):
+    monkeypatch.delenv("DISPLAY", raising=False)
+    assert isinstance(create_clipboard_source("xfixes"), PollingClipboardSource)
+    assert isinstance(create_clipboard_source("local"), LocalClipboardSource)
@@ -0,0 +1,53 @@
+"""
+Tests for finding glossary terms and checking their translations
+"""
+from services.glossary import Glossary
+
+
+def make_glossary(tmp_path):
+    glossary = Glossary(str(tmp_path / "glossary.tsv"))
+    glossary.add("order", "pedido")
+    glossary.add("order number", "número do pedido")
+    glossary.add("Café Aurora", "Café Aurora", "nome do produto")
+    return glossary
+
+
+def test_longest_term_is_found(tmp_path):
+    glossary = make_glossary(tmp_path)
+    terms = glossary.find_terms("Your order number is 123.")
+    assert [(term.source, term.target) for term in terms] == [("order number", "número do pedido")]
+
+
+def test_terms_match_whole_words_only(tmp_path):
+    glossary = make_glossary(tmp_path)
+    assert glossary.find_terms("The orders were reordered.") == []
+
+
+def test_terms_are_matched_ignoring_case(tmp_path):
+    glossary = make_glossary(tmp_path)
+    text = "Try CAFÉ aurora with your ORDER."
+    terms = glossary.find_terms(text)
+    assert [term.source for term in terms] == ["Café Aurora", "order"]
+    assert [text[term.start:term.end] for term in terms] == ["CAFÉ aurora", "ORDER"]
+
+
+def test_each_term_is_listed_once(tmp_path):
+    glossary = make_glossary(tmp_path)
+    terms = glossary.find_terms("One order, then another order.")
+    assert [term.source for term in terms] == ["order"]
+
+
+def test_missing_approved_translation_is_reported(tmp_path):
+    glossary = make_glossary(tmp_path)
+    terms = glossary.find_terms("Check the order number and the order.")
+    missing = glossary.verify(terms, "Confira o número do Pedido e a encomenda.")
+    assert missing == []
+    missing = glossary.verify(terms, "Confira o código da encomenda.")
+    assert [term.source for term in missing] == ["order number", "order"]
+
+
+def test_saved_terms_are_loaded(tmp_path):
+    make_glossary(tmp_path).save()
+    glossary = Glossary(str(tmp_path / "glossary.tsv"))
+    assert len(glossary) == 3
+    assert [term.note for term in glossary.find_terms("café aurora")] == ["nome do produto"]
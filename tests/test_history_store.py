@@ -0,0 +1,20 @@
+"""
+Tests for the translation history store
+"""
+from services.history_store import HistoryStore
+
+
+def test_clear_empties_the_history_and_its_search_index():
+    store = HistoryStore(":memory:")
+    try:
+        for i in range(50):
+            store.add("Inglês", "Português", f"Invoice number {i}", f"Fatura número {i}")
+        store.clear()
+        assert store.get_recent() == []
+        assert store.search("invoice") == []
+
+        store.add("Inglês", "Português", "Invoice overdue", "Fatura vencida")
+        [entry] = store.search("invoice")
+        assert entry['translated'] == "Fatura vencida"
+    finally:
+        store.close()
@@ -0,0 +1,73 @@
+"""
+Tests for n-gram language identification
+"""
+import pytest
+
+from config.languages import get_language_name
+from utils.language_id import (
+    extract_ngrams, identify_language, load_profiles, normalize, write_profiles)
+
+# Sentences that are not part of the profile corpus
+SAMPLES = {
+    "en": "The weather was lovely yesterday, so we walked along the river and had lunch outside.",
+    "de": "Gestern war das Wetter schön, deshalb sind wir am Fluss spazieren gegangen und "
+          "haben draußen gegessen.",
+    "es": "Ayer hizo muy buen tiempo, así que paseamos junto al río y comimos afuera con los niños.",
+    "fr": "Hier il faisait très beau, alors nous avons marché le long de la rivière et déjeuné "
+          "dehors.",
+    "it": "Ieri il tempo era bellissimo, quindi abbiamo passeggiato lungo il fiume e pranzato "
+          "fuori.",
+    "nl": "Gisteren was het mooi weer, dus we hebben langs de rivier gewandeld en buiten geluncht.",
+    "pt": "Ontem o tempo estava ótimo, então caminhamos ao longo do rio e almoçamos lá fora.",
+    "sv": "Igår var vädret underbart, så vi promenerade längs floden och åt lunch utomhus.",
+    "tr": "Dün hava çok güzeldi, bu yüzden nehir boyunca yürüdük ve dışarıda öğle yemeği yedik.",
+}
+
+SCRIPT_SAMPLES = {
+    "ru": "Вчера была прекрасная погода.",
+    "el": "Χθες ο καιρός ήταν υπέροχος.",
+    "ar": "كان الطقس جميلا أمس.",
+    "hi": "कल मौसम बहुत अच्छा था।",
+    "ko": "어제는 날씨가 아주 좋았어요.",
+    "ja": "昨日はとても良い天気でした。",
+    "zh": "昨天天气很好，我们在河边散步。",
+}
+
+
+@pytest.mark.parametrize("code", sorted(SAMPLES))
+def test_latin_languages_are_identified(code):
+    ranked = identify_language(SAMPLES[code])
+
+    assert ranked[0][0] == get_language_name(code)
+    assert ranked[0][1] > 0.9
+    assert sum(confidence for _, confidence in ranked) == pytest.approx(1.0)
+
+
+@pytest.mark.parametrize("code", sorted(SCRIPT_SAMPLES))
+def test_languages_with_their_own_script_are_identified(code):
+    assert identify_language(SCRIPT_SAMPLES[code]) == [(get_language_name(code), 1.0)]
+
+
+def test_short_text_gets_modest_confidence():
+    assert identify_language("Hi")[0][1] < 0.5
+
+
+def test_text_without_letters_is_not_identified():
+    assert identify_language("1234 !! -- 56") == []
+
+
+def test_ngrams_are_padded_at_word_edges():
+    counts = extract_ngrams(normalize("Ab, AB!"))
+
+    assert counts[" ab"] == 2
+    assert counts["ab "] == 2
+    assert counts["a"] == 2
+
+
+def test_profiles_round_trip(tmp_path):
+    path = str(tmp_path / "profiles.bin")
+    write_profiles(path, ["aa", "bb"], [" a", "b "], [[-1.0, -2.0], [-3.0, -4.0]], [-9.0, -8.0])
+
+    profiles = load_profiles(path)
+    assert profiles["aa"] == ({" a": -1.0, "b ": -2.0}, -9.0)
+    assert profiles["bb"] == ({" a": -3.0, "b ": -4.0}, -8.0)
@@ -0,0 +1,69 @@
+"""
+Tests for the pre-flight filter
+"""
+import pytest
+
+from services.api.registry import EngineProvider, register_engine
+from services.preflight import PreflightFilter
+
+ENGINE = "Preflight test engine"
+
+register_engine(EngineProvider(ENGINE, "json", translate="dumps"))
+
+
+def check(preflight, text, target_lang="Português"):
+    return preflight.check(text, "Inglês", target_lang, "neutro", "", ENGINE)
+
+
+@pytest.mark.parametrize("text,reason", [
+    ("", "no letters"),
+    ("  1,234.56 € \n", "no letters"),
+    ("https://example.com/docs?page=2", "url"),
+    ("www.example.com https://example.org", "url"),
+    ("someone@example.com", "email address"),
+    ("C:\\Users\\someone\\Documents\\report.docx", "file path"),
+    ("~/projects/app/main.py", "file path"),
+    ("3f9a2c1b7d", "hash or id"),
+    ("123e4567-e89b-12d3-a456-426614174000", "hash or id"),
+    ("v2.10.3-beta", "version number"),
+    ("os.path.join", "identifier"),
+    ("translateText", "identifier"),
+    ("get_settings()", "identifier"),
+])
+def test_untranslatable_text_is_skipped(text, reason):
+    result = check(PreflightFilter(), text)
+
+    assert result.skipped
+    assert result.skip_reason == reason
+
+
+def test_text_in_another_language_passes():
+    result = check(PreflightFilter(), "The meeting was moved to Thursday afternoon because "
+                                      "several people are travelling.")
+
+    assert not result.skipped
+    assert result.language == "Inglês"
+    assert result.confidence >= 0.9
+
+
+def test_text_already_in_the_target_language_is_skipped():
+    text = "A reunião foi adiada para quinta-feira à tarde porque várias pessoas estão viajando."
+
+    assert check(PreflightFilter(), text).skip_reason == "already in target language"
+    assert not check(PreflightFilter(skip_target_language=False), text).skipped
+    assert not check(PreflightFilter(language_confidence=1.01), text).skipped
+
+
+def test_stats_count_the_work_avoided():
+    preflight = PreflightFilter()
+    check(preflight, "https://example.com")
+    check(preflight, "https://example.org")
+    check(preflight, "12345")
+    check(preflight, "Please translate this sentence into Portuguese for me.")
+
+    stats = preflight.stats.snapshot()
+    assert stats["checked"] == 4
+    assert stats["passed"] == 1
+    assert stats["skipped"] == {"url": 2, "no letters": 1}
+    assert stats["calls_avoided"] == 3
+    assert stats["tokens_avoided"] > 0
@@ -0,0 +1,26 @@
+"""
+Tests for compiling system prompts
+"""
+from services.prompts import PromptBuilder
+
+CONTEXT = "Textos de suporte ao cliente."
+
+
+def test_additions_are_appended_without_being_compiled():
+    builder = PromptBuilder()
+    static = builder.build("Inglês", "Português", "neutro", CONTEXT)
+    for i in range(10):
+        prompt = builder.build("Inglês", "Português", "neutro", CONTEXT,
+                               additions=f"Use estes termos do glossário: \"item {i}\".")
+        assert prompt.startswith(f"{static} Use estes termos")
+        assert prompt.cacheable_tokens == static.tokens < prompt.tokens
+    assert builder.get_stats()["compiled"]["entries"] == 1
+
+
+def test_cacheable_tokens_count_only_the_static_prefix():
+    builder = PromptBuilder()
+    static = builder.build("Inglês", "Português", "neutro", CONTEXT)
+    builder.record(static, 100, prompt_caching=True)
+    builder.record(builder.build("Inglês", "Português", "neutro", CONTEXT, additions="Extra."),
+                   110, prompt_caching=True)
+    assert builder.get_stats()["templates"]["default"]["cacheable_tokens"] == 2 * static.tokens
@@ -0,0 +1,79 @@
+"""
+Tests for per-engine rate limiting
+"""
+import pytest
+
+from services.api.circuit_breaker import get_circuit_breaker
+from services.api.rate_limiter import (
+    RateLimiter, RateLimitWaitError, TokenBucket, configure_rate_limits)
+from services.api.registry import EngineProvider, register_engine
+from services.api.retry import get_retry_stats
+from services.translator import translate_text
+
+ENGINE = "Limited test engine"
+
+calls = []
+
+
+def translate_stub(text, context, api_key):
+    calls.append(text)
+    return f"PT: {text}", 10
+
+
+register_engine(EngineProvider(ENGINE, __name__, translate="translate_stub"))
+
+
+def test_bucket_refills_at_its_rate():
+    bucket = TokenBucket(60, period=60.0)
+    now = bucket.updated_at
+    bucket.consume(60)
+    assert bucket.wait_time(1, now) == pytest.approx(1.0)
+    bucket.refill(now + 30)
+    assert bucket.tokens == pytest.approx(30)
+    bucket.refill(now + 300)
+    assert bucket.tokens == 60
+
+
+def test_reported_reset_refills_the_whole_bucket():
+    bucket = TokenBucket(100)
+    now = bucket.updated_at
+    bucket.set_limit(100, remaining=0, reset=2.0)
+    assert bucket.wait_time(50, now) == pytest.approx(2.0)
+    bucket.refill(now + 2.0)
+    assert bucket.tokens == 100
+
+
+def test_concurrency_grows_additively_and_halves_on_rate_limits():
+    limiter = RateLimiter(ENGINE, rpm=10000, tpm=10 ** 8, concurrency=4, max_concurrency=5)
+    for _ in range(4):
+        limiter.acquire(10)
+        limiter.release(10, used_tokens=10)
+    assert limiter.concurrency == pytest.approx(4.9, abs=0.05)
+
+    limiter.acquire(10)
+    limiter.release(10, rate_limited=True, retry_after=0.01)
+    assert limiter.concurrency == pytest.approx(2.45, abs=0.05)
+    assert limiter.get_state()["rate_limited"] == 1
+
+
+def test_callers_over_the_limit_wait_then_give_up():
+    limiter = RateLimiter(ENGINE, rpm=1, tpm=10 ** 8)
+    limiter.acquire(10)
+    limiter.release(10, used_tokens=10)
+    with pytest.raises(RateLimitWaitError):
+        limiter.acquire(10, timeout=0.05)
+
+
+def test_giving_up_on_our_limiter_is_not_retried_or_counted_by_the_breaker(monkeypatch):
+    monkeypatch.setattr(RateLimiter, "MAX_WAIT", 0.05)
+    configure_rate_limits({ENGINE: {"rpm": 1, "tpm": 10 ** 8}})
+    calls.clear()
+    try:
+        translate_text("First.", "Inglês", "Português", "neutro", "", ENGINE, "key")
+        with pytest.raises(RateLimitWaitError):
+            translate_text("Second.", "Inglês", "Português", "neutro", "", ENGINE, "key")
+    finally:
+        configure_rate_limits({ENGINE: {"rpm": 100000, "tpm": 10 ** 8}})
+    assert calls == ["First."]
+    assert get_retry_stats()[ENGINE]["retries"] == 0
+    assert get_circuit_breaker(ENGINE).get_state()["failures"] == 0
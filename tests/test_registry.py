@@ -0,0 +1,80 @@
+"""
+Tests for the lazily loaded engine registry
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from services.api.registry import (
+    DEFAULT_ENGINE, EngineProvider, get_engine_names, get_provider, has_engine, register_engine)
+
+MODULE = "lazy_test_engine"
+ENGINE = "Lazy test engine"
+
+
+@pytest.fixture
+def engine_module(tmp_path, monkeypatch):
+    (tmp_path / f"{MODULE}.py").write_text(
+        "def translate(text, context, api_key):\n"
+        "    return text[::-1], 3\n"
+        "\n"
+        "def count(text):\n"
+        "    return 42\n")
+    monkeypatch.syspath_prepend(str(tmp_path))
+    yield
+    sys.modules.pop(MODULE, None)
+
+
+def test_module_is_imported_on_first_use(engine_module):
+    provider = EngineProvider(ENGINE, MODULE, translate="translate")
+    register_engine(provider)
+
+    assert has_engine(ENGINE)
+    assert provider.supports("translate")
+    assert not provider.supports("stream")
+    assert MODULE not in sys.modules
+
+    assert provider.translate("abc", "", "key") == ("cba", 3)
+    assert MODULE in sys.modules
+
+
+def test_missing_capabilities_fall_back_without_importing(engine_module):
+    provider = EngineProvider(ENGINE, MODULE, translate="translate")
+
+    assert provider.get_function("batch") is None
+    assert provider.test_connection("key") == (True, "Connection test not available")
+    assert provider.estimate_tokens("Hello world") > 0
+    provider.prewarm()
+    assert MODULE not in sys.modules
+
+    chunks = []
+    assert provider.stream("abc", "", "key", chunks.append) == ("cba", 3)
+    assert chunks == ["cba"]
+
+
+def test_declared_token_estimator_is_used(engine_module):
+    provider = EngineProvider(ENGINE, MODULE, translate="translate", estimate_tokens="count")
+    assert provider.estimate_tokens("Hello") == 42
+
+
+def test_invalid_providers_are_rejected():
+    with pytest.raises(ValueError):
+        EngineProvider("Broken", MODULE, stream="translate")
+    with pytest.raises(ValueError):
+        EngineProvider("Broken", MODULE, translate="translate", speak="speak")
+
+
+def test_unknown_engine_gets_the_default_provider():
+    assert get_provider("No such engine").name == DEFAULT_ENGINE
+    assert get_engine_names()[:3] == ["OpenAI", "Gemini 2.0", "DeepSeek V3"]
+
+
+def test_engine_sdks_are_not_imported_at_startup():
+    code = ("import sys, services.translator\n"
+            "print(sorted(m for m in ('services.api.openai', 'services.api.gemini',"
+            " 'services.api.deepseek') if m in sys.modules))")
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True,
+                            cwd=Path(__file__).parent.parent, check=True)
+    assert result.stdout.strip() == "[]"
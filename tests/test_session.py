@@ -0,0 +1,64 @@
+"""
+Tests for the shared HTTP session pool
+"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.api.session import SessionManager
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.client_ports.append(self.client_address[1])
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"{}")
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.client_ports = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def test_requests_reuse_one_connection(server):
+    manager = SessionManager()
+    url = f"http://127.0.0.1:{server.server_address[1]}/"
+    for _ in range(5):
+        assert manager.post(url, json={}).status_code == 200
+    manager.close()
+
+    assert len(server.client_ports) == 5
+    assert len(set(server.client_ports)) == 1
+
+
+def test_session_is_shared_until_reconfigured():
+    manager = SessionManager(pool_maxsize=2)
+    session = manager.get_session()
+    assert manager.get_session() is session
+    assert session.get_adapter("https://example.com")._pool_maxsize == 2
+
+    manager.configure(pool_maxsize=5, read_timeout=10)
+    new_session = manager.get_session()
+    assert new_session is not session
+    assert new_session.get_adapter("https://example.com")._pool_maxsize == 5
+    assert manager.timeout == (5, 10)
+
+
+def test_urllib3_retries_are_disabled():
+    adapter = SessionManager().get_session().get_adapter("https://example.com")
+    assert adapter.max_retries.total == 0
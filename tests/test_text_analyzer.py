@@ -0,0 +1,102 @@
+"""
+Tests for the text analysis helpers
+"""
+import random
+
+from utils import text_analyzer
+from utils.text_analyzer import classify_content, is_tabular, may_contain_code
+
+
+def test_spreadsheet_cells_are_tabular():
+    assert is_tabular("Name\tPrice\tStock\nApple\t1.20\t30\nPear\t0.90\t12")
+
+
+def test_label_list_is_tabular():
+    assert is_tabular("Save changes\nDiscard\nCancel\nOpen recent files")
+
+
+def test_short_email_is_not_tabular():
+    text = "Dear John,\nThanks for the call.\nSee you on Monday.\nBest regards,\nMaria"
+    assert not is_tabular(text)
+
+
+def test_poem_is_not_tabular():
+    text = "Roses are red,\nViolets are blue,\nSugar is sweet,\nAnd so are you."
+    assert not is_tabular(text)
+
+
+def test_address_is_not_tabular():
+    assert not is_tabular("Maria Silva\nRua das Flores, 123\nLisboa\nPortugal")
+
+
+def test_single_line_is_not_tabular():
+    assert not is_tabular("Save changes")
+
+
+GOLDEN = [
+    "",
+    "   \n\n",
+    "Olá, tudo bem?",
+    "O relatório foi enviado ontem à tarde para a diretoria.",
+    "Please review the attached document and let me know.",
+    "会议定于明天上午十点举行。",
+    "Meeting at 10:00 - room 4 (2nd floor)",
+    "Preço: R$ 25,00 + frete",
+    "50% off!!! Only today!!!",
+    "Nota: veja (a) e (b).",
+    "We need to implement the plan.\n    Indented note here.\n\nNext paragraph.",
+    "Try again later.\nCase closed.\nElse we wait.",
+    "Line one\r    indented\rLine three",
+    "a = b + c;",
+    "x = 1\ny = 2",
+    "echo hello",
+    "def main():\n    print('hi')\n",
+    "function add(a, b) { return a + b; }",
+    "See the docs.\n\n```\nmake install\n```\n",
+    "Run this:\n~~~\nls -la\n~~~",
+    "Traceback (most recent call last):\n  File \"app.py\", line 3, in <module>\nValueError: bad",
+    "<div class=\"note\">Hello</div>",
+    "Call it like this:\nsetup()\nThen wait for the result.",
+    "The value ends with a brace {\nand continues here.",
+    "First line echo from a separator",
+    "Text then\x0c// a comment after a form feed",
+    "// comment\nSome prose follows the comment line.",
+]
+
+FRAGMENTS = [
+    "o relatório ", "the report ", "def", " ", "    ", "\t", "\n", "\r\n", "(", ")", "{", "}",
+    ";", "=", "return ", "class ", "if (", "echo ", "// ", "<b>", "```", "word ", "ção ",
+    "x.y", "try", ".", ",", "!", " ",
+]
+
+
+def classify_fully(text, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(text_analyzer, "may_contain_code", lambda text: True)
+        return text_analyzer.classify_content(text)
+
+
+def assert_same_decisions(text, monkeypatch):
+    fast = classify_content(text)
+    full = classify_fully(text, monkeypatch)
+    assert fast.kind == full.kind, text
+    assert [(region.kind, region.text) for region in fast.regions] == \
+        [(region.kind, region.text) for region in full.regions], text
+
+
+def test_prose_fast_path_matches_full_classification_on_golden_corpus(monkeypatch):
+    for text in GOLDEN:
+        assert_same_decisions(text, monkeypatch)
+    assert not may_contain_code("Please review the attached document and let me know.")
+
+
+def test_prose_fast_path_matches_full_classification_on_random_text(monkeypatch):
+    rng = random.Random(12)
+    for _ in range(2000):
+        text = "".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(1, 40)))
+        assert_same_decisions(text, monkeypatch)
+
+
+def test_lines_without_features_cannot_score_as_code():
+    assert text_analyzer.SYMBOL_DENSITY_WEIGHT + text_analyzer.INDENT_WEIGHT < \
+        text_analyzer.CODE_LINE_THRESHOLD
@@ -0,0 +1,104 @@
+"""
+Tests for the token usage ledger
+"""
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+
+from utils.token_counter import TokenCounter
+
+
+@pytest.fixture
+def db_file(tmp_path, monkeypatch):
+    # Keep token_usage.json of the working directory out of the ledger
+    monkeypatch.chdir(tmp_path)
+    return str(tmp_path / "token_usage.db")
+
+
+def create_monthly_ledger(db_file, with_log=True):
+    """Write the tables of the previous, monthly-only ledger format"""
+    db = sqlite3.connect(db_file)
+    db.execute("CREATE TABLE monthly_usage (month TEXT NOT NULL, engine TEXT NOT NULL, "
+               "tokens INTEGER NOT NULL, PRIMARY KEY (month, engine))")
+    db.executemany("INSERT INTO monthly_usage VALUES (?, ?, ?)",
+                   [("2025-01", "OpenAI", 1000), ("2025-02", "Gemini 2.0", 300)])
+    if with_log:
+        db.execute("CREATE TABLE usage_log (seq INTEGER PRIMARY KEY, month TEXT NOT NULL, "
+                   "engine TEXT NOT NULL, tokens INTEGER NOT NULL, created_at REAL NOT NULL)")
+        db.execute("INSERT INTO usage_log VALUES (1, '2025-02', 'OpenAI', 50, 0)")
+    db.commit()
+    db.close()
+
+
+def test_monthly_ledger_is_migrated(db_file):
+    create_monthly_ledger(db_file)
+    counter = TokenCounter(db_file)
+    try:
+        assert counter.get_usage_by_month() == {"2025-01": 1000, "2025-02": 350}
+        tables = {row[0] for row in counter._db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        assert not tables & {"monthly_usage", "usage_log"}
+    finally:
+        counter.close()
+
+
+def test_monthly_ledger_without_a_log_is_migrated(db_file):
+    create_monthly_ledger(db_file, with_log=False)
+    counter = TokenCounter(db_file)
+    try:
+        assert counter._db is not None
+        assert counter.get_usage_by_month() == {"2025-01": 1000, "2025-02": 300}
+    finally:
+        counter.close()
+
+
+def timestamp(day):
+    return datetime.strptime(day, "%Y-%m-%d").timestamp() + 12 * 3600
+
+
+def test_requests_are_compacted_into_daily_totals(db_file):
+    counter = TokenCounter(db_file)
+    counter.record_request("OpenAI", "gpt", "en", "pt", 10, 20, latency=0.5,
+                           timestamp=timestamp("2025-03-01"))
+    counter.record_request("OpenAI", "gpt", "en", "pt", 5, 5, latency=1.5, cached=True,
+                           timestamp=timestamp("2025-03-01"))
+    counter.record_request("Gemini 2.0", "flash", "en", "pt", 1, 2,
+                           timestamp=timestamp("2025-03-02"))
+    counter.compact()
+    counter.compact()
+
+    rows = counter._db.execute(
+        "SELECT day, engine, requests, cache_hits, tokens, latency_ms FROM daily_usage "
+        "ORDER BY day").fetchall()
+    assert rows == [("2025-03-01", "OpenAI", 2, 1, 40, 2000.0),
+                    ("2025-03-02", "Gemini 2.0", 1, 0, 3, 0.0)]
+
+    # Rows recorded after the last compaction are counted once on reload
+    counter.record_request("OpenAI", "gpt", "en", "pt", 0, 7, timestamp=timestamp("2025-03-02"))
+    counter._db.close()
+    counter._db = None
+
+    counter = TokenCounter(db_file)
+    try:
+        usage = counter.query_usage(("day",))
+        assert usage[("2025-03-01",)]["tokens"] == 40
+        assert usage[("2025-03-01",)]["avg_latency_ms"] == 1000.0
+        assert usage[("2025-03-02",)]["tokens"] == 10
+        assert counter.query_usage(("engine",), engine="OpenAI")[("OpenAI",)]["requests"] == 3
+    finally:
+        counter.close()
+
+
+def test_compaction_drops_expired_rows(db_file):
+    counter = TokenCounter(db_file)
+    try:
+        old = datetime.now() - timedelta(days=TokenCounter.RECORD_RETENTION_DAYS + 5)
+        counter.record_request("OpenAI", completion_tokens=100, timestamp=old.timestamp())
+        counter.record_request("OpenAI", completion_tokens=1)
+        counter.compact()
+
+        assert len(counter.get_records()) == 1
+        assert counter.get_total_usage() == 101
+    finally:
+        counter.close()
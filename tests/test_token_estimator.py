@@ -0,0 +1,52 @@
+"""
+Tests for local token counting
+"""
+import math
+import sys
+
+import pytest
+
+from utils import token_estimator
+from utils.token_estimator import (
+    COMPLETION_RATIO, REQUEST_OVERHEAD, count_tokens, estimate_tokens, predict_request_tokens)
+
+
+@pytest.fixture
+def without_tiktoken(monkeypatch):
+    # A None entry makes "import tiktoken" raise ImportError
+    monkeypatch.setitem(sys.modules, "tiktoken", None)
+    monkeypatch.setattr(token_estimator, "_encodings", {})
+
+
+@pytest.mark.parametrize("text,tokens", [
+    ("", 0),
+    ("Hello world", 2),
+    ("Hello, world!", 4),
+    ("internationalization", 4),
+    ("12345678", 3),
+    ("日本語", 3),
+    ("naïve café", 5),
+    ("  a\n    b", 4),
+])
+def test_heuristic_splits_text_like_bpe(text, tokens):
+    assert estimate_tokens(text) == tokens
+
+
+def test_count_falls_back_to_the_heuristic_without_tiktoken(without_tiktoken):
+    text = "The quick brown fox jumps over the lazy dog."
+
+    assert count_tokens(text, "cl100k_base") == estimate_tokens(text)
+    assert token_estimator._encodings == {"cl100k_base": None}
+
+
+def test_count_without_an_encoding_uses_the_heuristic(without_tiktoken):
+    assert count_tokens("Hello world") == 2
+    assert token_estimator._encodings == {}
+
+
+def test_request_prediction():
+    context = "Translate to Spanish"
+    prompt_tokens, completion_tokens = predict_request_tokens("Hello world", context)
+
+    assert prompt_tokens == REQUEST_OVERHEAD + estimate_tokens(context) + 2
+    assert completion_tokens == math.ceil(2 * COMPLETION_RATIO)
@@ -0,0 +1,79 @@
+"""
+Tests for the persistent translation cache
+"""
+from services import translation_cache
+from services.translation_cache import TranslationCache
+
+ENGINE = "Cache test engine"
+
+
+def put(cache, text, translated):
+    cache.put(text, "English", "Spanish", "Neutral", "", ENGINE, translated)
+
+
+def get(cache, text):
+    return cache.get(text, "English", "Spanish", "Neutral", "", ENGINE)
+
+
+def disk_count(cache):
+    return cache._db.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+
+def test_hits_survive_a_restart(tmp_path):
+    db_file = str(tmp_path / "cache.db")
+    put(TranslationCache(db_file), "hello", "hola")
+
+    cache = TranslationCache(db_file)
+    assert get(cache, "  hello ") == "hola"
+    assert get(cache, "goodbye") is None
+    assert cache.get_stats()["hits"] == 1
+    assert cache.get_stats()["misses"] == 1
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = TranslationCache(":memory:", memory_entries=2)
+    put(cache, "one", "uno")
+    put(cache, "two", "dos")
+    get(cache, "one")
+    put(cache, "three", "tres")
+
+    keys = list(cache._memory)
+    assert len(keys) == 2
+    assert cache.make_key("two", "English", "Spanish", "Neutral", "", ENGINE) not in keys
+    # The evicted entry is still served from disk
+    assert get(cache, "two") == "dos"
+
+
+def test_disk_tier_is_capped_at_max_entries(tmp_path, monkeypatch):
+    clock = iter(range(1000, 2000))
+    monkeypatch.setattr(translation_cache.time, "time", lambda: next(clock))
+    cache = TranslationCache(str(tmp_path / "cache.db"), memory_entries=1, max_entries=3)
+    cache.PRUNE_INTERVAL = 1
+    for text in ["a", "b", "c"]:
+        put(cache, text, text.upper())
+    get(cache, "a")
+    put(cache, "d", "D")
+
+    assert disk_count(cache) == 3
+    # "b" was the least recently used row once "a" was read again
+    assert get(cache, "b") is None
+    assert get(cache, "a") == "A"
+
+
+def test_expired_entries_are_misses(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(translation_cache.time, "time", lambda: now[0])
+    cache = TranslationCache(str(tmp_path / "cache.db"), max_age_days=1)
+    put(cache, "hello", "hola")
+
+    now[0] += 2 * 86400
+    assert get(cache, "hello") is None
+
+
+def test_clear_empties_both_tiers(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.db"))
+    put(cache, "hello", "hola")
+    cache.clear()
+
+    assert get(cache, "hello") is None
+    assert disk_count(cache) == 0
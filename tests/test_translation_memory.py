@@ -0,0 +1,39 @@
+"""
+Tests for reusing past translations from the translation memory
+"""
+from services.history_store import HistoryStore
+from services.translation_memory import TranslationMemory, request_key
+
+
+def make_memory(tmp_path):
+    store = HistoryStore(str(tmp_path / "translation_history.db"))
+    key = request_key("Inglês", "neutro", "Suporte ao cliente.")
+    store.add("Inglês", "Português", "Order 1234 has shipped.", "O pedido 1234 foi enviado.",
+              request_key=key)
+    return store, TranslationMemory(store)
+
+
+def test_translation_made_with_the_same_settings_is_reused(tmp_path):
+    store, memory = make_memory(tmp_path)
+    try:
+        key = request_key("Inglês", "neutro", " Suporte ao   cliente. ")
+        match = memory.lookup("Order 5678 has shipped.", "Português", key)
+        assert match.translated == "O pedido 5678 foi enviado."
+    finally:
+        memory.close()
+        store.close()
+
+
+def test_translation_made_with_other_settings_is_only_an_example(tmp_path):
+    store, memory = make_memory(tmp_path)
+    try:
+        for key in (request_key("Inglês", "formal", "Suporte ao cliente."),
+                    request_key("Espanhol", "neutro", "Suporte ao cliente."),
+                    request_key("Inglês", "neutro", "Suporte ao cliente. "
+                                "Use estes termos do glossário: \"order\" → \"encomenda\".")):
+            match = memory.lookup("Order 5678 has shipped.", "Português", key)
+            assert not match.reusable
+            assert match.entry['translated'] == "O pedido 1234 foi enviado."
+    finally:
+        memory.close()
+        store.close()
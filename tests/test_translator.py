@@ -0,0 +1,161 @@
+"""
+Tests for the translation service's retries, failover and budget routing
+"""
+import time
+
+import pytest
+import requests
+
+from services.api.budget import configure_budgets
+from services.api.circuit_breaker import CircuitOpenError
+from services.api.errors import ApiError, StreamInterruptedError
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import EngineProvider, register_engine
+from services.api.retry import configure_retry_policy, get_retry_stats
+from services.prompts import configure_prompts
+from services.translator import (
+    EngineUsage, add_downgrade_listener, configure_failover, remove_downgrade_listener,
+    route_by_budget, translate_text, translate_text_chunked)
+
+ENGINE = "Failing test engine"
+UNAVAILABLE_ENGINE = "Unavailable test engine"
+FALLBACK_ENGINE = "Fallback test engine"
+SLOW_ENGINE = "Slow test engine"
+OTHER_API_ENGINE = "Other API test engine"
+PROMPT_ENGINE = "Prompt test engine"
+
+calls = []
+slow_calls = []
+prompts = []
+
+
+def translate_stub(text, context, api_key):
+    calls.append(text)
+    raise ApiError("Invalid API key", status_code=401)
+
+
+def stream_stub(text, context, api_key, on_chunk):
+    calls.append(text)
+    on_chunk("Primeira parte ")
+    raise requests.exceptions.ChunkedEncodingError("Connection broken")
+
+
+def unavailable_stub(text, context, api_key):
+    raise CircuitOpenError("Engine unavailable")
+
+
+def fallback_stub(text, context, api_key):
+    return f"PT: {text}", 40
+
+
+def slow_stub(text, context, api_key):
+    # The first request of each pair is slow, so a hedge overtakes it
+    slow_calls.append(text)
+    if len(slow_calls) % 2 == 0:
+        time.sleep(0.3)
+    return f"PT: {text}", 40
+
+
+def prompt_stub(text, context, api_key):
+    prompts.append(context)
+    return f"PT: {text}", 10
+
+
+register_engine(EngineProvider(ENGINE, __name__, translate="translate_stub",
+                               stream="stream_stub"))
+register_engine(EngineProvider(UNAVAILABLE_ENGINE, __name__, translate="unavailable_stub"))
+register_engine(EngineProvider(FALLBACK_ENGINE, __name__, translate="fallback_stub"))
+register_engine(EngineProvider(SLOW_ENGINE, __name__, translate="slow_stub"))
+register_engine(EngineProvider(OTHER_API_ENGINE, "json", translate="dumps"))
+register_engine(EngineProvider(PROMPT_ENGINE, __name__, translate="prompt_stub"))
+configure_rate_limits({engine: {"rpm": 100000, "tpm": 10 ** 8, "concurrency": 4}
+                       for engine in (ENGINE, UNAVAILABLE_ENGINE, FALLBACK_ENGINE, SLOW_ENGINE,
+                                      PROMPT_ENGINE)})
+
+
+def test_interrupted_stream_is_not_retried():
+    calls.clear()
+    pieces = []
+    with pytest.raises(StreamInterruptedError):
+        translate_text("First part. Second part.", "Inglês", "Português", "neutro", "",
+                       ENGINE, "key", on_chunk=pieces.append)
+    assert len(calls) == 1
+    assert pieces == ["Primeira parte "]
+
+
+def test_chunks_are_not_retried_on_errors_that_are_not_transient():
+    calls.clear()
+    text = "\n\n".join(f"Paragraph number {i} of the document." for i in range(6))
+    with pytest.raises(ApiError):
+        translate_text_chunked(text, "Inglês", "Português", "neutro", "", ENGINE, "key",
+                               max_chunk_tokens=12, max_workers=1)
+    assert len(calls) == 1
+
+
+def test_usage_is_recorded_under_the_engine_that_served_the_request():
+    configure_failover([FALLBACK_ENGINE], {FALLBACK_ENGINE: "fallback key"})
+    try:
+        usage = EngineUsage()
+        translated, tokens = translate_text("Good morning.", "Inglês", "Português", "neutro", "",
+                                            UNAVAILABLE_ENGINE, "key", usage=usage)
+    finally:
+        configure_failover([])
+    assert translated == "PT: Good morning."
+    [(engine, prompt_tokens, completion_tokens)] = usage.items()
+    assert engine == FALLBACK_ENGINE
+    assert prompt_tokens + completion_tokens == tokens == 40
+
+
+def test_losing_hedged_request_is_charged():
+    configure_retry_policy(hedge=True, hedge_min_samples=1, hedge_quantile=0.0)
+    try:
+        translate_text("Warm up.", "Inglês", "Português", "neutro", "", SLOW_ENGINE, "key")
+        usage = EngineUsage()
+        translate_text("Good night.", "Inglês", "Português", "neutro", "", SLOW_ENGINE, "key",
+                       usage=usage)
+        time.sleep(0.5)
+    finally:
+        configure_retry_policy()
+    assert get_retry_stats()[SLOW_ENGINE]["hedges"] == 1
+    [(engine, prompt_tokens, completion_tokens)] = usage.items()
+    assert engine == SLOW_ENGINE
+    assert prompt_tokens + completion_tokens == 80
+
+
+def test_downgrade_uses_the_current_key_for_an_engine_of_the_same_api():
+    configure_budgets({ENGINE: {"daily_tokens": 1, "downgrade_to": FALLBACK_ENGINE}})
+    try:
+        assert route_by_budget(ENGINE, "key", "Hello.", "") == (FALLBACK_ENGINE, "key")
+    finally:
+        configure_budgets({})
+
+
+def test_downgrade_without_a_key_is_reported():
+    skipped = []
+
+    def listener(engine, downgrade):
+        skipped.append((engine, downgrade))
+
+    add_downgrade_listener(listener)
+    configure_budgets({ENGINE: {"daily_tokens": 1, "downgrade_to": OTHER_API_ENGINE}})
+    try:
+        assert route_by_budget(ENGINE, "key", "Hello.", "") == (ENGINE, "key")
+    finally:
+        configure_budgets({})
+        remove_downgrade_listener(listener)
+    assert skipped == [(ENGINE, OTHER_API_ENGINE)]
+
+
+def test_chunks_of_a_text_use_the_same_template():
+    prompts.clear()
+    text = "\n\n".join(f"Paragraph number {i} of the document." for i in range(12))
+    configure_prompts("default", "compact", 0.5)
+    try:
+        translate_text_chunked(text, "Inglês", "Português", "neutro", "", PROMPT_ENGINE, "key",
+                               max_chunk_tokens=12, max_workers=1,
+                               additions="Use estes termos do glossário: \"document\".")
+    finally:
+        configure_prompts()
+    assert len(prompts) == 12
+    assert len({prompt.template for prompt in prompts}) == 1
+    assert all(prompt.endswith("\"document\".") for prompt in prompts)
@@ -0,0 +1,32 @@
+"""
+Tests for wiring the app's services into the clipboard monitor
+"""
+from config.settings import Settings
+from services.glossary import Glossary
+from services.history_store import HistoryStore
+from services.translation_memory import TranslationMemory
+from ui.ui_app import TranslatorApp
+
+
+def make_app(tmp_path):
+    """An app with its services but no window"""
+    app = TranslatorApp.__new__(TranslatorApp)
+    app.settings = Settings()
+    app.settings.clipboard_backend = "local"
+    app.translation_cache = None
+    app.token_counter = None
+    app.history_store = HistoryStore(str(tmp_path / "translation_history.db"))
+    app.translation_memory = TranslationMemory(app.history_store)
+    app.glossary = Glossary(str(tmp_path / "glossary.tsv"))
+    return app
+
+
+def test_monitor_uses_the_translation_memory_and_glossary(tmp_path):
+    app = make_app(tmp_path)
+    try:
+        monitor = app._create_clipboard_monitor()
+        assert monitor.translation_memory is app.translation_memory
+        assert monitor.glossary is app.glossary
+    finally:
+        app.translation_memory.close()
+        app.history_store.close()
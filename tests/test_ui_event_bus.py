@@ -0,0 +1,101 @@
+"""
+Tests for the event bus between worker threads and the Tk event loop
+"""
+import threading
+
+from ui.ui_app import UiEventBus
+
+
+class FakeRoot:
+    """Stands in for tk.Tk: records scheduled callbacks instead of running a loop"""
+
+    def __init__(self):
+        self.scheduled = []
+        self.cancelled = []
+
+    def after(self, interval, callback):
+        self.scheduled.append(callback)
+        return len(self.scheduled)
+
+    def after_cancel(self, after_id):
+        self.cancelled.append(after_id)
+
+    def run_once(self):
+        self.scheduled.pop(0)()
+
+
+def make_bus():
+    root = FakeRoot()
+    bus = UiEventBus(root)
+    handled = []
+    bus.subscribe("log", lambda message: handled.append(("log", message)))
+    bus.subscribe("status", lambda text: handled.append(("status", text)), coalesce=True)
+    bus.subscribe("progress", lambda task, value: handled.append(("progress", task, value)),
+                  coalesce=True, coalesce_key=lambda task, value: task)
+    bus.start()
+    return root, bus, handled
+
+
+def test_only_the_latest_coalesced_event_is_handled():
+    root, bus, handled = make_bus()
+    bus.post("status", "Translating 1/3")
+    bus.post("log", "first")
+    bus.post("status", "Translating 2/3")
+    bus.post("log", "second")
+    bus.post("status", "Translating 3/3")
+    root.run_once()
+
+    assert handled == [("log", "first"), ("log", "second"), ("status", "Translating 3/3")]
+
+
+def test_coalesce_key_keeps_one_event_per_key():
+    root, bus, handled = make_bus()
+    bus.post("progress", "a", 1)
+    bus.post("progress", "b", 1)
+    bus.post("progress", "a", 2)
+    root.run_once()
+
+    assert handled == [("progress", "b", 1), ("progress", "a", 2)]
+
+
+def test_events_posted_while_draining_wait_for_the_next_drain():
+    root, bus, handled = make_bus()
+    bus.subscribe("chain", lambda: bus.post("log", "later"))
+    bus.post("chain")
+    root.run_once()
+    assert handled == []
+
+    root.run_once()
+    assert handled == [("log", "later")]
+
+
+def test_failing_handler_does_not_stop_the_drain():
+    root, bus, handled = make_bus()
+    bus.subscribe("broken", lambda: 1 / 0)
+    bus.post("broken")
+    bus.post("log", "after")
+    root.run_once()
+
+    assert handled == [("log", "after")]
+    assert len(root.scheduled) == 1
+
+
+def test_events_from_worker_threads_are_all_delivered():
+    root, bus, handled = make_bus()
+    threads = [threading.Thread(target=lambda i=i: [bus.post("log", (i, n)) for n in range(100)])
+               for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    root.run_once()
+
+    assert len(handled) == 400
+
+
+def test_stop_cancels_the_scheduled_drain():
+    root, bus, handled = make_bus()
+    bus.stop()
+    bus.stop()
+
+    assert root.cancelled == [1]
@@ -7,6 +7,7 @@ from tkinter import ttk, messagebox
 import threading
 
 from services.api import test_api_connection
+from services.api.registry import get_engine_names
 
 class ApiConfigComponent(ttk.LabelFrame):
     """Component for API configuration and testing"""
@@ -17,6 +18,9 @@ class ApiConfigComponent(ttk.LabelFrame):
         self.on_engine_change = on_engine_change
         self.on_test_connection = on_test_connection
         
+        # API key of each engine, kept while another one is selected
+        self.api_keys = {}
+        
         # Container for the component content
         content_frame = ttk.Frame(self)
         content_frame.pack(fill=tk.X, expand=True)
@@ -28,7 +32,7 @@ class ApiConfigComponent(ttk.LabelFrame):
         ttk.Label(engine_frame, text="AI Engine").pack(anchor=tk.W, pady=(0, 5))
         
         # AI engine selection
-        self.available_engines = ['OpenAI', 'Gemini 2.0', 'DeepSeek V3']
+        self.available_engines = get_engine_names()
         
         self.ai_engine = ttk.Combobox(
             engine_frame,
@@ -37,8 +41,17 @@ class ApiConfigComponent(ttk.LabelFrame):
             width=15
         )
         self.ai_engine.set(self.available_engines[0])
-        self.ai_engine.pack(fill=tk.X, pady=(0, 10))
+        self.ai_engine.pack(fill=tk.X, pady=(0, 5))
         self.ai_engine.bind("<<ComboboxSelected>>", self._on_engine_selected)
+        self._selected_engine = self.ai_engine.get()
+        
+        # Use the other engines with an API key when the selected one fails
+        self.failover_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            engine_frame,
+            text="Fall back to other engines",
+            variable=self.failover_var
+        ).pack(anchor=tk.W, pady=(0, 10))
         
         # Token usage display
         token_frame = ttk.LabelFrame(engine_frame, text="Token Usage", padding=5)
@@ -98,6 +111,8 @@ class ApiConfigComponent(ttk.LabelFrame):
     
     def _on_engine_selected(self, event=None):
         """Handle engine selection event"""
+        # Each engine keeps its own API key
+        self._switch_key(self.ai_engine.get())
         if self.on_engine_change:
             self.on_engine_change()
     
@@ -135,6 +150,17 @@ class ApiConfigComponent(ttk.LabelFrame):
         thread.daemon = True
         thread.start()
     
+    def _switch_key(self, engine):
+        """Keep the key of the engine being left and show the new engine's key"""
+        if engine == self._selected_engine:
+            return
+        key = self.api_entry.get().strip()
+        if key:
+            self.api_keys[self._selected_engine] = key
+        self._selected_engine = engine
+        self.api_entry.delete(0, tk.END)
+        self.api_entry.insert(0, self.api_keys.get(engine, ""))
+    
     def get_engine(self):
         """Get the current AI engine"""
         return self.ai_engine.get()
@@ -147,12 +173,45 @@ class ApiConfigComponent(ttk.LabelFrame):
         """Set the AI engine"""
         if engine in self.available_engines:
             self.ai_engine.set(engine)
+            self._selected_engine = engine
     
     def set_api_key(self, api_key):
         """Set the API key"""
         self.api_entry.delete(0, tk.END)
         self.api_entry.insert(0, api_key)
     
-    def update_token_count(self, count):
-        """Update token usage display"""
-        self.token_display.config(text=f"{count:,} tokens used this month")
+    def get_api_keys(self):
+        """Get the API key of every engine that has one"""
+        keys = dict(self.api_keys)
+        key = self.get_api_key()
+        if key:
+            keys[self.get_engine()] = key
+        return keys
+    
+    def set_api_keys(self, api_keys):
+        """Set the API keys of the engines
+        
+        Args:
+            api_keys (dict): Engine name to API key
+        """
+        self.api_keys = dict(api_keys)
+    
+    def get_failover(self):
+        """Check whether other engines are used when the selected one fails"""
+        return self.failover_var.get()
+    
+    def set_failover(self, enabled):
+        """Set whether other engines are used when the selected one fails"""
+        self.failover_var.set(enabled)
+    
+    def update_token_count(self, count, cost=None):
+        """Update token usage display
+        
+        Args:
+            count (int): Tokens used this month
+            cost (float, optional): What they cost, in USD
+        """
+        text = f"{count:,} tokens used this month"
+        if cost is not None:
+            text += f" (~${cost:.2f})"
+        self.token_display.config(text=text)
@@ -2,16 +2,17 @@
 Context editor component for translation prompts
 """
 import tkinter as tk
-from tkinter import ttk, messagebox, scrolledtext
+from tkinter import ttk, messagebox, scrolledtext, filedialog
 import os
 
 class ContextEditorComponent(ttk.LabelFrame):
     """Component for editing and managing translation context"""
     
-    def __init__(self, parent, on_apply=None):
+    def __init__(self, parent, on_apply=None, on_import_glossary=None):
         super().__init__(parent, text="Context & Grammar", padding=10)
         
         self.on_apply = on_apply
+        self.on_import_glossary = on_import_glossary
         
         # Text area for context editing
         self.context_text = scrolledtext.ScrolledText(
@@ -54,6 +55,15 @@ class ContextEditorComponent(ttk.LabelFrame):
         )
         self.clear_btn.pack(side=tk.LEFT, padx=5)
         
+        # Import glossary button (terms are sent only when they appear in the text)
+        if self.on_import_glossary:
+            self.glossary_btn = ttk.Button(
+                button_frame,
+                text="Import Glossary",
+                command=self._import_glossary
+            )
+            self.glossary_btn.pack(side=tk.LEFT, padx=5)
+        
         # Apply button
         self.apply_btn = ttk.Button(
             button_frame,
@@ -96,6 +106,22 @@ class ContextEditorComponent(ttk.LabelFrame):
         except Exception as e:
             messagebox.showerror("Error", f"Could not load template: {str(e)}")
     
+    def _import_glossary(self):
+        """Import glossary terms from a CSV or TSV file"""
+        path = filedialog.askopenfilename(
+            title="Import Glossary",
+            filetypes=[("Glossary files", "*.csv *.tsv *.txt"), ("All files", "*.*")]
+        )
+        if not path:
+            return
+        
+        try:
+            count, total = self.on_import_glossary(path)
+            messagebox.showinfo(
+                "Glossary", f"Imported {count:,} terms ({total:,} in the glossary)")
+        except Exception as e:
+            messagebox.showerror("Error", f"Could not import glossary: {str(e)}")
+    
     def _apply_context(self):
         """Apply the current context for translations"""
         if self.on_apply:
@@ -2,14 +2,97 @@
 History panel component for tracking translations
 """
 import tkinter as tk
-from tkinter import ttk, scrolledtext
-from datetime import datetime
+from tkinter import ttk, font
+from datetime import datetime, date
+
+from utils.ring_buffer import RingBuffer
+
+# Characters of an original or translation shown before it is expanded
+PREVIEW_CHARS = 160
+
+# Lines a collapsed entry takes in the view
+ENTRY_LINES = 4
+
+# Lines moved per scroll step inside an entry taller than the view
+SCROLL_LINES = 3
+
+# Milliseconds of typing pause before the history is searched
+SEARCH_DELAY = 150
+
+# Maximum number of search results shown
+SEARCH_RESULTS = 500
+
+
+def format_timestamp(created_at):
+    """Format an entry's time, with the date if it isn't today"""
+    moment = datetime.fromtimestamp(created_at)
+    if moment.date() == date.today():
+        return moment.strftime("%H:%M:%S")
+    return moment.strftime("%Y-%m-%d %H:%M")
+
+
+def preview_text(text, limit=PREVIEW_CHARS):
+    """Shorten text to one line of at most limit characters
+    
+    Returns:
+        tuple: (preview, truncated)
+    """
+    head = text[:limit + 1]
+    preview = " ".join(head.split())
+    truncated = len(text) > limit or preview != head
+    if len(text) > limit:
+        preview = preview[:limit].rstrip() + "…"
+    return preview, truncated
+
+
+def format_entry(entry, expanded=False):
+    """Format a history entry for the view
+    
+    Args:
+        entry (dict): History entry
+        expanded (bool): Show the full texts instead of one-line previews
+    
+    Returns:
+        str: The entry's text, ending with a separator line
+    """
+    # Cached translations didn't cost any tokens
+    cache_note = " (cached, 0 tokens)" if entry['cached'] else ""
+    
+    original, translated = entry['original'], entry['translated']
+    marker = ""
+    if expanded:
+        marker = "  ▾"
+    else:
+        original, original_cut = preview_text(original)
+        translated, translated_cut = preview_text(translated)
+        if original_cut or translated_cut:
+            marker = "  ▸"
+    
+    return (
+        f"[{entry['timestamp']}] {entry['source_lang']} → {entry['target_lang']}{cache_note}{marker}\n"
+        f"Original: {original}\n"
+        f"Translated: {translated}\n"
+        f"{'-' * 60}\n"
+    )
+
 
 class HistoryPanelComponent(ttk.LabelFrame):
-    """Component for displaying translation history"""
+    """Component for displaying translation history
+    
+    Entries are kept in a ring buffer of max_entries and only the rows that
+    fit in the view are rendered, so adding an entry costs the same however
+    long the history is. Long texts are shown as one-line previews; double
+    click an entry to expand or collapse it. An expanded entry taller than
+    the view is scrolled through line by line before the next entry.
+    
+    With a HistoryStore, entries are also saved to disk: the newest
+    max_entries are loaded at startup and the search box looks through the
+    whole history.
+    """
     
-    def __init__(self, parent):
+    def __init__(self, parent, max_entries=1000, store=None):
         super().__init__(parent, text="Translation History", padding=10)
+        self.store = store
         
         # Top frame with buttons
         self.button_frame = ttk.Frame(self)
@@ -31,47 +114,281 @@ class HistoryPanelComponent(ttk.LabelFrame):
         )
         self.copy_btn.pack(side=tk.RIGHT)
         
-        # History text area
-        self.history_text = scrolledtext.ScrolledText(
-            self,
+        # Search box (needs the saved history)
+        self.search_var = tk.StringVar()
+        self._search_pending = None
+        if self.store is not None:
+            self.search_entry = ttk.Entry(self.button_frame, textvariable=self.search_var)
+            self.search_entry.pack(side=tk.RIGHT, fill=tk.X, expand=True, padx=5)
+            ttk.Label(self.button_frame, text="Search:").pack(side=tk.RIGHT, padx=(10, 0))
+            self.search_var.trace_add("write", lambda *args: self._schedule_search())
+        
+        # History view: a text area showing a window of the entries, scrolled
+        # by entry through its own scrollbar
+        view_frame = ttk.Frame(self)
+        view_frame.pack(fill=tk.BOTH, expand=True)
+        
+        self.scrollbar = ttk.Scrollbar(view_frame, orient="vertical", command=self._on_scroll)
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        
+        self.text_font = font.Font(family="Helvetica", size=9)
+        self.history_text = tk.Text(
+            view_frame,
             height=6,
             wrap=tk.WORD,
-            font=("Helvetica", 9)
+            font=self.text_font,
+            state=tk.DISABLED
         )
-        self.history_text.pack(fill=tk.BOTH, expand=True)
+        self.history_text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.history_text.bind("<Configure>", lambda e: self._schedule_render())
+        self.history_text.bind("<MouseWheel>", self._on_mousewheel)
+        self.history_text.bind("<Button-4>", lambda e: self._scroll_lines(-1))
+        self.history_text.bind("<Button-5>", lambda e: self._scroll_lines(1))
+        self.history_text.tag_bind("entry", "<Double-Button-1>", self._on_entry_double_click)
         
-        # Initialize history list
-        self.history = []
+        # Streamed text of the translations in progress is shown under this tag
+        self.history_text.tag_configure("partial", foreground="#7f8c8d")
+        
+        # Initialize history buffer
+        self.history = RingBuffer(max_entries)
+        self.first = 0  # Index of the top entry in the view
+        self.offset = 0  # Display lines of the top entry scrolled past
+        self._follow = True  # Keep the newest entry in view
+        self._expanded = set()
+        self._next_id = 0
+        self._partials = {}  # Original to streamed text of translations in progress
+        self._render_pending = None
+        self._results = None  # Search results shown instead of the history
+        
+        # Load the newest page of the saved history
+        if self.store is not None:
+            for entry in reversed(self.store.get_recent(max_entries)):
+                entry['timestamp'] = format_timestamp(entry['created_at'])
+                self.history.append(entry)
+            self._schedule_render()
     
-    def add_entry(self, source_lang, target_lang, original, translated):
+    def add_entry(self, source_lang, target_lang, original, translated, cached=False,
+                  request_key=""):
         """Add a new entry to the translation history"""
-        timestamp = datetime.now().strftime("%H:%M:%S")
-        
-        # Create a formatted entry
-        entry = (
-            f"[{timestamp}] {source_lang} → {target_lang}\n"
-            f"Original: {original}\n"
-            f"Translated: {translated}\n"
-            f"{'-' * 60}\n"
-        )
+        entry = None
+        if self.store is not None:
+            entry = self.store.add(source_lang, target_lang, original, translated, cached=cached,
+                                   request_key=request_key)
+        if entry is None:
+            # Ids of unsaved entries count down so they never match a saved one
+            self._next_id -= 1
+            entry = {
+                'id': self._next_id,
+                'created_at': datetime.now().timestamp(),
+                'source_lang': source_lang,
+                'target_lang': target_lang,
+                'original': original,
+                'translated': translated,
+                'cached': cached,
+                'request_key': request_key
+            }
+        entry['timestamp'] = format_timestamp(entry['created_at'])
         
-        # Add to internal history list
-        self.history.append({
-            'timestamp': timestamp,
-            'source_lang': source_lang,
-            'target_lang': target_lang,
-            'original': original,
-            'translated': translated
-        })
+        # The finished entry replaces its in-progress preview
+        self._partials.pop(original, None)
         
-        # Display in text area
-        self.history_text.insert(tk.END, entry)
-        self.history_text.see(tk.END)  # Scroll to the end
+        evicted = self.history.append(entry)
+        if evicted is not None:
+            self._expanded.discard(evicted['id'])
+            # Keep showing the same entries when scrolled back
+            if not self._follow and self._results is None:
+                self.first = max(0, self.first - 1)
+        
+        self._schedule_render()
+    
+    def show_partial(self, original, partial):
+        """Show a translation that is still being streamed
+        
+        Args:
+            original (str): Text being translated
+            partial (str): Translated text so far, or None to remove the
+                preview of a translation that stopped
+        """
+        if partial is None:
+            self.clear_partial(original)
+            return
+        self._partials[original] = partial
+        self._schedule_render()
+    
+    def clear_partial(self, original=None):
+        """Remove the preview of one translation in progress, or of all of them"""
+        if original is None:
+            changed = bool(self._partials)
+            self._partials.clear()
+        else:
+            changed = self._partials.pop(original, None) is not None
+        if changed:
+            self._schedule_render()
+    
+    def visible_rows(self):
+        """Get the number of entries rendered in the view"""
+        return max(1, self._view_lines() // ENTRY_LINES) + 1
+    
+    def _view_lines(self):
+        """Get the number of text lines that fit in the view"""
+        height = self.history_text.winfo_height()
+        if height <= 1:
+            # Not laid out yet
+            return int(self.history_text.cget("height"))
+        return max(1, height // self.text_font.metrics("linespace"))
+    
+    def _display_lines(self, start, end):
+        """Get the display lines of the rendered text between two indexes"""
+        lines = self.history_text.count(start, end, "displaylines")
+        return lines[0] if lines else 0
+    
+    def _schedule_render(self):
+        """Render the view once the current burst of changes is done"""
+        if self._render_pending is None:
+            self._render_pending = self.after_idle(self._render)
+    
+    def _shown(self):
+        """Get the entries in the view: search results or the history"""
+        return self.history if self._results is None else self._results
+    
+    def _render(self):
+        """Show the window of entries starting at self.first"""
+        self._render_pending = None
+        shown = self._shown()
+        rows = self.visible_rows()
+        last_first = max(0, len(shown) - rows)
+        if self._follow or self.first > last_first:
+            self.first = last_first
+            self.offset = 0
+        
+        text = self.history_text
+        text.config(state=tk.NORMAL)
+        text.delete("1.0", tk.END)
+        for row, index in enumerate(range(self.first, min(self.first + rows, len(shown)))):
+            entry = shown[index]
+            text.insert(tk.END, format_entry(entry, entry['id'] in self._expanded),
+                        ("entry", f"row{row}"))
+        
+        if self._results is not None and not shown:
+            text.insert(tk.END, "No matching translations\n", "partial")
+        elif self._follow and self._results is None:
+            for original, partial in self._partials.items():
+                preview = (
+                    f"Original: {preview_text(original)[0]}\n"
+                    f"Translating: {partial}\n"
+                )
+                text.insert(tk.END, preview, "partial")
+        text.config(state=tk.DISABLED)
+        
+        if self._follow:
+            text.see(tk.END)  # Scroll to the end
+        else:
+            # Show the top entry from the line it was scrolled to
+            text.yview_moveto(0)
+            if self.offset:
+                text.yview_scroll(self.offset, "units")
+        
+        if shown:
+            self.scrollbar.set(self.first / len(shown), min(1.0, (self.first + rows) / len(shown)))
+        else:
+            self.scrollbar.set(0.0, 1.0)
+    
+    def _scroll_to(self, first):
+        """Show the entries from index first"""
+        last_first = max(0, len(self._shown()) - self.visible_rows())
+        self.first = min(max(0, first), last_first)
+        self.offset = 0
+        self._follow = self.first == last_first
+        self._schedule_render()
+    
+    def _scroll_lines(self, steps):
+        """Scroll by steps, within the top entry while it is taller than the view
+        
+        Once the last entries are rendered, it is the whole rendered text
+        that is scrolled through by lines.
+        
+        Args:
+            steps (int): Steps down (positive) or up (negative)
+        """
+        if steps > 0 and self._follow:
+            return  # Already at the end
+        if self.first >= max(0, len(self._shown()) - self.visible_rows()):
+            rendered = self._display_lines("1.0", tk.END)
+        elif self.history_text.tag_ranges("row0"):
+            rendered = self._display_lines("row0.first", "row0.last")
+        else:
+            rendered = 0
+        overflow = rendered - self._view_lines()
+        if steps > 0 and self.offset < overflow:
+            self.offset = min(overflow, self.offset + steps * SCROLL_LINES)
+        elif steps < 0 and self.offset > 0:
+            self.offset = max(0, self.offset + steps * SCROLL_LINES)
+        elif steps:
+            self._scroll_to(self.first + (1 if steps > 0 else -1))
+            return
+        self._follow = False
+        self._schedule_render()
+    
+    def _on_scroll(self, action, amount, unit=None):
+        """Handle the scrollbar"""
+        if action == "moveto":
+            self._scroll_to(int(float(amount) * len(self._shown())))
+        elif unit == "pages":
+            self._scroll_to(self.first + int(amount) * (self.visible_rows() - 1))
+        else:
+            self._scroll_lines(int(amount))
+    
+    def _on_mousewheel(self, event):
+        """Scroll the history instead of the window"""
+        self._scroll_lines(-int(event.delta / 120))
+        return "break"
+    
+    def _on_entry_double_click(self, event):
+        """Expand or collapse the entry under the pointer"""
+        for tag in self.history_text.tag_names(f"@{event.x},{event.y}"):
+            if tag.startswith("row"):
+                shown = self._shown()
+                index = self.first + int(tag[3:])
+                if index < len(shown):
+                    entry_id = shown[index]['id']
+                    self._expanded ^= {entry_id}
+                    # Keep the entry in view when it grows
+                    self._follow = False
+                    self._schedule_render()
+                return "break"
+    
+    def _schedule_search(self):
+        """Search the history once typing pauses"""
+        if self._search_pending is not None:
+            self.after_cancel(self._search_pending)
+        self._search_pending = self.after(SEARCH_DELAY, self._search)
+    
+    def _search(self):
+        """Show the saved entries matching the search box, or the history if it's empty"""
+        self._search_pending = None
+        query = self.search_var.get().strip()
+        if query:
+            results = self.store.search(query, limit=SEARCH_RESULTS)
+            for entry in results:
+                entry['timestamp'] = format_timestamp(entry['created_at'])
+            self._results = results[::-1]  # Oldest first, like the history
+        else:
+            self._results = None
+        self.first = 0
+        self._follow = True
+        self._schedule_render()
     
     def _clear_history(self):
         """Clear the translation history"""
-        self.history = []
-        self.history_text.delete(1.0, tk.END)
+        self.history.clear()
+        if self.store is not None:
+            self.store.clear()
+        self.search_var.set("")
+        self._results = None
+        self._expanded = set()
+        self.first = 0
+        self._follow = True
+        self._schedule_render()
     
     def _copy_last_translation(self):
         """Copy the most recent translation to clipboard"""
@@ -91,5 +408,5 @@ class HistoryPanelComponent(ttk.LabelFrame):
         self.after(200, lambda: self.history_text.config(background=bg))
     
     def get_history(self):
-        """Get the translation history list"""
-        return self.history
\ No newline at end of file
+        """Get the translation history list, oldest first"""
+        return list(self.history)
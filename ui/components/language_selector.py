@@ -3,7 +3,7 @@ Language selection component for translation
 """
 import tkinter as tk
 from tkinter import ttk
-from config.languages import get_languages
+from config.languages import AUTO_DETECT, get_languages, get_source_languages
 
 class LanguageSelectorComponent(ttk.LabelFrame):
     """Component for selecting source and target languages"""
@@ -13,6 +13,7 @@ class LanguageSelectorComponent(ttk.LabelFrame):
         
         self.on_swap = on_swap
         self.languages = get_languages()
+        self.source_languages = get_source_languages()
         
         # Create language selection frame
         content_frame = ttk.Frame(self)
@@ -26,7 +27,7 @@ class LanguageSelectorComponent(ttk.LabelFrame):
         
         self.source_lang = ttk.Combobox(
             source_frame,
-            values=self.languages,
+            values=self.source_languages,
             state="readonly",
             width=15
         )
@@ -73,6 +74,10 @@ class LanguageSelectorComponent(ttk.LabelFrame):
         source = self.source_lang.get()
         target = self.target_lang.get()
         
+        # Automatic detection can't be a target language
+        if source == AUTO_DETECT:
+            return
+        
         self.source_lang.set(target)
         self.target_lang.set(source)
         
@@ -90,7 +95,7 @@ class LanguageSelectorComponent(ttk.LabelFrame):
     
     def set_source_language(self, language):
         """Set the source language"""
-        if language in self.languages:
+        if language in self.source_languages:
             self.source_lang.set(language)
     
     def set_target_language(self, language):
@@ -1,6 +1,7 @@
 """
 Main application window for Clipboard Translator AI
 """
+import collections
 import tkinter as tk
 from tkinter import ttk
 
@@ -14,7 +15,102 @@ from ui.components.history_panel import HistoryPanelComponent
 from ui.components.status_bar import StatusBarComponent
 
 from services.clipboard_monitor import ClipboardMonitor
+from services.clipboard_sources import create_clipboard_source
+from services.translation_cache import TranslationCache
+from services.history_store import HistoryStore
+from services.translation_memory import TranslationMemory
+from services.glossary import Glossary
+from services.api import prewarm_connection
+from services.api.budget import configure_budgets, get_budget_tracker
+from services.api.circuit_breaker import configure_circuit_breakers
+from services.api.rate_limiter import configure_rate_limits
+from services.api.registry import get_engine_names
+from services.api.retry import configure_retry_policy
+from services.api.session import get_session_manager
+from services.prompts import configure_prompts
+from services.translator import configure_failover
 from config.settings import Settings
+from utils.token_counter import TokenCounter
+
+
+class UiEventBus:
+    """Carries events from worker threads to the Tk event loop
+
+    Tk widgets may only be touched from the main thread, so the clipboard
+    monitor's callbacks post events here instead. The main loop drains the
+    queue every interval milliseconds and calls the subscribed handlers. For
+    events subscribed with coalesce=True only the latest one posted since the
+    last drain is handled, so a burst of status updates becomes one repaint.
+    With a coalesce_key, only events with the same key replace each other.
+    """
+    
+    def __init__(self, root, interval=50):
+        """Initialize the bus
+        
+        Args:
+            root (tk.Tk): Window whose event loop handles the events
+            interval (int): Milliseconds between drains of the queue
+        """
+        self.root = root
+        self.interval = interval
+        self._handlers = {}
+        self._coalesced = {}
+        self._queue = collections.deque()
+        self._after_id = None
+    
+    def subscribe(self, event, handler, coalesce=False, coalesce_key=None):
+        """Set the handler of an event
+        
+        Args:
+            event (str): Event name
+            handler (callable): Called on the main thread with the event's arguments
+            coalesce (bool): Handle only the latest of the events posted between drains
+            coalesce_key (callable, optional): Called with the event's arguments;
+                events are coalesced separately for each key it returns
+        """
+        self._handlers[event] = handler
+        if coalesce:
+            self._coalesced[event] = coalesce_key
+    
+    def post(self, event, *args):
+        """Queue an event for the main thread (safe to call from any thread)"""
+        self._queue.append((event, args))
+    
+    def start(self):
+        """Start draining the queue on the event loop"""
+        if self._after_id is None:
+            self._after_id = self.root.after(self.interval, self._drain)
+    
+    def stop(self):
+        """Stop draining the queue"""
+        if self._after_id is not None:
+            self.root.after_cancel(self._after_id)
+            self._after_id = None
+    
+    def _drain(self):
+        """Handle the events posted since the last drain"""
+        # Events posted while draining wait for the next drain
+        events = [self._queue.popleft() for _ in range(len(self._queue))]
+        
+        # A coalesced event is handled at the position of its latest copy
+        keys = [self._coalesce_key(event, args) for event, args in events]
+        latest = {key: index for index, key in enumerate(keys) if key is not None}
+        for index, (event, args) in enumerate(events):
+            if keys[index] is not None and latest[keys[index]] != index:
+                continue
+            try:
+                self._handlers[event](*args)
+            except Exception as e:
+                print(f"Error handling UI event {event}: {str(e)}")
+        
+        self._after_id = self.root.after(self.interval, self._drain)
+    
+    def _coalesce_key(self, event, args):
+        """Get the key events replacing each other share, or None if not coalesced"""
+        if event not in self._coalesced:
+            return None
+        key = self._coalesced[event]
+        return (event, key(*args)) if key else (event,)
 
 
 class TranslatorApp:
@@ -54,19 +150,121 @@ class TranslatorApp:
         self.main_frame = ttk.Frame(self.scrollable_frame, padding="12 12 12 12")
         self.main_frame.pack(fill=tk.BOTH, expand=True)
         
+        # Saved translation history, pruned in the background
+        self.history_store = None
+        if self.settings.history_persist:
+            self.history_store = HistoryStore(
+                max_age_days=self.settings.history_retention_days,
+                max_entries=self.settings.history_retention_entries,
+                max_size_mb=self.settings.history_retention_mb
+            )
+            self.history_store.start_retention()
+        
+        # Translation memory over the saved history
+        self.translation_memory = None
+        if self.history_store is not None and self.settings.tm_enabled:
+            self.translation_memory = TranslationMemory(
+                self.history_store,
+                min_similarity=self.settings.tm_min_similarity,
+                reuse=self.settings.tm_reuse
+            )
+            self.translation_memory.start_indexing()
+        
+        # Company terminology, sent only when it appears in the text
+        self.glossary = Glossary() if self.settings.glossary_enabled else None
+        
         # Initialize UI components
         self._init_components()
         
-        # Initialize clipboard monitor
-        self.clipboard_monitor = ClipboardMonitor(
-            self._on_text_detected,
-            self._on_translation_complete,
-            self._on_error
+        # Monitor callbacks run on worker threads and reach the widgets through the bus
+        self.events = UiEventBus(root, interval=self.settings.ui_update_interval)
+        self.events.subscribe("status", self._show_status, coalesce=True)
+        self.events.subscribe("error", self._show_error, coalesce=True)
+        self.events.subscribe("partial", self.history_panel.show_partial, coalesce=True,
+                              coalesce_key=lambda original, partial: original)
+        self.events.subscribe("translation", self._show_translation)
+        self.events.subscribe("usage", self._show_token_usage, coalesce=True)
+        self.events.start()
+        
+        # Configure the shared HTTP connection pool
+        get_session_manager().configure(
+            pool_maxsize=self.settings.http_pool_size,
+            connect_timeout=self.settings.http_connect_timeout,
+            read_timeout=self.settings.http_read_timeout
+        )
+        
+        # Apply per-engine rate limits overridden in the settings
+        if self.settings.rate_limits:
+            configure_rate_limits(self.settings.rate_limits)
+        
+        # Retry transient API failures
+        configure_retry_policy(
+            max_attempts=self.settings.retry_max_attempts,
+            deadline=self.settings.retry_deadline,
+            hedge=self.settings.hedge_requests
+        )
+        
+        # Stop calling failing engines and fall back to the next ones
+        configure_circuit_breakers(
+            failure_threshold=self.settings.breaker_failure_threshold,
+            recovery_timeout=self.settings.breaker_recovery_timeout
+        )
+        
+        # Compile prompts from the chosen template, trying another on a share of requests
+        configure_prompts(
+            template=self.settings.prompt_template,
+            trial_template=self.settings.prompt_trial_template,
+            trial_share=self.settings.prompt_trial_share
         )
         
+        # Initialize translation cache
+        self.translation_cache = None
+        if self.settings.cache_enabled:
+            self.translation_cache = TranslationCache(
+                max_entries=self.settings.cache_max_entries,
+                max_age_days=self.settings.cache_max_age_days
+            )
+        
+        # Initialize the token usage ledger
+        self.token_counter = TokenCounter()
+        
+        # Enforce the token and cost budgets, starting from the usage so far
+        configure_budgets(
+            self.settings.budgets,
+            warning_ratio=self.settings.budget_warning_ratio,
+            prices=self.settings.engine_prices,
+            token_counter=self.token_counter
+        )
+        
+        # Initialize clipboard monitor
+        self.clipboard_monitor = self._create_clipboard_monitor()
+        
         # Load saved settings
         self._load_settings()
     
+    def _create_clipboard_monitor(self):
+        """Create the clipboard monitor with the app's settings and services"""
+        return ClipboardMonitor(
+            self._on_text_detected,
+            self._on_translation_complete,
+            self._on_error,
+            source=create_clipboard_source(self.settings.clipboard_backend),
+            workers=self.settings.translation_workers,
+            max_queue=self.settings.translation_queue_size,
+            stale_policy=self.settings.stale_policy,
+            cache=self.translation_cache,
+            on_partial_translation=self._on_partial_translation,
+            stream=self.settings.stream_translations,
+            chunk_max_tokens=self.settings.chunk_max_tokens,
+            chunk_concurrency=self.settings.chunk_concurrency,
+            on_status=self._on_status,
+            skip_target_language=self.settings.skip_target_language,
+            language_confidence=self.settings.language_confidence,
+            token_counter=self.token_counter,
+            translation_memory=self.translation_memory,
+            glossary=self.glossary
+        )
+    
     def _on_mousewheel(self, event):
         """Handle mousewheel scrolling"""
         self.canvas.yview_scroll(int(-1*(event.delta/120)), "units")
@@ -109,7 +307,8 @@ class TranslatorApp:
         # Context editor with reduced height
         self.context_editor = ContextEditorComponent(
             self.main_frame,
-            on_apply=self._on_context_apply
+            on_apply=self._on_context_apply,
+            on_import_glossary=self._on_import_glossary if self.glossary is not None else None
         )
         self.context_editor.pack(fill=tk.BOTH, expand=False, pady=5)
         
@@ -117,7 +316,11 @@ class TranslatorApp:
         self._create_control_buttons()
         
         # Translation history with fixed height
-        self.history_panel = HistoryPanelComponent(self.main_frame)
+        self.history_panel = HistoryPanelComponent(
+            self.main_frame,
+            max_entries=self.settings.history_max_entries,
+            store=self.history_store
+        )
         self.history_panel.pack(fill=tk.BOTH, expand=True, pady=5)
         
         # Status bar
@@ -174,15 +377,17 @@ class TranslatorApp:
         # Load API settings
         if self.settings.api_engine:
             self.api_config.set_engine(self.settings.api_engine)
+        self.api_config.set_api_keys(self.settings.api_keys)
         if self.settings.api_key:
             self.api_config.set_api_key(self.settings.api_key)
+        self.api_config.set_failover(bool(self.settings.failover_chain))
             
         # Load tone setting
         if self.settings.tone:
             self.tone_selector.set_tone(self.settings.tone)
             
         # Update token usage display
-        self.api_config.update_token_count(self.settings.token_count)
+        self._show_token_usage()
     
     def _save_settings(self):
         """Save current settings to config file"""
@@ -190,6 +395,12 @@ class TranslatorApp:
         self.settings.target_lang = self.lang_selector.get_target_language()
         self.settings.api_engine = self.api_config.get_engine()
         self.settings.api_key = self.api_config.get_api_key()
+        self.settings.api_keys = self.api_config.get_api_keys()
+        if not self.api_config.get_failover():
+            self.settings.failover_chain = []
+        elif not self.settings.failover_chain:
+            # The other engines, in the order they are listed
+            self.settings.failover_chain = get_engine_names()
         self.settings.tone = self.tone_selector.get_tone()
         self.settings.save()
     
@@ -215,6 +426,13 @@ class TranslatorApp:
         context = self.context_editor.get_context()
         engine = self.api_config.get_engine()
         
+        # Engines to try when the selected one is unavailable
+        configure_failover(self.settings.failover_chain, self.settings.api_keys)
+        
+        # Open the API connection now so the first translation skips the handshake
+        if self.settings.prewarm_connections:
+            prewarm_connection(engine)
+        
         self.clipboard_monitor.start(
             api_key=api_key,
             source_lang=source_lang,
@@ -240,6 +458,11 @@ class TranslatorApp:
         """Restart the application"""
         self.stop_monitoring()
         self._save_settings()
+        self.token_counter.close()
+        if self.translation_memory is not None:
+            self.translation_memory.close()
+        if self.history_store is not None:
+            self.history_store.close()
         
         # Use Python's exec to restart the application
         import sys
@@ -250,7 +473,13 @@ class TranslatorApp:
     def on_close(self):
         """Handle window close event"""
         self.stop_monitoring()
+        self.events.stop()
         self._save_settings()
+        self.token_counter.close()
+        if self.translation_memory is not None:
+            self.translation_memory.close()
+        if self.history_store is not None:
+            self.history_store.close()
         self.root.destroy()
     
     # Event handlers
@@ -273,24 +502,64 @@ class TranslatorApp:
         """Handle context application event"""
         self.status_bar.set_status("Context applied for translations")
     
+    def _on_import_glossary(self, path):
+        """Handle a glossary file chosen for import
+        
+        Returns:
+            tuple: (terms imported, terms in the glossary)
+        """
+        count = self.glossary.import_file(path)
+        self.status_bar.set_status(f"Glossary: {len(self.glossary):,} terms")
+        return count, len(self.glossary)
+    
+    # Clipboard monitor callbacks (called from worker threads)
     def _on_text_detected(self, text):
         """Handle detected clipboard text"""
-        self.status_bar.set_status("Translating...")
+        self.events.post("status", "Translating...")
         
-    def _on_translation_complete(self, original, translated, token_count):
+    def _on_partial_translation(self, original, partial):
+        """Handle streamed text of a translation in progress (None when it stops)"""
+        self.events.post("partial", original, partial)
+    
+    def _on_translation_complete(self, original, translated, token_count, cached=False,
+                                 source_lang=None, request_key=""):
         """Handle completed translation"""
-        # Update token count
-        self.settings.token_count += token_count
-        self.api_config.update_token_count(self.settings.token_count)
+        self.events.post("translation", original, translated, cached, source_lang, request_key)
         
-        # Add to history
-        source = self.lang_selector.get_source_language()
-        target = self.lang_selector.get_target_language()
-        self.history_panel.add_entry(source, target, original, translated)
+        # Update token count (the monitor has recorded the usage)
+        self.events.post("usage")
         
         # Update status
-        self.status_bar.set_status("Translation complete")
+        if cached:
+            self.events.post("status", "Translation complete (from cache, 0 tokens)")
+        else:
+            self.events.post("status", "Translation complete")
+    
+    def _on_status(self, message):
+        """Handle status messages from the clipboard monitor"""
+        self.events.post("status", message)
     
     def _on_error(self, error_message):
         """Handle translation error"""
+        self.events.post("error", error_message)
+    
+    # Event bus handlers (called on the main thread)
+    def _show_status(self, message):
+        """Show a status message"""
+        self.status_bar.set_status(message)
+    
+    def _show_error(self, error_message):
+        """Show a translation error"""
         self.status_bar.show_error(error_message)
+    
+    def _show_translation(self, original, translated, cached, source_lang, request_key):
+        """Add a completed translation to the history"""
+        source = source_lang or self.lang_selector.get_source_language()
+        target = self.lang_selector.get_target_language()
+        self.history_panel.add_entry(source, target, original, translated, cached=cached,
+                                     request_key=request_key)
+    
+    def _show_token_usage(self):
+        """Show the token usage and cost of the current month"""
+        self.api_config.update_token_count(
+            self.token_counter.get_current_month_usage(), get_budget_tracker().get_month_cost())
@@ -0,0 +1,104 @@
+"""
+Aho-Corasick automaton for finding many patterns in one pass
+"""
+from collections import deque
+
+
+class AhoCorasick:
+    """Finds every occurrence of a set of patterns in a sequence
+
+    Patterns are sequences of hashable symbols: characters of a string, or
+    words of a tokenized text. Once built, a search reads each symbol of the
+    input once, however many patterns there are, plus one step per match.
+    """
+
+    def __init__(self):
+        self._goto = [{}]
+        self._fail = [0]
+        self._value = [None]
+        self._depth = [0]
+        self._output = [0]  # Nearest node on the failure chain with a value
+        self._built = True
+
+    def __len__(self):
+        return sum(1 for value in self._value if value is not None)
+
+    def add(self, pattern, value):
+        """Add a pattern, replacing the value of an equal pattern
+
+        Args:
+            pattern (sequence): Symbols of the pattern (not empty)
+            value: Returned with each match of the pattern
+        """
+        if not pattern:
+            raise ValueError("AhoCorasick patterns can't be empty")
+        node = 0
+        for symbol in pattern:
+            child = self._goto[node].get(symbol)
+            if child is None:
+                child = len(self._goto)
+                self._goto[node][symbol] = child
+                self._goto.append({})
+                self._fail.append(0)
+                self._value.append(None)
+                self._depth.append(self._depth[node] + 1)
+                self._output.append(0)
+            node = child
+        self._value[node] = value
+        self._built = False
+
+    def build(self):
+        """Compute the failure links (done by the first search if needed)"""
+        queue = deque(self._goto[0].values())
+        for child in queue:
+            self._fail[child] = 0
+        while queue:
+            node = queue.popleft()
+            fail = self._fail[node]
+            self._output[node] = fail if self._value[fail] is not None else self._output[fail]
+            for symbol, child in self._goto[node].items():
+                # The longest proper suffix of the child's path that is a prefix
+                state = fail
+                while symbol not in self._goto[state] and state:
+                    state = self._fail[state]
+                target = self._goto[state].get(symbol, 0)
+                self._fail[child] = target if target != child else 0
+                queue.append(child)
+        self._built = True
+
+    def find_all(self, sequence):
+        """Find every pattern occurrence, including overlapping ones
+
+        Yields:
+            tuple: (start, end, value) with sequence[start:end] equal to the
+                pattern
+        """
+        if not self._built:
+            self.build()
+        goto, fail, values, depth, output = (
+            self._goto, self._fail, self._value, self._depth, self._output)
+        node = 0
+        for end, symbol in enumerate(sequence, 1):
+            while symbol not in goto[node] and node:
+                node = fail[node]
+            node = goto[node].get(symbol, 0)
+
+            match = node if values[node] is not None else output[node]
+            while match:
+                yield end - depth[match], end, values[match]
+                match = output[match]
+
+    def find_longest(self, sequence):
+        """Find non-overlapping occurrences, preferring the leftmost and longest
+
+        Returns:
+            list: (start, end, value) tuples in order
+        """
+        matches = sorted(self.find_all(sequence), key=lambda match: (match[0], -match[1]))
+        selected = []
+        position = 0
+        for start, end, value in matches:
+            if start >= position:
+                selected.append((start, end, value))
+                position = end
+        return selected
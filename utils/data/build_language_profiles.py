@@ -0,0 +1,49 @@
+"""
+Build data/language_profiles.bin from the sample texts in data/corpus
+
+Each corpus/<code>.txt file holds text in one Latin-script language. The
+most frequent n-grams of every language form a shared vocabulary, and each
+language stores a smoothed log-probability for every n-gram in it.
+
+Run from the project root:
+    python -m utils.data.build_language_profiles
+"""
+import math
+import os
+
+from utils.language_id import PROFILE_FILE, extract_ngrams, normalize, write_profiles
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+
+# Most frequent n-grams taken from each language into the vocabulary
+TOP_NGRAMS = 400
+
+
+def main():
+    counts = {}
+    for name in sorted(os.listdir(CORPUS_DIR)):
+        if name.endswith(".txt"):
+            with open(os.path.join(CORPUS_DIR, name), "r", encoding="utf-8") as f:
+                counts[name[:-4]] = extract_ngrams(normalize(f.read()))
+
+    vocabulary = set()
+    for language_counts in counts.values():
+        vocabulary.update(ngram for ngram, _ in language_counts.most_common(TOP_NGRAMS))
+    ngrams = sorted(vocabulary)
+
+    languages = list(counts)
+    log_probs = []
+    unseen = []
+    for language in languages:
+        language_counts = counts[language]
+        total = sum(language_counts.values()) + len(ngrams)
+        log_probs.append([math.log((language_counts[ngram] + 1) / total) for ngram in ngrams])
+        unseen.append(math.log(1 / total))
+
+    write_profiles(PROFILE_FILE, languages, ngrams, log_probs, unseen)
+    print(f"{len(languages)} languages, {len(ngrams)} n-grams, "
+          f"{os.path.getsize(PROFILE_FILE)} bytes written to {PROFILE_FILE}")
+
+
+if __name__ == "__main__":
+    main()
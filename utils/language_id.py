@@ -0,0 +1,214 @@
+"""
+Language identification for clipboard text
+
+Languages with their own script (Russian, Greek, Arabic, Hindi, Korean,
+Japanese and Chinese) are recognized by the Unicode ranges of their
+letters. Latin-script languages are told apart with character n-gram
+profiles loaded lazily from data/language_profiles.bin, which is built by
+data/build_language_profiles.py from the sample texts in data/corpus.
+"""
+import math
+import os
+import re
+import struct
+import sys
+import threading
+import zlib
+from array import array
+from collections import Counter
+
+from config.languages import get_language_name
+
+PROFILE_FILE = os.path.join(os.path.dirname(__file__), "data", "language_profiles.bin")
+PROFILE_MAGIC = b"LNGP"
+PROFILE_VERSION = 1
+
+NGRAM_SIZES = (1, 2, 3)
+
+# Only this many characters are inspected
+MAX_CHARS = 2000
+
+# Evidence weight per n-gram and the most n-grams counted, so short texts
+# get modest confidence and long ones don't claim certainty
+EVIDENCE_WEIGHT = 0.5
+MAX_EVIDENCE = 200
+
+# Letters of a script other than Latin, as (first, last) code point ranges
+SCRIPT_RANGES = {
+    "ru": [(0x0400, 0x04FF)],
+    "el": [(0x0370, 0x03FF), (0x1F00, 0x1FFF)],
+    "ar": [(0x0600, 0x06FF), (0x0750, 0x077F), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+    "hi": [(0x0900, 0x097F)],
+    "ko": [(0xAC00, 0xD7AF), (0x1100, 0x11FF), (0x3130, 0x318F)],
+    "kana": [(0x3040, 0x30FF), (0x31F0, 0x31FF), (0xFF66, 0xFF9F)],
+    "han": [(0x4E00, 0x9FFF), (0x3400, 0x4DBF), (0xF900, 0xFAFF)],
+}
+
+NON_LETTERS_PATTERN = re.compile(r"[\W\d_]+")
+
+_profiles = None
+_profiles_lock = threading.Lock()
+
+
+def normalize(text):
+    """Lowercase text and reduce everything but letters to single spaces"""
+    return NON_LETTERS_PATTERN.sub(" ", text.lower()).strip()
+
+
+def extract_ngrams(text):
+    """Count the character n-grams of normalized text
+
+    Each word is padded with spaces so n-grams at word edges are distinct.
+
+    Args:
+        text (str): Normalized text
+
+    Returns:
+        Counter: n-gram to number of occurrences
+    """
+    counts = Counter()
+    for word in text.split():
+        padded = f" {word} "
+        for size in NGRAM_SIZES:
+            for i in range(len(padded) - size + 1):
+                counts[padded[i:i + size]] += 1
+    return counts
+
+
+def write_profiles(path, languages, ngrams, log_probs, unseen):
+    """Write n-gram profiles in the format read by load_profiles
+
+    Args:
+        path (str): Output file
+        languages (list): Language codes
+        ngrams (list): Shared n-gram vocabulary
+        log_probs (list): One list per language of log-probabilities, in
+            vocabulary order
+        unseen (list): Log-probability per language of an unknown n-gram
+    """
+    values = array("f")
+    for row in log_probs:
+        values.extend(row)
+    values.extend(unseen)
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    header = "\n".join(["\t".join(languages)] + ngrams).encode("utf-8")
+    payload = struct.pack("<I", len(header)) + header + values.tobytes()
+    with open(path, "wb") as f:
+        f.write(PROFILE_MAGIC + struct.pack("<H", PROFILE_VERSION) + zlib.compress(payload, 9))
+
+
+def load_profiles(path=PROFILE_FILE):
+    """Read n-gram profiles written by write_profiles
+
+    Returns:
+        dict: Language code to (n-gram to log-probability dict, unseen log-probability)
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] != PROFILE_MAGIC or struct.unpack("<H", data[4:6])[0] != PROFILE_VERSION:
+        raise ValueError(f"Unsupported language profile file: {path}")
+
+    payload = zlib.decompress(data[6:])
+    header_size = struct.unpack("<I", payload[:4])[0]
+    lines = payload[4:4 + header_size].decode("utf-8").split("\n")
+    languages, ngrams = lines[0].split("\t"), lines[1:]
+
+    values = array("f")
+    values.frombytes(payload[4 + header_size:])
+    if sys.byteorder == "big":
+        values.byteswap()
+
+    profiles = {}
+    for index, language in enumerate(languages):
+        row = values[index * len(ngrams):(index + 1) * len(ngrams)]
+        unseen = values[len(languages) * len(ngrams) + index]
+        profiles[language] = (dict(zip(ngrams, row)), unseen)
+    return profiles
+
+
+def _get_profiles():
+    """Load the profiles on first use"""
+    global _profiles
+    with _profiles_lock:
+        if _profiles is None:
+            try:
+                _profiles = load_profiles()
+            except Exception as e:
+                print(f"Error loading language profiles: {str(e)}")
+                _profiles = {}
+        return _profiles
+
+
+def _script_language(text):
+    """Identify languages written in their own script
+
+    Returns:
+        tuple: (language code, share of letters in that script), or None if
+            most letters are Latin
+    """
+    counts = Counter()
+    letters = 0
+    for char in text:
+        if not char.isalpha():
+            continue
+        letters += 1
+        code_point = ord(char)
+        if code_point < 0x0370:
+            continue
+        for script, ranges in SCRIPT_RANGES.items():
+            if any(first <= code_point <= last for first, last in ranges):
+                counts[script] += 1
+                break
+
+    if not letters or sum(counts.values()) / letters < 0.5:
+        return None
+
+    # Japanese mixes kana with Chinese characters; Chinese has no kana
+    if counts["kana"]:
+        counts["ja"] = counts.pop("kana") + counts.pop("han", 0)
+    elif counts["han"]:
+        counts["zh"] = counts.pop("han")
+
+    script, count = counts.most_common(1)[0]
+    return script, count / letters
+
+
+def identify_language(text):
+    """Identify the language of text
+
+    Args:
+        text (str): Text to analyze
+
+    Returns:
+        list: (language name, confidence from 0 to 1) pairs, most likely
+            first; empty if the text has no letters
+    """
+    text = text[:MAX_CHARS]
+
+    script = _script_language(text)
+    if script:
+        code, share = script
+        return [(get_language_name(code), share)]
+
+    counts = extract_ngrams(normalize(text))
+    profiles = _get_profiles()
+    if not counts or not profiles:
+        return []
+
+    total = sum(counts.values())
+    scores = {}
+    for code, (log_probs, unseen) in profiles.items():
+        score = sum(log_probs.get(ngram, unseen) * count for ngram, count in counts.items())
+        scores[code] = score / total
+
+    # Posterior of the average log-probability per n-gram, weighted by the
+    # amount of evidence: longer texts are more certain, up to a limit
+    weight = min(total, MAX_EVIDENCE) * EVIDENCE_WEIGHT
+    best = max(scores.values())
+    exp_scores = {code: math.exp((score - best) * weight) for code, score in scores.items()}
+    norm = sum(exp_scores.values())
+
+    ranked = sorted(exp_scores.items(), key=lambda item: item[1], reverse=True)
+    return [(get_language_name(code), value / norm) for code, value in ranked]
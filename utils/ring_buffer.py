@@ -0,0 +1,60 @@
+"""
+Fixed-capacity buffer that drops its oldest items when full
+"""
+
+
+class RingBuffer:
+    """Sequence of at most capacity items, oldest first
+
+    Items live in a list used as a circular array, so appending and reading
+    any position take constant time however many items have been added.
+    (A deque with maxlen appends as fast but reads the middle in linear time,
+    which is what a scrolled view does.)
+    """
+
+    def __init__(self, capacity):
+        """Initialize the buffer
+
+        Args:
+            capacity (int): Maximum number of items kept
+        """
+        if capacity < 1:
+            raise ValueError("RingBuffer capacity must be at least 1")
+        self.capacity = capacity
+        self._items = []
+        self._start = 0
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, index):
+        size = len(self._items)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            raise IndexError("RingBuffer index out of range")
+        return self._items[(self._start + index) % size]
+
+    def __iter__(self):
+        yield from self._items[self._start:]
+        yield from self._items[:self._start]
+
+    def append(self, item):
+        """Add an item after the newest one
+
+        Returns:
+            The oldest item if it was dropped to make room, otherwise None
+        """
+        if len(self._items) < self.capacity:
+            self._items.append(item)
+            return None
+
+        evicted = self._items[self._start]
+        self._items[self._start] = item
+        self._start = (self._start + 1) % self.capacity
+        return evicted
+
+    def clear(self):
+        """Remove all items"""
+        self._items = []
+        self._start = 0
@@ -2,51 +2,451 @@
 """
 Text analysis utilities for clipboard content
 """
+import re
 
+from utils.language_id import identify_language
 
-def is_code(text):
-    """Detect if text appears to be code to avoid translating code
+
+# Characters common in code; a high concentration suggests code
+CODE_SYMBOLS = "{}[]()<>;=+-*/\\|&^%$#@!"
+CODE_SYMBOL_PATTERN = re.compile(f"[{re.escape(CODE_SYMBOLS)}]")
+
+# Only this many leading characters of huge payloads are inspected to tell
+# whether they are code
+CODE_SCAN_LIMIT = 256 * 1024
+
+# Content kinds reported by classify_content
+PROSE = "prose"
+CODE = "code"
+MIXED = "mixed"
+
+# Lines scoring at least this much are code
+CODE_LINE_THRESHOLD = 0.5
+
+# Unfenced text with at least this share of code is treated as code as a whole
+CODE_TEXT_RATIO = 0.7
+
+# Markdown fenced code blocks (an unclosed fence runs to the end of the text)
+FENCE_PATTERN = re.compile(
+    r"^[ \t]*(`{3,}|~{3,})[^\n]*(?:\n|\Z)(?:.*?^[ \t]*\1[ \t]*(?:\n|\Z)|.*\Z)",
+    re.MULTILINE | re.DOTALL)
+
+# Line features: (pattern, weight, reason); negative weights are evidence of prose
+LINE_FEATURES = [
+    (re.compile(r"\s*(?:def|class|import|from\s+[\w.]+\s+import|return|const|let|var|function|"
+                r"fn|func|public|private|protected|static|package|using|namespace|elif|else|"
+                r"try|except|catch|finally|switch|case|sudo|pip|npm|git|cd|ls|echo|export|"
+                r"#include|#define|#!)\b"),
+     0.6, "starts with a keyword"),
+    (re.compile(r"\s*(?:if|for|while)\s*\("), 0.6, "starts with a control statement"),
+    (re.compile(r"\s*(?://|/\*|\*/|<!--|>>>|\$ )"), 0.6, "comment or prompt marker"),
+    (re.compile(r"\s*(?:\"{3}|'{3})"), 0.6, "docstring delimiter"),
+    (re.compile(r"\s*(?:Traceback \(most recent call last\)|File \"[^\"]+\", line \d+|"
+                r"at [\w.$]+\(|[\w.]+(?:Error|Exception):)"),
+     0.9, "stack trace"),
+    (re.compile(r"\s*</?[A-Za-z][\w-]*(?:\s[^<>]*)?/?>"), 0.5, "markup tag"),
+    (re.compile(r"\s*[\w.\[\]'\"]+\s*(?:[-+*/%|&^]|<<|>>|\*\*|//)?=(?!=)\s*\S"), 0.5, "assignment"),
+    (re.compile(r"\s*[\w.]+\([^()]*\)\s*;?\s*$"), 0.4, "function call"),
+    (re.compile(r".*(?:[;{}\[]|\)\s*:|=>|->|\\)\s*$"), 0.4, "ends like a statement"),
+]
+SYMBOL_DENSITY_THRESHOLD = 0.15
+SYMBOL_DENSITY_WEIGHT = 0.3
+INDENT_WEIGHT = 0.1
+SENTENCE_WEIGHT = -0.4
+
+# Line boundaries as str.splitlines() sees them
+LINE_START = r"(?:^|(?<=[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]))"
+LINE_END = r"(?=[\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029]|\Z)"
+
+# Symbol density and indentation alone never make a line code, so text in
+# which no line has a line feature (or opens a fence) is all prose. This
+# finds the first such line in one pass; its matches may also span lines,
+# which only costs a full classification.
+CODE_FEATURE_PATTERN = re.compile(LINE_START + "(?:" + "|".join(
+    [r"[ \t]*(?:`{3}|~{3})"] +
+    [pattern.pattern[:-1] + LINE_END if pattern.pattern.endswith("$") else pattern.pattern
+     for pattern, _, _ in LINE_FEATURES]) + ")")
+
+# Inline spans kept untranslated inside prose
+INLINE_CODE_PATTERN = re.compile(
+    r"`[^`\n]+`"                                              # `inline code`
+    r"|\b(?:https?://|www\.)[^\s<>\"'`]*[^\s<>\"'`.,;:!?)]"   # URLs
+    r"|\b[\w.+-]+@[\w-]+(?:\.[\w-]+)+\b"                      # email addresses
+    r"|(?<![\w/.])(?:[A-Za-z]:\\|~?/)[\w.-]+(?:[\\/][\w.-]+)*"  # file paths
+    r"|\b[A-Za-z_]\w+(?:\.[A-Za-z_]\w+)+(?:\(\))?"            # dotted names, file.ext
+    r"|\b\w+\(\)"                                             # call()
+    r"|\b[A-Za-z]\w*_\w+\b"                                   # snake_case
+    r"|\b[a-z]+(?:[A-Z][a-z0-9]*)+\b"                         # camelCase
+)
+
+# Marker that replaces inline code while prose is translated
+PLACEHOLDER = "⟦{}⟧"
+PLACEHOLDER_PATTERN = re.compile(r"⟦(\d+)⟧")
+
+
+class TextRegion:
+    """A span of text classified as prose or code"""
+    
+    def __init__(self, text, start, kind, score, reasons, first_line, last_line):
+        """Initialize the region
+        
+        Args:
+            text (str): Text of the region
+            start (int): Offset of the region in the analyzed text
+            kind (str): PROSE or CODE
+            score (float): Code score from 0 (prose) to 1 (code)
+            reasons (list): Features that contributed to the score
+            first_line (int): First line of the region (1-based)
+            last_line (int): Last line of the region (1-based)
+        """
+        self.text = text
+        self.start = start
+        self.kind = kind
+        self.score = score
+        self.reasons = reasons
+        self.first_line = first_line
+        self.last_line = last_line
+    
+    @property
+    def end(self):
+        """Offset just past the region"""
+        return self.start + len(self.text)
+
+
+class ContentAnalysis:
+    """Result of classify_content: regions covering the whole text in order"""
+    
+    def __init__(self, text, regions):
+        self.text = text
+        self.regions = regions
+    
+    @property
+    def code_ratio(self):
+        """Share of non-whitespace characters inside code regions"""
+        total = 0
+        code = 0
+        for region in self.regions:
+            size = len(region.text) - region.text.count(" ") - region.text.count("\n")
+            total += size
+            if region.kind == CODE:
+                code += size
+        return code / total if total else 0.0
+    
+    @property
+    def kind(self):
+        """PROSE, CODE or MIXED for the text as a whole"""
+        has_code = any(region.kind == CODE for region in self.regions)
+        has_prose = any(region.kind == PROSE and _has_letters(region.text)
+                        for region in self.regions)
+        if not has_code:
+            return PROSE
+        if not has_prose:
+            return CODE
+        fenced = any("fenced code block" in region.reasons for region in self.regions)
+        if not fenced and self.code_ratio >= CODE_TEXT_RATIO:
+            # Code with a few comments or docstrings
+            return CODE
+        return MIXED
+    
+    def explain(self):
+        """Describe how each region was classified
+        
+        Returns:
+            list: One line per region, e.g. "lines 3-5: code (0.90): assignment"
+        """
+        lines = []
+        for region in self.regions:
+            span = (f"line {region.first_line}" if region.first_line == region.last_line
+                    else f"lines {region.first_line}-{region.last_line}")
+            reasons = ", ".join(region.reasons) or "no code features"
+            lines.append(f"{span}: {region.kind} ({region.score:.2f}): {reasons}")
+        return lines
+
+
+def _has_letters(text):
+    return any(char.isalpha() for char in text)
+
+
+def score_line(line):
+    """Score how much a single line looks like code
+    
+    Args:
+        line (str): Line without its line break
+        
+    Returns:
+        tuple: (score from 0 to 1, list of reasons)
+    """
+    stripped = line.strip()
+    if not stripped:
+        return 0.0, []
+    
+    score = 0.0
+    reasons = []
+    for pattern, weight, reason in LINE_FEATURES:
+        if pattern.match(line):
+            score += weight
+            reasons.append(reason)
+    
+    symbols = len(CODE_SYMBOL_PATTERN.findall(stripped))
+    if symbols / len(stripped) > SYMBOL_DENSITY_THRESHOLD:
+        score += SYMBOL_DENSITY_WEIGHT
+        reasons.append(f"symbol density {symbols / len(stripped):.0%}")
+    
+    if line.startswith(("    ", "\t")):
+        score += INDENT_WEIGHT
+        reasons.append("indented")
+    
+    # Several words made almost only of letters read like a sentence
+    words = stripped.split()
+    if len(words) >= 4:
+        letters = sum(1 for char in stripped if char.isalpha() or char.isspace())
+        if letters / len(stripped) >= 0.8:
+            score += SENTENCE_WEIGHT
+            reasons.append("sentence-like")
+    
+    return min(1.0, max(0.0, score)), reasons
+
+
+def may_contain_code(text):
+    """Check whether any line of text could be classified as code
+    
+    A single compiled pattern looks for the line features of score_line and
+    for fences, stopping at the first one found.
     
     Args:
         text (str): Text to analyze
         
     Returns:
-        bool: True if text appears to be code, False otherwise
+        bool: False if classify_content would find only prose in text
     """
-    # Indicators of code content
-    code_indicators = [
-        "function", "def ", "class ", "import ", "<script", "<html",
-        "{ }", "[]", "{}", "()", "headers", "payload", "const ", "var ",
-        "let ", "=>", "->", "#include", "namespace", "public:", "private:",
-        "@Override", "package ", "using ", "pragma", "typedef", "sudo ",
-        "return ", "val ", "fun ", "interface ", "impl", "trait", "module"
-    ]
-    
-    # Check for code indicators
-    text_lower = text.lower()
-    for indicator in code_indicators:
-        if indicator in text_lower:
-            return True
-    
-    # Check for high concentration of special characters
-    symbols = sum(text.count(s) for s in ["{", "}", "[", "]", "(", ")", 
-                                         "<", ">", ";", "=", "+", "-", 
-                                         "*", "/", "\\", "|", "&", "^", 
-                                         "%", "$", "#", "@", "!"])
-    
-    total_chars = len(text)
-    if total_chars > 0 and (symbols / total_chars) > 0.08:  # 8% threshold
-        return True
+    return CODE_FEATURE_PATTERN.search(text) is not None
+
+
+def _classify_lines(text, offset, first_line, regions):
+    """Split unfenced text into prose and code regions line by line"""
+    lines = text.splitlines(keepends=True)
+    scored = [score_line(line.rstrip("\r\n")) for line in lines]
+    kinds = [None if not line.strip() else (CODE if score >= CODE_LINE_THRESHOLD else PROSE)
+             for line, (score, _) in zip(lines, scored)]
+    
+    # Indented prose right under code (docstrings, comments) is part of it
+    previous = None
+    for i, line in enumerate(lines):
+        if kinds[i] is None:
+            continue
+        if kinds[i] == PROSE and previous == CODE and line.startswith(("    ", "\t")):
+            kinds[i] = CODE
+            scored[i] = (scored[i][0], scored[i][1] + ["indented under code"])
+        previous = kinds[i]
+    
+    # Smooth isolated lines: a line between two adjacent lines of the other
+    # kind (e.g. a comment inside a function) joins them
+    for i in range(1, len(kinds) - 1):
+        previous, current, following = kinds[i - 1], kinds[i], kinds[i + 1]
+        if current and previous == following and previous not in (None, current):
+            if current == PROSE:
+                kinds[i] = CODE
+                scored[i] = (scored[i][0], scored[i][1] + ["inside code block"])
+            elif scored[i][0] < 0.8:
+                kinds[i] = PROSE
+                scored[i] = (scored[i][0], scored[i][1] + ["inside prose paragraph"])
+    
+    # Blank lines belong to the region before them
+    last_kind = next((kind for kind in kinds if kind), PROSE)
+    for i, kind in enumerate(kinds):
+        if kind is None:
+            kinds[i] = last_kind
+        else:
+            last_kind = kind
     
-    # Check for indentation patterns common in code
-    lines = text.split("\n")
-    indented_lines = sum(1 for line in lines if line.startswith(("    ", "\t")))
-    if len(lines) > 3 and indented_lines / len(lines) > 0.3:  # 30% of lines indented
+    start = 0
+    while start < len(lines):
+        end = start
+        while end + 1 < len(lines) and kinds[end + 1] == kinds[start]:
+            end += 1
+        
+        block_scores = [scored[i][0] for i in range(start, end + 1) if lines[i].strip()]
+        reasons = []
+        for i in range(start, end + 1):
+            for reason in scored[i][1]:
+                if reason not in reasons and not reason.startswith("symbol density"):
+                    reasons.append(reason)
+            if any(reason.startswith("symbol density") for reason in scored[i][1]) \
+                    and "symbol density" not in reasons:
+                reasons.append("symbol density")
+        
+        region_text = "".join(lines[start:end + 1])
+        regions.append(TextRegion(
+            region_text, offset, kinds[start],
+            sum(block_scores) / len(block_scores) if block_scores else 0.0,
+            reasons, first_line + start, first_line + end))
+        offset += len(region_text)
+        start = end + 1
+
+
+def classify_content(text):
+    """Classify text into prose and code regions
+    
+    Markdown fenced blocks are code; other lines are scored with score_line,
+    smoothed with their neighbours and merged into regions. The regions
+    cover the whole text, so joining their texts gives the input back.
+    Text without any code feature is returned as a single prose region
+    without scoring its lines.
+    
+    Args:
+        text (str): Text to analyze
+        
+    Returns:
+        ContentAnalysis: The regions and the overall kind
+    """
+    if not may_contain_code(text):
+        if not text:
+            return ContentAnalysis(text, [])
+        return ContentAnalysis(text, [TextRegion(
+            text, 0, PROSE, 0.0, [], 1, max(1, len(text.splitlines())))])
+    
+    regions = []
+    position = 0
+    line = 1
+    for match in FENCE_PATTERN.finditer(text):
+        if match.start() > position:
+            before = text[position:match.start()]
+            _classify_lines(before, position, line, regions)
+            line += before.count("\n")
+        
+        fenced = match.group(0)
+        last_line = line + fenced.count("\n") - (1 if fenced.endswith("\n") else 0)
+        regions.append(TextRegion(fenced, match.start(), CODE, 1.0,
+                                  ["fenced code block"], line, last_line))
+        line += fenced.count("\n")
+        position = match.end()
+    
+    if position < len(text):
+        _classify_lines(text[position:], position, line, regions)
+    
+    return ContentAnalysis(text, regions)
+
+
+def mask_inline_code(text):
+    """Replace URLs, paths, identifiers and `inline code` with placeholders
+    
+    Args:
+        text (str): Prose to translate
+        
+    Returns:
+        tuple: (masked text, list of the replaced spans in order)
+    """
+    spans = []
+    
+    def replace(match):
+        spans.append(match.group(0))
+        return PLACEHOLDER.format(len(spans) - 1)
+    
+    return INLINE_CODE_PATTERN.sub(replace, text), spans
+
+
+def unmask_inline_code(text, spans):
+    """Put the spans replaced by mask_inline_code back
+    
+    Args:
+        text (str): Translated text containing the placeholders
+        spans (list): Spans returned by mask_inline_code
+        
+    Returns:
+        str: The text with the spans restored, or None if a placeholder
+            was lost or duplicated by the translation
+    """
+    found = [int(index) for index in PLACEHOLDER_PATTERN.findall(text)]
+    if sorted(found) != list(range(len(spans))):
+        return None
+    return PLACEHOLDER_PATTERN.sub(lambda match: spans[int(match.group(1))], text)
+
+
+# Whole payloads that need no translation, as (pattern, reason)
+NOOP_PATTERNS = [
+    (re.compile(r"[\W\d_]*"), "no letters"),
+    (re.compile(r"(?:(?:https?://|www\.)\S+\s*)+"), "url"),
+    (re.compile(r"(?:[\w.+-]+@[\w-]+(?:\.[\w-]+)+\s*)+"), "email address"),
+    (re.compile(r"[A-Za-z]:\\[^\n]*|(?:\\\\|~/|\.{1,2}/|/)[^\s]+"), "file path"),
+    (re.compile(r"(?=.*\d)[0-9a-fA-F]{7,}|[0-9a-fA-F]{8}(?:-[0-9a-fA-F]{4}){3}-[0-9a-fA-F]{12}"),
+     "hash or id"),
+    (re.compile(r"v?\d+(?:\.\d+)+[\w.+-]*"), "version number"),
+    (re.compile(r"[A-Za-z_]\w*(?:[._]\w+)+(?:\(\))?|[a-z]+(?:[A-Z][a-z0-9]*)+|\w+\(\)"), "identifier"),
+]
+
+
+def find_noop_reason(text):
+    """Check whether text needs no translation at all
+    
+    Args:
+        text (str): Text to analyze
+        
+    Returns:
+        str: Why the text can be left as it is (e.g. "url"), or None if it
+            should be translated
+    """
+    stripped = text.strip()
+    for pattern, reason in NOOP_PATTERNS:
+        if pattern.fullmatch(stripped):
+            return reason
+    return None
+
+
+# Punctuation that labels don't have: at the end of a line or between words
+LABEL_PUNCTUATION_PATTERN = re.compile(r"[.,;:!?…]$|[.,;!?] ")
+
+
+def is_tabular(text):
+    """Detect tab/newline separated values, e.g. copied spreadsheet cells
+    
+    Args:
+        text (str): Text to analyze
+        
+    Returns:
+        bool: True if text looks like a table or a list of short labels
+    """
+    lines = [line for line in text.splitlines() if line.strip()]
+    if len(lines) < 2:
+        return False
+    
+    # Spreadsheet cells: most lines are tab separated
+    tabbed_lines = sum(1 for line in lines if "\t" in line)
+    if tabbed_lines / len(lines) >= 0.5:
         return True
     
+    # List of labels: several short lines of a few words each, without the
+    # punctuation of sentences, letters, addresses or verse
+    if len(lines) >= 3:
+        return all(len(line) <= 60 and len(line.split()) <= 6 and
+                   not LABEL_PUNCTUATION_PATTERN.search(line.strip())
+                   for line in lines)
+    
     return False
 
 
+def split_cells(text):
+    """Split tabular text into cells and the separators between them
+    
+    Args:
+        text (str): Tab/newline separated text
+        
+    Returns:
+        tuple: (cells, separators) where separators[i] follows cells[i]
+    """
+    parts = re.split(r"(\t|\r?\n)", text)
+    return parts[0::2], parts[1::2]
+
+
+def join_cells(cells, separators):
+    """Rebuild tabular text from cells and separators (inverse of split_cells)"""
+    pieces = []
+    for i, cell in enumerate(cells):
+        pieces.append(cell)
+        if i < len(separators):
+            pieces.append(separators[i])
+    return "".join(pieces)
+
+
 def count_words(text):
     """Count words in text
     
@@ -59,49 +459,17 @@ def count_words(text):
     return len(text.split())
 
 
-def detect_language(text):
-    """Attempt to detect the language of text (simplified)
+def detect_language(text, min_confidence=0.9):
+    """Detect the language of text
     
     Args:
         text (str): Text to analyze
+        min_confidence (float): Confidence required to name a language
         
     Returns:
         str: Detected language or "unknown"
     """
-    # This is a very simplified language detection
-    # In a real application, use a proper language detection library
-    
-    # Character sets that are distinctive for certain languages
-    language_markers = {
-        "Português": ["ção", "ões", "á", "é", "ê", "ã", "õ", "ç"],
-        "Inglês": ["the", "and", "that", "have", "with"],
-        "Espanhol": ["ción", "que", "ñ", "á", "é", "í", "ó", "ú"],
-        "Francês": ["les", "des", "que", "dans", "est", "ê", "ç", "à", "â", "î", "ï"],
-        "Italiano": ["gli", "sono", "che", "per", "questa"],
-        "Alemão": ["der", "die", "das", "und", "ist", "ß", "ä", "ö", "ü"],
-    }
-    
-    # Simple scoring system
-    scores = {lang: 0 for lang in language_markers}
-    
-    text_lower = text.lower()
-    
-    for lang, markers in language_markers.items():
-        for marker in markers:
-            if marker in text_lower:
-                scores[lang] += 1
-    
-    # Find language with highest score
-    max_score = 0
-    detected_lang = "unknown"
-    
-    for lang, score in scores.items():
-        if score > max_score:
-            max_score = score
-            detected_lang = lang
-    
-    # Require a minimum score to make a determination
-    if max_score < 2:
+    ranked = identify_language(text)
+    if not ranked or ranked[0][1] < min_confidence:
         return "unknown"
-    
-    return detected_lang
+    return ranked[0][0]
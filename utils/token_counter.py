@@ -0,0 +1,447 @@
+"""
+Token usage tracking utilities
+
+Every translation is recorded as a row of a SQLite ledger in WAL mode:
+when it happened, the engine and model, prompt and completion tokens,
+latency, whether it came from the cache and the bytes sent and received.
+Appending a row costs the same however long the history is, and commits
+don't wait for the disk: the WAL is synced in batches when it is
+checkpointed.
+
+Rows are periodically folded into daily totals per engine, model and
+language pair. Those totals are also kept in memory, so aggregate
+queries over a year of usage only touch a few thousand entries. Rows
+older than RECORD_RETENTION_DAYS are dropped once folded.
+
+Usage saved to token_usage.json by older versions is imported the first
+time the ledger is opened.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+# Fields usage can be grouped by in TokenCounter.query_usage, and how each
+# is read from a (day, engine, model, source_lang, target_lang) key
+GROUP_FIELDS = {
+    "day": lambda key: key[0],
+    "month": lambda key: key[0][:7],
+    "engine": lambda key: key[1],
+    "model": lambda key: key[2],
+    "language_pair": lambda key: (key[3], key[4]),
+}
+
+# Order of the counters in a totals list
+TOTAL_FIELDS = ("requests", "cache_hits", "prompt_tokens", "completion_tokens", "tokens",
+                "latency_ms", "bytes_in", "bytes_out")
+
+
+class TokenCounter:
+    """Track token usage across sessions"""
+
+    DB_FILE = "token_usage.db"
+    LEGACY_FILE = "token_usage.json"
+
+    # Fold ledger rows into the daily totals after this many records
+    COMPACT_INTERVAL = 1000
+
+    # Rows are kept this long after being folded into the daily totals
+    RECORD_RETENTION_DAYS = 400
+
+    def __init__(self, db_file=None):
+        """Initialize the counter
+
+        Args:
+            db_file (str, optional): SQLite file of the ledger, or None for
+                the default file. Pass ":memory:" to disable persistence.
+        """
+        self.db_file = db_file or self.DB_FILE
+        self.monthly_usage = {}
+
+        self._daily = {}
+        self._lock = threading.Lock()
+        self._pending_rows = 0
+
+        self._db = None
+        try:
+            self._db = sqlite3.connect(self.db_file, check_same_thread=False)
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute("PRAGMA synchronous=NORMAL")
+            self._create_tables()
+            self._migrate_monthly_ledger()
+            if self.db_file != ":memory:":
+                self._import_legacy()
+            self._db.commit()
+        except sqlite3.Error as e:
+            print(f"Error opening token usage ledger: {str(e)}")
+            self._db = None
+
+        self.load_usage()
+
+    def load_usage(self):
+        """Load usage totals from the ledger"""
+        with self._lock:
+            self.monthly_usage = {}
+            self._daily = {}
+            self._pending_rows = 0
+            if not self._db:
+                return
+            try:
+                for row in self._db.execute(
+                        "SELECT day, engine, model, source_lang, target_lang, requests, "
+                        "cache_hits, prompt_tokens, completion_tokens, tokens, latency_ms, "
+                        "bytes_in, bytes_out FROM daily_usage"):
+                    self._add(row[:5], row[5:])
+
+                # Rows recorded since the last compaction
+                for row in self._db.execute(
+                        "SELECT day, engine, model, source_lang, target_lang, COUNT(*), "
+                        "SUM(cached), SUM(prompt_tokens), SUM(completion_tokens), "
+                        "SUM(prompt_tokens + completion_tokens), SUM(latency_ms), "
+                        "SUM(bytes_in), SUM(bytes_out) FROM requests WHERE seq > ? "
+                        "GROUP BY day, engine, model, source_lang, target_lang",
+                        (self._compacted_through(),)):
+                    self._add(row[:5], row[5:])
+                    self._pending_rows += row[5]
+            except sqlite3.Error as e:
+                print(f"Error loading token usage: {str(e)}")
+
+    def record_request(self, engine, model="", source_lang="", target_lang="",
+                       prompt_tokens=0, completion_tokens=0, latency=0.0, cached=False,
+                       bytes_in=0, bytes_out=0, timestamp=None):
+        """Record one translation
+
+        Args:
+            engine (str): AI engine used
+            model (str): Model of the engine
+            source_lang (str): Source language
+            target_lang (str): Target language
+            prompt_tokens (int): Tokens sent
+            completion_tokens (int): Tokens received
+            latency (float): Seconds until the translation was ready
+            cached (bool): Whether the translation came from the cache
+            bytes_in (int): UTF-8 size of the text translated
+            bytes_out (int): UTF-8 size of the translation
+            timestamp (float, optional): When the translation happened, as
+                returned by time.time(); now if not given
+        """
+        timestamp = timestamp or time.time()
+        day = datetime.fromtimestamp(timestamp).strftime("%Y-%m-%d")
+        latency_ms = latency * 1000
+        key = (day, engine, model, source_lang, target_lang)
+        values = (1, int(cached), prompt_tokens, completion_tokens,
+                  prompt_tokens + completion_tokens, latency_ms, bytes_in, bytes_out)
+
+        with self._lock:
+            self._add(key, values)
+            if not self._db:
+                return
+            try:
+                self._db.execute(
+                    "INSERT INTO requests (created_at, day, engine, model, source_lang, "
+                    "target_lang, prompt_tokens, completion_tokens, latency_ms, cached, "
+                    "bytes_in, bytes_out) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (timestamp, day, engine, model, source_lang, target_lang, prompt_tokens,
+                     completion_tokens, latency_ms, int(cached), bytes_in, bytes_out))
+                self._db.commit()
+                self._pending_rows += 1
+                if self._pending_rows >= self.COMPACT_INTERVAL:
+                    self._compact()
+            except sqlite3.Error as e:
+                print(f"Error saving token usage: {str(e)}")
+
+    def add_tokens(self, count, engine="OpenAI"):
+        """Add token usage for current month
+
+        Args:
+            count (int): Number of tokens used
+            engine (str): AI engine used
+        """
+        self.record_request(engine, completion_tokens=count)
+
+    def compact(self):
+        """Fold the ledger rows into the daily totals"""
+        with self._lock:
+            if not self._db:
+                return
+            try:
+                self._compact()
+            except sqlite3.Error as e:
+                print(f"Error compacting token usage: {str(e)}")
+
+    def close(self):
+        """Compact the ledger and close it"""
+        self.compact()
+        with self._lock:
+            if self._db:
+                self._db.close()
+                self._db = None
+
+    def query_usage(self, group_by=("day",), start=None, end=None, engine=None):
+        """Aggregate usage
+
+        Args:
+            group_by (tuple): Fields to group by, from GROUP_FIELDS
+            start (str, optional): First day included, as "YYYY-MM-DD"
+            end (str, optional): Last day included, as "YYYY-MM-DD"
+            engine (str, optional): AI engine to filter by
+
+        Returns:
+            dict: Tuple of group_by values to totals: requests, cache_hits,
+                prompt_tokens, completion_tokens, tokens, latency_ms,
+                avg_latency_ms, bytes_in and bytes_out
+        """
+        unknown = set(group_by) - set(GROUP_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown usage fields: {', '.join(sorted(unknown))}")
+
+        extractors = [GROUP_FIELDS[field] for field in group_by]
+        groups = {}
+        with self._lock:
+            for key, values in self._daily.items():
+                if (start and key[0] < start) or (end and key[0] > end):
+                    continue
+                if engine and key[1] != engine:
+                    continue
+                group = tuple(extract(key) for extract in extractors)
+                rows = groups.get(group)
+                if rows is None:
+                    groups[group] = [values]
+                else:
+                    rows.append(values)
+
+            # Columns are summed while the counters can't change
+            totals = {group: [sum(column) for column in zip(*rows)]
+                      for group, rows in groups.items()}
+
+        result = {}
+        for group, values in totals.items():
+            result[group] = dict(zip(TOTAL_FIELDS, values))
+            result[group]["avg_latency_ms"] = values[5] / values[0] if values[0] else 0.0
+        return result
+
+    def get_records(self, start=None, end=None, engine=None, limit=1000):
+        """Get the most recent translations recorded
+
+        Args:
+            start (str, optional): First day included, as "YYYY-MM-DD"
+            end (str, optional): Last day included, as "YYYY-MM-DD"
+            engine (str, optional): AI engine to filter by
+            limit (int): Maximum number of rows
+
+        Returns:
+            list: One dict per translation, newest first
+        """
+        conditions = []
+        params = []
+        if engine:
+            conditions.append("engine = ?")
+            params.append(engine)
+        if start:
+            conditions.append("day >= ?")
+            params.append(start)
+        if end:
+            conditions.append("day <= ?")
+            params.append(end)
+        where = f"WHERE {' AND '.join(conditions)} " if conditions else ""
+
+        with self._lock:
+            if not self._db:
+                return []
+            try:
+                cursor = self._db.execute(
+                    "SELECT created_at, engine, model, source_lang, target_lang, "
+                    "prompt_tokens, completion_tokens, latency_ms, cached, bytes_in, bytes_out "
+                    f"FROM requests {where}ORDER BY seq DESC LIMIT ?", params + [limit])
+                columns = [description[0] for description in cursor.description]
+                return [dict(zip(columns, row)) for row in cursor]
+            except sqlite3.Error as e:
+                print(f"Error reading token usage: {str(e)}")
+                return []
+
+    def get_current_month_usage(self, engine=None):
+        """Get token usage for current month
+
+        Args:
+            engine (str, optional): AI engine to filter by
+
+        Returns:
+            int: Token count for current month
+        """
+        current_month = date.today().strftime("%Y-%m")
+
+        with self._lock:
+            engines = self.monthly_usage.get(current_month, {})
+            if engine:
+                return engines.get(engine, 0)
+            return sum(engines.values())
+
+    def get_total_usage(self, engine=None):
+        """Get total token usage across all months
+
+        Args:
+            engine (str, optional): AI engine to filter by
+
+        Returns:
+            int: Total token count
+        """
+        return sum(self.get_usage_by_month(engine).values())
+
+    def get_usage_by_month(self, engine=None):
+        """Get token usage breakdown by month
+
+        Args:
+            engine (str, optional): AI engine to filter by
+
+        Returns:
+            dict: Monthly token usage
+        """
+        with self._lock:
+            if engine:
+                return {
+                    month: engines.get(engine, 0)
+                    for month, engines in self.monthly_usage.items()
+                }
+            return {
+                month: sum(engines.values())
+                for month, engines in self.monthly_usage.items()
+            }
+
+    def _add(self, key, values):
+        """Add a row's counters to the in-memory totals
+
+        Args:
+            key (tuple): (day, engine, model, source_lang, target_lang)
+            values (tuple): Counters in TOTAL_FIELDS order
+        """
+        totals = self._daily.get(key)
+        if totals is None:
+            self._daily[key] = list(values)
+        else:
+            for i, value in enumerate(values):
+                totals[i] += value
+
+        engines = self.monthly_usage.setdefault(key[0][:7], {})
+        engines[key[1]] = engines.get(key[1], 0) + values[4]
+
+    def _compacted_through(self):
+        """Sequence number of the last row folded into daily_usage"""
+        row = self._db.execute("SELECT value FROM meta WHERE key = 'compacted_through'").fetchone()
+        return int(row[0]) if row else 0
+
+    def _compact(self):
+        """Fold new rows into daily_usage and drop expired rows, in one transaction"""
+        compacted_through = self._compacted_through()
+        last = self._db.execute("SELECT MAX(seq) FROM requests").fetchone()[0]
+        if last is not None and last > compacted_through:
+            self._db.execute(
+                "INSERT INTO daily_usage SELECT day, engine, model, source_lang, target_lang, "
+                "COUNT(*), SUM(cached), SUM(prompt_tokens), SUM(completion_tokens), "
+                "SUM(prompt_tokens + completion_tokens), SUM(latency_ms), SUM(bytes_in), "
+                "SUM(bytes_out) FROM requests WHERE seq > ? AND seq <= ? "
+                "GROUP BY day, engine, model, source_lang, target_lang "
+                "ON CONFLICT (day, engine, model, source_lang, target_lang) DO UPDATE SET "
+                "requests = requests + excluded.requests, "
+                "cache_hits = cache_hits + excluded.cache_hits, "
+                "prompt_tokens = prompt_tokens + excluded.prompt_tokens, "
+                "completion_tokens = completion_tokens + excluded.completion_tokens, "
+                "tokens = tokens + excluded.tokens, "
+                "latency_ms = latency_ms + excluded.latency_ms, "
+                "bytes_in = bytes_in + excluded.bytes_in, "
+                "bytes_out = bytes_out + excluded.bytes_out",
+                (compacted_through, last))
+            self._db.execute(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES ('compacted_through', ?)",
+                (str(last),))
+            compacted_through = last
+
+        expired = (date.today() - timedelta(days=self.RECORD_RETENTION_DAYS)).strftime("%Y-%m-%d")
+        self._db.execute(
+            "DELETE FROM requests WHERE day < ? AND seq <= ?", (expired, compacted_through))
+        self._db.commit()
+        self._pending_rows = 0
+
+    def _create_tables(self):
+        """Create the ledger tables and indexes if they don't exist"""
+        # AUTOINCREMENT: seq must not be reused once expired rows are deleted,
+        # or new rows would fall behind compacted_through and be lost
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS requests ("
+            "seq INTEGER PRIMARY KEY AUTOINCREMENT, created_at REAL NOT NULL, day TEXT NOT NULL, "
+            "engine TEXT NOT NULL, model TEXT NOT NULL, "
+            "source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+            "latency_ms REAL NOT NULL, cached INTEGER NOT NULL, "
+            "bytes_in INTEGER NOT NULL, bytes_out INTEGER NOT NULL)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS requests_day ON requests (day)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS requests_engine_day ON requests (engine, day)")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS daily_usage ("
+            "day TEXT NOT NULL, engine TEXT NOT NULL, model TEXT NOT NULL, "
+            "source_lang TEXT NOT NULL, target_lang TEXT NOT NULL, "
+            "requests INTEGER NOT NULL, cache_hits INTEGER NOT NULL, "
+            "prompt_tokens INTEGER NOT NULL, completion_tokens INTEGER NOT NULL, "
+            "tokens INTEGER NOT NULL, latency_ms REAL NOT NULL, "
+            "bytes_in INTEGER NOT NULL, bytes_out INTEGER NOT NULL, "
+            "PRIMARY KEY (day, engine, model, source_lang, target_lang))")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def _add_monthly_total(self, month, engine, tokens):
+        """Store a monthly total without per-request detail, on the month's first day"""
+        self._db.execute(
+            "INSERT INTO daily_usage VALUES (?, ?, '', '', '', 0, 0, 0, 0, ?, 0, 0, 0) "
+            "ON CONFLICT (day, engine, model, source_lang, target_lang) DO UPDATE SET "
+            "tokens = tokens + excluded.tokens",
+            (f"{month}-01", engine, int(tokens)))
+
+    def _migrate_monthly_ledger(self):
+        """Replace the monthly-only tables of the previous ledger format
+
+        Their totals are kept in daily_usage, and the tables are dropped in
+        the same transaction.
+        """
+        tables = {row[0] for row in self._db.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'table'")}
+        if "monthly_usage" not in tables:
+            return
+
+        sources = ["SELECT month, engine, tokens FROM monthly_usage"]
+        if "usage_log" in tables:
+            sources.append("SELECT month, engine, tokens FROM usage_log")
+        totals = self._db.execute(
+            f"SELECT month, engine, SUM(tokens) FROM ({' UNION ALL '.join(sources)}) "
+            "GROUP BY month, engine").fetchall()
+        for month, engine, tokens in totals:
+            self._add_monthly_total(month, engine, tokens)
+        self._db.execute("DROP TABLE monthly_usage")
+        self._db.execute("DROP TABLE IF EXISTS usage_log")
+        self._db.commit()
+
+    def _import_legacy(self):
+        """Import the monthly totals of token_usage.json, once
+
+        The import and the flag recording it are committed together, so a
+        crash can't import the file twice. The file itself is left in place.
+        """
+        if not os.path.exists(self.LEGACY_FILE):
+            return
+        if self._db.execute("SELECT 1 FROM meta WHERE key = 'legacy_imported'").fetchone():
+            return
+
+        try:
+            with open(self.LEGACY_FILE, "r", encoding="utf-8") as f:
+                legacy_usage = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Error importing token usage: {str(e)}")
+            return
+
+        for month, engines in legacy_usage.items():
+            for engine, tokens in engines.items():
+                self._add_monthly_total(month, engine, tokens)
+        self._db.execute(
+            "INSERT INTO meta (key, value) VALUES ('legacy_imported', ?)",
+            (self.LEGACY_FILE,))
@@ -0,0 +1,99 @@
+"""
+Local token counting for translation requests
+
+Tokens are counted before a request is sent, so chunk sizes, rate limits,
+budgets and costs can be worked out without asking the API. Text is
+counted with a BPE vocabulary when the optional tiktoken package is
+installed and the engine names its encoding; the vocabulary is loaded on
+first use. Otherwise a fast heuristic is used that splits text the way BPE
+tokenizers do: short words are one token, long words, numbers, accented
+and non-Latin letters take more, and single spaces are free.
+"""
+import math
+import re
+import threading
+
+# Each match is counted as one token
+TOKEN_PIECE_PATTERN = re.compile(
+    r"[A-Za-z]{1,6}"                                # ASCII words, long ones in pieces
+    r"|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]"   # CJK: a token per character
+    r"|[^\W\d_A-Za-z]{1,3}"                         # Accented and other letters
+    r"|\d{1,3}"                                     # Numbers, three digits per token
+    r"|\n\s*"                                       # Line breaks with the indentation after them
+    r"|[ \t]{2,}"                                   # Runs of spaces
+    r"|[^\sA-Za-z\d]"                               # Punctuation and symbols
+)
+
+# Tokens added by the chat format around the system and user messages
+REQUEST_OVERHEAD = 11
+
+# Translations use a few more tokens than the source text on average
+COMPLETION_RATIO = 1.2
+
+_encodings = {}
+_encodings_lock = threading.Lock()
+
+
+def estimate_tokens(text):
+    """Estimate the number of tokens in text without a vocabulary
+
+    Args:
+        text (str): Text to measure
+
+    Returns:
+        int: Estimated token count
+    """
+    return TOKEN_PIECE_PATTERN.subn("", text)[1]
+
+
+def _get_encoding(name):
+    """Load a tiktoken encoding on first use
+
+    Returns:
+        Encoding: The encoding, or None if tiktoken or its vocabulary is
+            not available
+    """
+    with _encodings_lock:
+        if name not in _encodings:
+            try:
+                import tiktoken
+                _encodings[name] = tiktoken.get_encoding(name)
+            except ImportError:
+                _encodings[name] = None
+            except Exception as e:
+                print(f"Error loading token vocabulary {name}: {str(e)}")
+                _encodings[name] = None
+        return _encodings[name]
+
+
+def count_tokens(text, encoding=None):
+    """Count the tokens in text
+
+    Args:
+        text (str): Text to measure
+        encoding (str, optional): tiktoken encoding of the engine's model,
+            e.g. "cl100k_base"; the heuristic is used without it
+
+    Returns:
+        int: Token count
+    """
+    bpe = _get_encoding(encoding) if encoding else None
+    if bpe is None:
+        return estimate_tokens(text)
+    return len(bpe.encode_ordinary(text))
+
+
+def predict_request_tokens(text, context, estimate=estimate_tokens):
+    """Predict the tokens a translation request will use
+
+    Args:
+        text (str): Text to translate
+        context (str): System prompt sent with the text
+        estimate (callable): Function counting the tokens in a string
+
+    Returns:
+        tuple: (prompt_tokens, completion_tokens)
+    """
+    text_tokens = estimate(text)
+    prompt_tokens = REQUEST_OVERHEAD + estimate(context) + text_tokens
+    return prompt_tokens, math.ceil(text_tokens * COMPLETION_RATIO)